@@ -0,0 +1,1423 @@
+"""Micro-benchmarks for the bot's hot paths.
+
+Usage:
+    python benchmark.py matcher [--titles N] [--posts N] [--repeat N]
+    python benchmark.py extract [--fixtures DIR] [--save-fixtures DIR] [--repeat N]
+    python benchmark.py cse [--interval SECONDS] [--quota N]
+    python benchmark.py dedup [--openings N] [--copies N]
+    python benchmark.py crawl [--polls N] [--arrivals N]
+    python benchmark.py stream [--pages N] [--fetch-latency MS] [--subscribers N]
+    python benchmark.py pipeline [--subscribers N] [--rate N] [--save FILE] [--compare FILE]
+    python benchmark.py record [--out DIR]
+    python benchmark.py webhook [--updates N] [--concurrency N]
+    python benchmark.py startup [--runs N]
+    python benchmark.py parse [--workers N ...] [--pages N]
+    python benchmark.py shards [--workers N] [--chats N] [--messages N]
+    python benchmark.py jobs [--users N] [--ttl SECONDS]
+    python benchmark.py lanes [--subscribers N] [--command-rate N] [--seconds N]
+
+Page fixtures are synthesised to mirror each site's card markup and typical page
+weight (inline scripts, navigation, tracking JSON). Pass --fixtures DIR with saved
+pages named <source>.html to benchmark against real captures instead. `record` saves
+one live result page per enabled site to fixtures/ (or --out) and fails when a page
+yields no cards; tests/test_extraction.py checks EXTRACTION_SPECS against those pages.
+
+Telegram is replaced by FakeBotApi, a local HTTP server speaking enough of the Bot API
+for the bot to run against it (point TELEGRAM_API_URL at it). It enforces Telegram's
+flood limits. The pipeline run sends at 90% of --api-rate, as the bot should stay under
+Telegram's limit, and fails if the API answers any send with a 429; pass --rate above
+--api-rate to exercise the broadcaster's RetryAfter handling instead. Its delivery
+latency is mostly queueing: min_delivery_seconds is the time the messages need at
+--rate. Save a pipeline run with --save and check a later one with --compare, which
+exits non-zero when a metric regresses beyond --tolerance.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from http import HTTPStatus
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs
+
+import httpx
+from bs4 import BeautifulSoup
+
+import bot
+
+WORDS = ["senior", "lead", "manager", "remote", "hybrid", "india", "london", "engineer", "python",
+         "java", "sales", "marketing", "support", "cloud", "devops", "intern", "staff", "team",
+         "growth", "platform", "mobile", "android", "ios", "finance", "operations", "content"]
+
+
+# Best-of-N wall time for fn(), in seconds
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def make_titles(count, rng):
+    titles = []
+    for _ in range(count):
+        words = rng.sample(WORDS, rng.randint(2, 5))
+        # Roughly a third of real titles contain a target role
+        if rng.random() < 0.35:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(bot.TARGET_ROLES))
+        titles.append(" ".join(words).title())
+    return titles
+
+
+def make_posts(count, rng):
+    posts = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 200))]
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words)), rng.choice(bot.TARGET_ROLES))
+        posts.append(" ".join(words).capitalize())
+    return posts
+
+
+def run_matcher(args):
+    rng = random.Random(42)
+    titles = make_titles(args.titles, rng)
+    posts = make_posts(args.posts, rng)
+    matcher = bot.role_matcher
+
+    # The checks the matcher replaced
+    def naive_title(title):
+        title_lower = title.lower()
+        return any(role in title_lower for role in bot.TARGET_ROLES)
+
+    def naive_post(content):
+        return any(keyword.lower() in content.lower() for keyword in bot.TARGET_ROLES)
+
+    def naive_matches(text):
+        text_lower = text.lower()
+        return {role for role in matcher.phrases if role in text_lower}
+
+    # Results must be identical before timings mean anything
+    assert [naive_title(t) for t in titles] == [matcher.search(t) for t in titles]
+    assert [naive_post(p) for p in posts] == [matcher.search(p) for p in posts]
+    assert [naive_matches(t) for t in titles] == [matcher.matches(t) for t in titles]
+    assert [naive_matches(p) for p in posts] == [matcher.matches(p) for p in posts]
+
+    cases = [
+        ("titles: any role", lambda: [naive_title(t) for t in titles], lambda: [matcher.search(t) for t in titles], len(titles)),
+        ("posts: any role", lambda: [naive_post(p) for p in posts], lambda: [matcher.search(p) for p in posts], len(posts)),
+        ("titles: which roles", lambda: [naive_matches(t) for t in titles], lambda: [matcher.matches(t) for t in titles], len(titles)),
+        ("posts: which roles", lambda: [naive_matches(p) for p in posts], lambda: [matcher.matches(p) for p in posts], len(posts)),
+    ]
+    print(f"{'case':<22}{'naive us/item':>15}{'matcher us/item':>17}{'speedup':>10}")
+    for name, naive, compiled, items in cases:
+        naive_time = best_time(naive, args.repeat)
+        compiled_time = best_time(compiled, args.repeat)
+        print(f"{name:<22}{naive_time / items * 1e6:>15.2f}{compiled_time / items * 1e6:>17.2f}"
+              f"{naive_time / compiled_time:>9.1f}x")
+
+
+# Markup for one job card per source, using the selectors the scrapers look for
+def make_card(source, index, rng, date=None):
+    title = " ".join(rng.sample(WORDS, 2)).title() + " " + rng.choice(bot.TARGET_ROLES).title()
+    date = date or rng.choice(["Just posted", "1 day ago", "3 days ago", "Today", "2 weeks ago"])
+    place = rng.choice(["Bangalore, India", "London, UK", "Remote", "Austin, TX"])
+    filler = "".join(f'<span class="tag-{n}">{rng.choice(WORDS)}</span>' for n in range(12))
+    if source == "indeed":
+        return (f'<div class="cardOutline tapItem result"><div class="job_seen_beacon">'
+                f'<h2 class="jobTitle"><a data-jk="{index:016x}" id="job_{index:016x}" href="/rc/clk?jk={index:016x}">'
+                f'<span title="{title}">{title}</span></a></h2><div class="company_location">'
+                f'<span data-testid="company-name">Company {index}</span><div class="companyLocation">{place}</div></div>'
+                f'<div class="jobMetaDataGroup">{filler}</div><span class="date">{date}</span></div></div>')
+    if source == "linkedin_jobs":
+        return (f'<li><div class="base-card relative base-search-card job-search-card">'
+                f'<a class="base-card__full-link" href="https://www.linkedin.com/jobs/view/{index}?refId=abc&trackingId=xyz">'
+                f'<span class="sr-only">{title}</span></a><div class="base-search-card__info">'
+                f'<h3 class="base-search-card__title">{title}</h3><h4 class="base-search-card__subtitle">Company {index}</h4>'
+                f'<span class="job-search-card__location">{place}</span>{filler}<time datetime="2024-01-01">{date}</time></div></div></li>')
+    if source == "linkedin_posts":
+        body = " ".join(rng.choice(WORDS) for _ in range(60))
+        return (f'<div class="feed-shared-update-v2"><a class="app-aware-link" href="https://www.linkedin.com/feed/update/urn:li:activity:{index}?utm_source=share">'
+                f'<span class="feed-shared-actor__title">Company {index}</span></a>'
+                f'<span class="feed-shared-actor__sub-description">{date}</span>'
+                f'<div class="feed-shared-text">We are hiring a {title}. {body}</div>{filler}</div>')
+    if source == "stackoverflow":
+        return (f'<div class="listResults"><div class="-job js-result" data-jobid="{index}"><div class="-title">'
+                f'<h2 class="mb4 fc-black-800 fs-body3"><a href="/jobs/{index}/{title.lower().replace(" ", "-")}">{title}</a></h2>'
+                f'<h3 class="fc-black-700 fs-body1 mb4"><span>Company {index}</span><span class="fc-black-500">{place}</span></h3>'
+                f'</div>{filler}<span class="fc-danger">{date}</span></div></div>')
+    if source == "internshala":
+        return (f'<div class="individual_internship"><div class="internship_meta"><div class="company">'
+                f'<h3 class="heading_4_5 profile"><a class="view_detail_button" href="/internship/detail/{index}">{title}</a></h3>'
+                f'<a class="company_name link_display_like_text">Company {index}</a></div>{filler}'
+                f'<div class="status-container">{date}</div></div></div>')
+    if source == "freshersworld":
+        return (f'<div class="col-md-12 col-lg-12 col-xs-12 padding-none job-container" job_id="{index}">'
+                f'<a href="https://www.freshersworld.com/jobs/{title.lower().replace(" ", "-")}-{index}">'
+                f'<span class="wrap-title seo_title job-title">{title}</span></a>'
+                f'<h3 class="latest-jobs-title company-name job-company">Company {index}</h3>{filler}'
+                f'<span class="job-date">{date}</span></div>')
+    return (f'<tr class="job" data-id="{index}"><td class="company position company_and_position">'
+            f'<a itemprop="url" href="/remote-jobs/{index}-{title.lower().replace(" ", "-")}">'
+            f'<h2 itemprop="title">{title}</h2></a><h3 itemprop="name">Company {index}</h3>{filler}</td>'
+            f'<td class="time">{rng.choice(["2h", "1d", "3d", "5d", "2mo"])}</td></tr>')
+
+
+# A full search result page: heavy head, navigation and scripts around the card list
+def make_page(source, rng, cards=25):
+    script = "var data = " + "{" + ",".join(f'"k{n}": "{rng.choice(WORDS)}"' for n in range(4000)) + "};"
+    nav = "".join(f'<li class="nav-item"><a href="/section/{n}">{rng.choice(WORDS)}</a></li>' for n in range(400))
+    footer = "".join(f'<div class="footer-col"><p>{" ".join(rng.choice(WORDS) for _ in range(30))}</p></div>' for _ in range(60))
+    body = "".join(make_card(source, index, rng) for index in range(cards))
+    if source == "remoteok":
+        body = f'<table id="jobsboard"><tbody>{body}</tbody></table>'
+    else:
+        body = f'<ul class="results">{body}</ul>'
+    return (f'<!DOCTYPE html><html><head><title>Jobs</title><script>{script}</script>'
+            f'<style>{".c{color:red}" * 2000}</style></head><body><nav><ul>{nav}</ul></nav>'
+            f'<main>{body}</main><footer>{footer}</footer><script>{script}</script></body></html>')
+
+
+def load_fixtures(args, cards=25):
+    rng = random.Random(7)
+    pages = {}
+    for source in bot.EXTRACTION_SPECS:
+        path = os.path.join(args.fixtures, f"{source}.html") if args.fixtures else None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                pages[source] = f.read()
+        else:
+            pages[source] = make_page(source, rng, cards)
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for source, html in pages.items():
+            with open(os.path.join(args.save_fixtures, f"{source}.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+    return pages
+
+
+# The previous path: build a tree of the whole page with html.parser, then select cards
+def full_tree_extract(source, html):
+    spec = bot.EXTRACTION_SPECS[source]
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for selector in spec["cards"]:
+        cards = soup.select(selector)
+        if cards:
+            break
+    records = []
+    for card in cards:
+        record = {}
+        for field, (selectors, attr) in spec["fields"].items():
+            value = None
+            for selector in selectors:
+                elem = card.select_one(selector)
+                if elem is not None:
+                    value = elem.get_text(strip=True) if attr is None else elem.get(attr)
+                    break
+            record[field] = value
+        records.append(record)
+    return records
+
+
+# CPU seconds (best of N) and peak traced memory for one call
+def measure(fn, repeat):
+    cpu = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        cpu = min(cpu, time.process_time() - started)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def run_extract(args):
+    pages = load_fixtures(args)
+    print(f"parser backend: {bot.HTML_PARSER}")
+    print(f"{'source':<16}{'page KB':>9}{'cards':>7}{'full ms':>10}{'strained ms':>13}{'full MB':>10}{'strained MB':>13}")
+    for source, html in pages.items():
+        records = bot.extract_cards(source, html)
+        assert records == full_tree_extract(source, html), f"{source}: extraction differs from full parse"
+        full_cpu, full_peak = measure(lambda: full_tree_extract(source, html), args.repeat)
+        strained_cpu, strained_peak = measure(lambda: bot.extract_cards(source, html), args.repeat)
+        print(f"{source:<16}{len(html) / 1024:>9.0f}{len(records):>7}{full_cpu * 1000:>10.1f}{strained_cpu * 1000:>13.1f}"
+              f"{full_peak / 1e6:>10.1f}{strained_peak / 1e6:>13.1f}")
+
+
+# Replay a day of Google checks against the offline CSE stub and show how the planner
+# spent the quota. Queries mentioning "data" are pretend hot sources.
+def run_cse(args):
+    stub = bot.StubCseService()
+    client = bot.GoogleJobsClient(service=stub, daily_quota=args.quota)
+    day_start = 1_700_006_400.0  # A UTC midnight
+    client.allowance_updated = day_start
+    checks = int(86400 // args.interval)
+    for index in range(checks):
+        now = day_start + index * args.interval
+        for query in client.plan(now):
+            stub.list(q=query)
+            client._record(query, 3 if "data" in query else 0, now)
+    runs = {query: stub.calls.count(query) for query in client.queries}
+    print(f"{checks} checks, {len(stub.calls)}/{args.quota} queries used, "
+          f"{sum(1 for count in runs.values() if count)}/{len(runs)} queries run at least once")
+    for query, count in sorted(runs.items(), key=lambda item: -item[1]):
+        print(f"{count:>5}  {query}")
+
+
+# Openings at many companies, each listed several times the way different sites
+# and reposts word it: abbreviations, noise words, reordering, legal suffixes, tracking links,
+# and the location written with or without its region. Every fifth opening is the one
+# before it (same company and title) in another city.
+def make_listings(openings, copies, rng):
+    seniority = ["Junior", "Graduate", "Trainee", "Entry Level", "Associate"]
+    tech = ["Python", "Java", "React", "Data", "QA", "Cloud", "Android", "Security", "UI/UX", "Node.js", "SQL", "Go"]
+    role = ["Developer", "Engineer", "Analyst", "Tester", "Designer", "Consultant"]
+    suffixes = ["", " Pvt Ltd", " Private Limited", " Inc", " Inc.", " LLC", " Ltd"]
+    sites = ["https://www.indeed.com/viewjob?jk={id}&from=serp", "https://in.linkedin.com/jobs/view/{slug}-{id}?trk=guest",
+             "https://remoteok.com/remote-jobs/{id}-{slug}?utm_source=feed", "https://careers.example.com/{slug}/{id}"]
+    cities = [("Pune", "Maharashtra, India"), ("London", "England, United Kingdom"), ("Bangalore", "Karnataka, India"),
+              ("Austin", "TX, United States"), ("Berlin", "Germany")]
+    listings = []
+    for opening in range(openings):
+        if opening % 5 != 4:
+            # Three openings per company, for different stacks
+            company = f"{WORDS[opening // 3 % len(WORDS)].title()} {WORDS[opening // 78 % len(WORDS)].title()} {opening // 3}"
+            words = [rng.choice(seniority), tech[opening % len(tech)], rng.choice(role)]
+        city, region = cities[opening % len(cities)]
+        for copy in range(copies):
+            title = " ".join(words)
+            if copy % 4 == 1:
+                title = title.replace("Junior", "Jr.").replace("Developer", "Dev") + " (Remote)"
+            elif copy % 4 == 2:
+                title = f"{' '.join(words[1:])} - {words[0]} | Urgent Hiring"
+            elif copy % 4 == 3:
+                title = title.upper()
+            slug = title.lower().replace(" ", "-")
+            link = sites[copy % len(sites)].format(id=opening * 100 + copy, slug=slug)
+            location = [city, f"{city}, {region}", f"{city}, {region.split(', ')[-1]}"][copy % 3]
+            listings.append((opening, title, link, company + rng.choice(suffixes), location))
+    rng.shuffle(listings)
+    return listings
+
+
+def run_dedup(args):
+    rng = random.Random(5)
+    listings = make_listings(args.openings, args.copies, rng)
+    links = bot.DedupStore(None)
+    index = bot.NearDuplicateIndex(bot.DedupStore(None))
+    old_keys = set()
+    seen_openings = set()
+    false_merges = 0
+    started = time.perf_counter()
+    for opening, title, link, company, location in listings:
+        duplicate = bot.mark_job_seen(bot.Job("bench", title, link, location=location, company=company), links, index) is not None
+        if duplicate and opening not in seen_openings:
+            false_merges += 1
+        seen_openings.add(opening)
+        old_keys.add(f"{title}_{link}")
+    elapsed = time.perf_counter() - started
+    sent = len(links)
+    print(f"{len(listings)} listings of {args.openings} openings ({args.openings // 5} in a second city)")
+    print(f"messages per subscriber: {len(old_keys)} with title_link keys, {sent} now "
+          f"({sent / args.openings:.2f} per opening, {false_merges} openings wrongly merged)")
+    print(f"{elapsed / len(listings) * 1e6:.1f} us per job with canonicalisation and sketching")
+
+    # Lookup cost against a growing index: banded buckets vs. comparing with every sketch
+    print(f"{'index size':>12}{'banded us':>12}{'linear us':>12}")
+    for size in (1000, 10000, 100000):
+        sketches = [rng.getrandbits(64) for _ in range(size)]
+        index = bot.NearDuplicateIndex(bot.DedupStore(None))
+        for sketch in sketches:
+            index.add(sketch)
+        probes = [rng.getrandbits(64) for _ in range(200)]
+        banded = best_time(lambda: [index.find(probe) for probe in probes], 3) / len(probes)
+        similar = bot.NearDuplicateIndex.similar
+        linear = best_time(lambda: [next((s for s in sketches if similar(probe, s)), None) for probe in probes[:20]], 1) / 20
+        print(f"{size:>12}{banded * 1e6:>12.1f}{linear * 1e6:>12.1f}")
+
+
+# Paginated Indeed-style search results that keep getting new postings. Every poll is an
+# hour later: each query gains a random number of postings (around --arrivals, sometimes
+# several pages' worth), listed newest first with their age. Compares the old scraping of
+# page 1 of the first two queries with incremental crawling of every query.
+async def crawl_benchmark(args):
+    rng = random.Random(3)
+    queries = ["entry+level+developer", "junior+developer", "entry+level+data+analyst", "entry+level+tester"]
+    page_size = 10
+    postings = {query: [] for query in queries}  # query -> [(posting id, poll it appeared)], newest first
+    next_id = 0
+
+    def add_postings(query, count, poll):
+        nonlocal next_id
+        postings[query][:0] = [(next_id + n, poll) for n in range(count)]
+        next_id += count
+
+    poll = 0
+    requests = []
+
+    def handler(request):
+        params = parse_qs(request.url.query.decode())
+        listed = postings[params["q"][0].replace(" ", "+")]
+        start = int(params.get("start", ["0"])[0])
+        cards = "".join(bot_card(posting_id, f"{poll - appeared} hours ago")
+                        for posting_id, appeared in listed[start:start + page_size])
+        requests.append(request.url)
+        return httpx.Response(200, text=f"<html><body><ul>{cards}</ul></body></html>")
+
+    def bot_card(posting_id, date):
+        return make_card("indeed", posting_id, random.Random(posting_id), date)
+
+    def arrivals():
+        return rng.choice([0, 1, 2]) * args.arrivals if rng.random() < 0.9 else 4 * page_size
+
+    template = "https://www.indeed.com/jobs?q={query}&sort=date&fromage=7&start={offset}"
+    strategies = [
+        ("page 1 of 2 queries", queries[:2], 1),
+        ("incremental", queries, bot.CRAWL_MAX_PAGES),
+    ]
+    bot.http_client = bot.HttpClient(transport=httpx.MockTransport(handler))
+    results = {name: {"source": bot.JobSource("indeed", template, strategy_queries, bot.parse_indeed_page, rate=1000,
+                                              page_size=page_size),
+                      "marks": bot.CrawlMarks(None), "seen": set(), "requests": []}
+               for name, strategy_queries, _ in strategies}
+    for query in queries:
+        add_postings(query, 3 * page_size, 0)
+    for poll in range(args.polls):
+        if poll:
+            for query in queries:
+                add_postings(query, arrivals(), poll)
+        for name, _, max_pages in strategies:
+            result = results[name]
+            bot.page_cache = bot.PageCache()
+            bot.crawl_marks = result["marks"]
+            requests.clear()
+            jobs = await result["source"].fetch(max_pages=max_pages)
+            result["seen"].update(job.link for job in jobs)
+            result["requests"].append(len(requests))
+    await bot.http_client.close()
+
+    print(f"{args.polls} hourly polls of {len(queries)} queries, {next_id} postings")
+    print(f"{'strategy':<22}{'first poll':>12}{'req/poll after':>16}{'postings seen':>16}")
+    for name, result in results.items():
+        later = result["requests"][1:] or [0]
+        seen = len(result["seen"])
+        print(f"{name:<22}{result['requests'][0]:>12}{sum(later) / len(later):>16.1f}"
+              f"{seen:>9} ({seen / next_id:.0%})")
+
+
+def run_crawl(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(crawl_benchmark(args))
+
+
+# Stands in for the broadcaster: records when each batch of messages was queued
+class EnqueueRecorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.batches = []  # (seconds since start, messages)
+
+    def enqueue(self, messages, **kwargs):
+        self.batches.append((time.perf_counter() - self.started, len(messages)))
+        return len(messages)
+
+
+# A first poll of a multi-page source: every query crawled to --pages pages, each page
+# taking --fetch-latency to arrive. Compares handing the whole source to
+# send_jobs_to_users once it is fetched with streaming its jobs in as pages are parsed.
+async def stream_benchmark(args, streaming):
+    queries = ["entry+level+developer", "junior+developer", "entry+level+data+analyst", "entry+level+tester"]
+    page_size = 10
+
+    async def handler(request):
+        params = parse_qs(request.url.query.decode())
+        start = int(params.get("start", ["0"])[0])
+        query = queries.index(params["q"][0].replace(" ", "+"))
+        cards = "".join(make_card("indeed", query * 1000 + start + n, random.Random(query * 1000 + start + n),
+                                  f"{start + n} hours ago") for n in range(page_size))
+        await asyncio.sleep(args.fetch_latency / 1000)
+        return httpx.Response(200, text=f"<html><body><ul>{cards}</ul></body></html>")
+
+    bot.http_client = bot.HttpClient(transport=httpx.MockTransport(handler))
+    bot.page_cache = bot.PageCache()
+    bot.crawl_marks = bot.CrawlMarks(None)
+    bot.sent_jobs = bot.DedupStore(None)
+    bot.near_duplicates = bot.NearDuplicateIndex(bot.DedupStore(None))
+    bot.broadcaster = recorder = EnqueueRecorder()
+    source = bot.JobSource("indeed", "https://www.indeed.com/jobs?q={query}&sort=date&start={offset}", queries,
+                           bot.parse_indeed_page, rate=1000, page_size=page_size)
+
+    tracemalloc.start()
+    if streaming:
+        new_jobs = await bot.send_jobs_to_users(source.stream(max_pages=args.pages), "indeed")
+    else:
+        new_jobs = await bot.send_jobs_to_users(await source.fetch(max_pages=args.pages), "indeed")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    await bot.http_client.close()
+    return new_jobs, recorder.batches, peak
+
+
+def run_stream(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="bench-stream-")
+    bot.subscriber_store = bot.SubscriberStore(os.path.join(workdir, "subscribers.db"))
+    make_subscribers(args.subscribers, args.digest_share, random.Random(11))
+
+    print(f"4 queries x {args.pages} pages, {args.fetch_latency:g} ms per page, {args.subscribers} subscribers")
+    print(f"{'mode':<10}{'new jobs':>10}{'messages':>10}{'first ms':>10}{'last ms':>10}{'peak KB':>10}")
+    for mode, streaming in (("batch", False), ("stream", True)):
+        new_jobs, batches, peak = asyncio.run(stream_benchmark(args, streaming))
+        messages = sum(count for _, count in batches)
+        print(f"{mode:<10}{new_jobs:>10}{messages:>10}{batches[0][0] * 1000:>10.0f}{batches[-1][0] * 1000:>10.0f}"
+              f"{peak / 1024:>10.0f}")
+    bot.subscriber_store.close()
+
+
+# Percentile of a list of numbers (nearest rank)
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# Local stand-in for api.telegram.org. Understands the methods the bot calls, records
+# every sent message with the time it arrived and, like Telegram, answers sends beyond
+# global_rate messages/s overall or chat_rate messages/s per chat with 429 retry_after.
+class FakeBotApi:
+    def __init__(self, host="127.0.0.1", port=0, global_rate=None, chat_rate=None, latency=0.0):
+        self.host = host
+        self.port = port
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.latency = latency
+        self.messages = []  # (chat_id, text, arrival time)
+        self.calls = {}  # method -> count
+        self.retry_after_responses = 0
+        self.message_listeners = []  # Called with (chat_id, text, arrival time)
+        self._global_bucket = (global_rate, time.monotonic())
+        self._chat_buckets = {}
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                path = request_line.decode().split(" ")[1]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self.dispatch(path.rsplit("/", 1)[-1], self._params(headers, body))
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _params(headers, body):
+        if not body:
+            return {}
+        if headers.get("content-type", "").startswith("application/json"):
+            return json.loads(body)
+        return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+    # Take a token from a (tokens, updated) bucket; returns the new bucket and the seconds
+    # to wait if it was empty. Buckets hold a little burst, as Telegram tolerates one.
+    @staticmethod
+    def _take(bucket, rate, now):
+        tokens, updated = bucket
+        tokens = min(rate * 1.5, tokens + (now - updated) * rate)
+        if tokens < 1:
+            return (tokens, now), (1 - tokens) / rate
+        return (tokens - 1, now), 0.0
+
+    def _flood_wait(self, chat_id):
+        now = time.monotonic()
+        if self.chat_rate:
+            bucket = self._chat_buckets.get(chat_id, (self.chat_rate * 1.5, now))
+            self._chat_buckets[chat_id], wait = self._take(bucket, self.chat_rate, now)
+            if wait:
+                return wait
+        if self.global_rate:
+            self._global_bucket, wait = self._take(self._global_bucket, self.global_rate, now)
+            if wait:
+                return wait
+        return 0.0
+
+    async def dispatch(self, method, params):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}}
+        if method == "getUpdates":
+            await asyncio.sleep(min(1.0, float(params.get("timeout", 0))))
+            return 200, {"ok": True, "result": []}
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            wait = self._flood_wait(chat_id)
+            if wait:
+                self.retry_after_responses += 1
+                retry_after = max(1, math.ceil(wait))
+                return 429, {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {retry_after}",
+                             "parameters": {"retry_after": retry_after}}
+            text = params.get("text", "")
+            arrived = time.perf_counter()
+            self.messages.append((chat_id, text, arrived))
+            for listener in self.message_listeners:
+                listener(chat_id, text, arrived)
+            return 200, {"ok": True, "result": {"message_id": len(self.messages), "date": int(time.time()),
+                                                "chat": {"id": chat_id, "type": "private"}, "text": text}}
+        return 200, {"ok": True, "result": True}
+
+
+# Canned Custom Search responses keyed by the query strings the client sends. Loaded from
+# <fixtures>/google_cse.json when present, otherwise generated (and saved with --save-fixtures).
+def load_cse_fixture(args, results_per_query=5):
+    path = os.path.join(args.fixtures, "google_cse.json") if args.fixtures else None
+    if path and os.path.exists(path):
+        return path
+    client = bot.GoogleJobsClient(service=bot.StubCseService())
+    canned = {}
+    for query in client.queries:
+        sent = client.service.list(q=f"{query} posted today this week", num=results_per_query)
+        canned[f"{query} posted today this week"] = sent.execute()
+    directory = args.save_fixtures or tempfile.mkdtemp(prefix="bench-cse-")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "google_cse.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(canned, f)
+    return path
+
+
+# Serves the fixture page of whichever site a scraper requests, after `latency` seconds,
+# with an ETag per page and a 304 when the request's If-None-Match still matches it
+def replay_transport(pages, latency):
+    sleep = asyncio.sleep  # Bound now: the pipeline run scales the sources' rate limit waits
+    etags = {source: f'"{hashlib.blake2b(page.encode("utf-8"), digest_size=8).hexdigest()}"'
+             for source, page in pages.items()}
+
+    async def handler(request):
+        host, path = request.url.host, request.url.path
+        if "indeed" in host:
+            source = "indeed"
+        elif "remoteok" in host:
+            source = "remoteok"
+        elif "stackoverflow" in host:
+            source = "stackoverflow"
+        elif "internshala" in host:
+            source = "internshala"
+        elif "freshersworld" in host:
+            source = "freshersworld"
+        elif path.startswith("/jobs"):
+            source = "linkedin_jobs"
+        else:
+            source = "linkedin_posts"
+        if latency:
+            await sleep(latency)
+        if request.headers.get("If-None-Match") == etags[source]:
+            return httpx.Response(304, headers={"ETag": etags[source]})
+        return httpx.Response(200, text=pages[source],
+                              headers={"Content-Type": "text/html; charset=utf-8", "ETag": etags[source]})
+
+    return httpx.MockTransport(handler)
+
+
+# Synthetic subscribers: a mix of everything / one or two roles, job-by-job / digest,
+# and a few location or remote filters
+def make_subscribers(count, digest_share, rng):
+    roles = ["developer", "data analyst", "tester", "cybersecurity", "ui designer", "junior", "graduate", "trainee"]
+    for index in range(count):
+        user_id = 10_000 + index
+        prefs = {"roles": [], "location": None, "remote": False}
+        if rng.random() < 0.6:
+            prefs["roles"] = rng.sample(roles, rng.randint(1, 2))
+        if rng.random() < 0.1:
+            prefs["location"] = "India"
+        elif rng.random() < 0.1:
+            prefs["remote"] = True
+        bot.user_prefs[user_id] = prefs
+        if rng.random() < digest_share:
+            bot.delivery_modes[user_id] = "digest"
+        bot.subscribe_user(user_id)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Live captures for --fixtures and tests/test_extraction.py
+RECORDED_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+# Fetch the first result page of every enabled site through the bot's HTTP client and
+# save it as <source>.html. A page with no cards means the site's markup has moved away
+# from EXTRACTION_SPECS (or the request was served a block page), so the run fails.
+async def record_pages(out):
+    os.makedirs(out, exist_ok=True)
+    failed = []
+    print(f"{'source':<16}{'page KB':>9}{'cards':>7}{'jobs':>6}")
+    for name, source in bot.enabled_sources().items():
+        if not source.url_template or name not in bot.EXTRACTION_SPECS:
+            continue
+        try:
+            response = await bot.http_client.get(source.page_url(source.queries[0]), headers=source.headers,
+                                                 timeout=source.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"{name:<16}failed: {e}")
+            failed.append(name)
+            continue
+        html = response.text
+        with open(os.path.join(out, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        cards = bot.extract_cards(name, html)
+        print(f"{name:<16}{len(html) / 1024:>9.0f}{len(cards):>7}{len(source.parse(html)):>6}")
+        if not cards:
+            failed.append(name)
+    await bot.http_client.close()
+    return failed
+
+
+def run_record(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    failed = asyncio.run(record_pages(args.out))
+    if failed:
+        print(f"no cards recorded for: {', '.join(failed)}")
+        raise SystemExit(1)
+
+
+# Whole pipeline offline: every scraper reads fixture pages through the shared HTTP
+# client, Google answers from canned CSE JSON, and send_jobs_to_users delivers to a fake
+# Bot API that enforces Telegram's flood limits. Sources are checked with check_job_source
+# as the scheduler would; deliveries are held back until every source is scraped so the
+# scrape and delivery stages are timed separately.
+async def pipeline_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    pages = load_fixtures(args, args.cards)
+    cse_path = load_cse_fixture(args)
+
+    api = FakeBotApi(global_rate=args.api_rate, chat_rate=bot.TELEGRAM_CHAT_RATE, latency=args.api_latency / 1000)
+    await api.start()
+    bot.BOT_TOKEN = "123456:fake-token"
+    bot.TELEGRAM_API_URL = api.url
+    bot.http_client = bot.HttpClient(transport=replay_transport(pages, args.fetch_latency / 1000))
+    bot.page_cache = bot.PageCache()
+    bot.sent_jobs = bot.DedupStore(os.path.join(workdir, "sent_jobs.bin"))
+    bot.near_duplicates = bot.NearDuplicateIndex(bot.DedupStore(os.path.join(workdir, "near_duplicates.bin")))
+    bot.crawl_marks = bot.CrawlMarks(os.path.join(workdir, "crawl_marks.json"))
+    bot.subscriber_store = bot.SubscriberStore(os.path.join(workdir, "subscribers.db"))
+    bot.GOOGLE_CSE_STUB = cse_path
+    bot.google_client = bot.GoogleJobsClient(service=bot.StubCseService(cse_path))
+    bot.broadcaster = bot.Broadcaster(global_rate=args.rate, outbox=bot.Outbox(os.path.join(workdir, "outbox.db")),
+                                      on_delivered=bot.record_delivery, on_dead=bot.handle_dead_letter)
+    make_subscribers(args.subscribers, args.digest_share, random.Random(11))
+    sources = list(bot.enabled_sources())
+
+    handed_off = {}  # link -> when its batch reached send_jobs_to_users
+    latencies = []
+    link_pattern = re.compile(r"\[Apply Here\]\(([^)]+)\)")
+
+    def on_message(chat_id, text, arrived):
+        for link in link_pattern.findall(text):
+            latencies.append((arrived - handed_off[link.replace("\\", "")]) * 1000)
+
+    api.message_listeners.append(on_message)
+
+    # Stage 1: fetch, parse and match every source; batches are captured, not sent
+    batches = []
+    send_jobs_to_users = bot.send_jobs_to_users
+
+    async def capture(jobs, source="unknown"):
+        batches.append((source, [job async for job in bot.iterate_jobs(jobs)]))
+        return 0
+
+    sleep = asyncio.sleep
+
+    async def scaled_sleep(delay, *sleep_args, **sleep_kwargs):
+        return await sleep(delay * args.delay_scale, *sleep_args, **sleep_kwargs)
+
+    started = time.perf_counter()
+    with mock.patch.object(bot, "send_jobs_to_users", capture), mock.patch("asyncio.sleep", scaled_sleep):
+        await asyncio.gather(*(bot.check_job_source(name) for name in sources))
+    scrape_seconds = time.perf_counter() - started
+    jobs_parsed = sum(len(jobs) for _, jobs in batches)
+
+    # Stage 2: dedup, route, render and deliver each source's batch concurrently
+    async def deliver(source, jobs):
+        now = time.perf_counter()
+        for job in jobs:
+            handed_off.setdefault(job.link, now)
+        return await send_jobs_to_users(jobs, source)
+
+    started = time.perf_counter()
+    bot.broadcaster.start()
+    new_jobs = sum(await asyncio.gather(*(deliver(source, jobs) for source, jobs in batches)))
+    await bot.broadcaster.wait_idle()
+    delivery_seconds = time.perf_counter() - started
+
+    dead_letters = bot.broadcaster.outbox.counts()["dead"]
+    await bot.broadcaster.shutdown()
+    bot.broadcaster.outbox.close()
+    await bot.broadcaster.bot.shutdown()
+    await bot.http_client.close()
+    bot.google_client.close()
+    bot.subscriber_store.close()
+    await api.stop()
+
+    messages = len(api.messages)
+    return {
+        "subscribers": args.subscribers,
+        "jobs_parsed": jobs_parsed,
+        "new_jobs": new_jobs,
+        "messages": messages,
+        "deliveries": len(latencies),
+        "retry_after": api.retry_after_responses,
+        "dead_letters": dead_letters,
+        "scrape_seconds": round(scrape_seconds, 3),
+        "delivery_seconds": round(delivery_seconds, 3),
+        "jobs_per_second": round(jobs_parsed / scrape_seconds, 1),
+        "messages_per_second": round(messages / delivery_seconds, 1) if delivery_seconds else 0.0,
+        "min_delivery_seconds": round(messages / args.rate, 1),
+        "latency_p50_ms": round(percentile(latencies, 50), 1),
+        "latency_p99_ms": round(percentile(latencies, 99), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+# Metrics compared against a saved run; True when higher is better
+COMPARED_METRICS = {
+    "jobs_per_second": True,
+    "messages_per_second": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def compare_runs(baseline, current, tolerance):
+    regressions = []
+    print(f"{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        before, after = baseline.get(metric), current[metric]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:<22}{before:>12}{after:>12}{change * 100:>+9.1f}%{flag}")
+    return regressions
+
+
+def run_pipeline(args):
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    if args.rate is None:
+        args.rate = 0.9 * args.api_rate
+    results = asyncio.run(pipeline_benchmark(args))
+    for metric, value in results.items():
+        print(f"{metric:<22}{value:>12}")
+    if args.rate <= args.api_rate and results["retry_after"]:
+        print(f"\n{results['retry_after']} sends were answered 429 while sending below the API's limit")
+        raise SystemExit(1)
+    if args.metrics:
+        print()
+        print(bot.describe_metrics())
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        if compare_runs(baseline, results, args.tolerance):
+            raise SystemExit(1)
+
+
+# A Telegram update carrying a bot command from a private chat
+def command_update(update_id, chat_id, command):
+    return {"update_id": update_id,
+            "message": {"message_id": update_id, "date": int(time.time()), "text": command,
+                        "chat": {"id": chat_id, "type": "private"},
+                        "from": {"id": chat_id, "is_bot": False, "first_name": f"User {chat_id}"},
+                        "entities": [{"type": "bot_command", "offset": 0, "length": len(command.split()[0])}]}}
+
+
+# Run the bot in webhook mode against the fake Bot API and time command replies
+async def webhook_benchmark(args):
+    api = FakeBotApi()
+    await api.start()
+    bot.BOT_TOKEN = "123456:fake-token"
+    bot.TELEGRAM_API_URL = api.url
+    bot.UPDATE_CONCURRENCY = args.concurrency
+    app = bot.build_application()
+    secret = "benchmark-secret"
+    await app.initialize()
+    await app.updater.start_webhook(listen="127.0.0.1", port=args.port, url_path="telegram", secret_token=secret,
+                                    webhook_url=f"http://127.0.0.1:{args.port}/telegram")
+    await app.start()
+
+    replied = {}
+    api.message_listeners.append(lambda chat_id, text, arrived: replied.setdefault(chat_id, arrived))
+    webhook_url = f"http://127.0.0.1:{args.port}/telegram"
+    try:
+        async with httpx.AsyncClient() as client:
+            rejected = await client.post(webhook_url, json=command_update(0, 1, "/help"),
+                                         headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+            assert rejected.status_code == 403, "webhook accepted an update with the wrong secret"
+
+            posted = {}
+            started = time.perf_counter()
+
+            async def post(index):
+                chat_id = 1000 + index
+                posted[chat_id] = time.perf_counter()
+                await client.post(webhook_url, json=command_update(index + 1, chat_id, "/help"),
+                                  headers={"X-Telegram-Bot-Api-Secret-Token": secret})
+
+            await asyncio.gather(*(post(index) for index in range(args.updates)))
+            while len(replied) < args.updates and time.perf_counter() - started < 30:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - started
+    finally:
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await api.stop()
+
+    latencies = [(replied[chat_id] - posted[chat_id]) * 1000 for chat_id in posted if chat_id in replied]
+    print(f"{len(latencies)}/{args.updates} /help replies in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} updates/s, concurrency {args.concurrency})")
+    print(f"reply latency ms: p50 {percentile(latencies, 50):.1f}  p99 {percentile(latencies, 99):.1f}  "
+          f"max {max(latencies, default=0):.1f}")
+
+
+def run_webhook(args):
+    asyncio.run(webhook_benchmark(args))
+
+
+# Every fixture page fetched and parsed through fetch_jobs, `pages` at a time, with the
+# parsing on the event loop (0 workers) or in a PARSE_WORKERS process pool. A ticker
+# measures how late the loop runs a 10 ms timer while pages are parsed, which is how late
+# command replies and sends would be.
+async def parse_benchmark(args, workers, pages):
+    bot.PARSE_WORKERS = workers
+    bot.parse_pool = None
+    bot.page_cache = bot.PageCache()
+    sources = list(pages)
+    parsers = {source: bot.SOURCE_REGISTRY[source].parse for source in sources}
+    urls = {source: bot.SOURCE_REGISTRY[source].page_url(bot.SOURCE_REGISTRY[source].queries[0]) for source in sources}
+    bot.http_client = bot.HttpClient(transport=replay_transport(pages, 0))
+    if workers:
+        # Start every worker (and its imports) before timing
+        pool = bot.get_parse_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, bot.parse_in_worker, source, parsers[source], "")
+                               for source in sources * workers))
+
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            expected = loop.time() + 0.01
+            await asyncio.sleep(0.01)
+            lags.append((loop.time() - expected) * 1000)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    requests = [(sources[index % len(sources)], index) for index in range(args.pages)]
+    jobs = await asyncio.gather(*(bot.fetch_jobs(source, f"{urls[source]}&n={index}", parsers[source])
+                                  for source, index in requests))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    await bot.http_client.close()
+    if bot.parse_pool:
+        bot.parse_pool.shutdown()
+    return elapsed, sum(len(page_jobs) for page_jobs in jobs), lags
+
+
+def run_parse(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    pages = {source: html for source, html in load_fixtures(args).items() if source in bot.SOURCE_REGISTRY}
+    print(f"{os.cpu_count()} CPUs, {args.pages} pages")
+    print(f"{'workers':>8}{'pages/s':>10}{'jobs':>7}{'loop lag p50 ms':>17}{'p99 ms':>9}{'max ms':>9}")
+    for workers in args.workers:
+        elapsed, jobs, lags = asyncio.run(parse_benchmark(args, workers, pages))
+        print(f"{workers:>8}{args.pages / elapsed:>10.1f}{jobs:>7}{percentile(lags, 50):>17.1f}"
+              f"{percentile(lags, 99):>9.1f}{max(lags, default=0):>9.1f}")
+
+
+# Sharded delivery: this process is worker 0 and runs bot.py as workers 1..N-1, all on one
+# outbox and one fake Bot API. Every chat must get each of its messages exactly once, in order.
+async def shards_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="bench-shards-")
+    outbox_path = os.path.join(workdir, "outbox.db")
+    api = FakeBotApi(global_rate=bot.TELEGRAM_GLOBAL_RATE, chat_rate=bot.TELEGRAM_CHAT_RATE)
+    await api.start()
+    bot.BOT_TOKEN = "123456:fake-token"
+    bot.TELEGRAM_API_URL = api.url
+    broadcaster = bot.Broadcaster(global_rate=bot.TELEGRAM_GLOBAL_RATE / args.workers,
+                                  outbox=bot.Outbox(outbox_path, 0, args.workers))
+    # Private chats have positive IDs, groups negative ones
+    chats = [10_000 + index if index % 5 else -100_000 - index for index in range(args.chats)]
+    expected = [(chat_id, f"message {number} for {chat_id}") for number in range(args.messages) for chat_id in chats]
+    broadcaster.enqueue(expected)
+
+    env = dict(os.environ, TELEGRAM_BOT_TOKEN=bot.BOT_TOKEN, TELEGRAM_API_URL=api.url, OUTBOX_DB=outbox_path,
+               SUBSCRIBERS_DB=os.path.join(workdir, "subscribers.db"), WORKER_COUNT=str(args.workers))
+    started = time.perf_counter()
+    workers = [subprocess.Popen([sys.executable, os.path.abspath(bot.__file__)], cwd=workdir,
+                                env=dict(env, WORKER_INDEX=str(index)), stderr=subprocess.DEVNULL)
+               for index in range(1, args.workers)]
+    broadcaster.start()
+    while len(api.messages) < len(expected) and time.perf_counter() - started < args.timeout:
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    # Give a duplicate the chance to show up before stopping
+    await asyncio.sleep(2 * bot.OUTBOX_POLL_INTERVAL)
+    for worker in workers:
+        worker.send_signal(signal.SIGTERM)
+    for worker in workers:
+        worker.wait(timeout=30)
+    await broadcaster.shutdown()
+    await broadcaster.bot.shutdown()
+    counts = broadcaster.outbox.counts()
+    broadcaster.outbox.close()
+    await api.stop()
+
+    received = [(chat_id, text) for chat_id, text, _ in api.messages]
+    unique = set(received)
+    per_chat = {}
+    for chat_id, text in received:
+        per_chat.setdefault(chat_id, []).append(text)
+    in_order = all(texts == [text for chat_id, text in expected if chat_id == chat] for chat, texts in per_chat.items())
+    per_worker = [sum(1 for chat_id, _ in unique if chat_id % args.workers == index) for index in range(args.workers)]
+    print(f"{args.workers} workers, {len(chats)} chats, {len(expected)} messages queued")
+    print(f"delivered {len(unique)} in {elapsed:.1f}s ({len(unique) / elapsed:.1f} messages/s), "
+          f"{len(received) - len(unique)} duplicates, {len(set(expected) - unique)} missing, "
+          f"{'in order' if in_order else 'OUT OF ORDER'}")
+    print(f"per worker: {per_worker}, {api.retry_after_responses} retry_after, left in outbox: {counts}")
+    return len(received) == len(unique) == len(expected) and in_order
+
+
+def run_shards(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    if not asyncio.run(shards_benchmark(args)):
+        sys.exit(1)
+
+
+# Stands in for a /jobs update: records the bot's direct replies
+def jobs_update(chat_id):
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), message=SimpleNamespace(reply_text=reply_text),
+                           replies=replies)
+
+
+# Every /jobs call scrapes for itself, as before the shared cache
+class UncachedResults:
+    async def get(self, key, fetch):
+        return await fetch()
+
+
+# Waves of users sending /jobs at the same moment against the fixture sites: a cold one,
+# one after the results went stale (served at once, refreshed in the background) and one
+# while they are fresh. Latency is until a user's jobs are queued or the reply is sent.
+async def jobs_benchmark(args, cache):
+    bot.page_cache = bot.PageCache()
+    bot.jobs_cache = cache
+    results = []
+    for wave in ("cold", "stale", "fresh"):
+        if wave == "stale":
+            await asyncio.sleep(args.ttl)
+        requests_before = sum(stats["requests"] for stats in bot.page_cache.stats.values())
+        latencies = []
+
+        async def user(chat_id):
+            started = time.perf_counter()
+            await bot.force_job_check(jobs_update(chat_id), None)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(user(10_000 + index) for index in range(args.users)))
+        # Let the background refresh finish so the next wave sees fresh results
+        await asyncio.gather(*getattr(cache, "_fetches", {}).values())
+        requests = sum(stats["requests"] for stats in bot.page_cache.stats.values()) - requests_before
+        results.append((wave, requests, percentile(latencies, 50), max(latencies)))
+    return results
+
+
+def run_jobs(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="bench-jobs-")
+    pages = load_fixtures(args)
+    bot.http_client = bot.HttpClient(transport=replay_transport(pages, args.fetch_latency / 1000))
+    bot.subscriber_store = bot.SubscriberStore(os.path.join(workdir, "subscribers.db"))
+    bot.broadcaster = bot.Broadcaster(outbox=bot.Outbox(os.path.join(workdir, "outbox.db")))
+    bot.sent_jobs = bot.DedupStore(None)
+    bot.near_duplicates = bot.NearDuplicateIndex(bot.DedupStore(None))
+    bot.crawl_marks = bot.CrawlMarks(None)
+    for index in range(args.users):
+        bot.subscribe_user(10_000 + index)
+    sources = list(bot.enabled_sources())
+
+    print(f"{args.users} users per wave, {len(sources)} sources, {args.fetch_latency:g} ms per page, "
+          f"{bot.JOBS_DEADLINE:g}s deadline")
+    print(f"{'mode':<10}{'wave':<7}{'requests':>10}{'p50 ms':>10}{'max ms':>10}")
+    for mode, cache in (("no cache", UncachedResults()), ("cache", bot.ResultCache(ttl=args.ttl, stale=bot.JOBS_CACHE_STALE))):
+        for wave, requests, p50, slowest in asyncio.run(jobs_benchmark(args, cache)):
+            print(f"{mode:<10}{wave:<7}{requests:>10}{p50:>10.0f}{slowest:>10.0f}")
+    bot.subscriber_store.close()
+    bot.broadcaster.outbox.close()
+
+
+# Commands while a broadcast is in flight: the bot runs in webhook mode against a fake Bot
+# API enforcing Telegram's flood limits, send_jobs_to_users queues --jobs new jobs for
+# --subscribers users, and /start, /stop, /status and /help arrive from other chats at
+# --command-rate a second. Once the broadcast is queued, --jobs-users subscribers also
+# send /jobs. Command latency is from posting the update to the reply reaching the API.
+# "one budget" is the previous setup: replies and broadcasts share Telegram's rate and the
+# broadcast is written to the outbox in a single transaction.
+async def lanes_benchmark(args, interactive_rate, enqueue_chunk):
+    bot.OUTBOX_ENQUEUE_CHUNK = enqueue_chunk
+    workdir = tempfile.mkdtemp(prefix="bench-lanes-")
+    api = FakeBotApi(global_rate=bot.TELEGRAM_GLOBAL_RATE, chat_rate=bot.TELEGRAM_CHAT_RATE, latency=args.api_latency / 1000)
+    await api.start()
+    bot.BOT_TOKEN = "123456:fake-token"
+    bot.TELEGRAM_API_URL = api.url
+    bot.http_client = bot.HttpClient(transport=replay_transport(load_fixtures(args), args.fetch_latency / 1000))
+    bot.page_cache = bot.PageCache()
+    bot.jobs_cache = bot.ResultCache()
+    bot.crawl_marks = bot.CrawlMarks(None)
+    bot.sent_jobs = bot.DedupStore(None)
+    bot.near_duplicates = bot.NearDuplicateIndex(bot.DedupStore(None))
+    bot.subscriber_store = bot.SubscriberStore(os.path.join(workdir, "subscribers.db"))
+    bot.subscribed_users.clear()
+    bot.user_prefs.clear()
+    bot.delivery_modes.clear()
+    bot.subscriber_index = bot.SubscriberIndex()
+    make_subscribers(args.subscribers, 0.0, random.Random(11))
+    bot.broadcaster = bot.Broadcaster(global_rate=bot.TELEGRAM_GLOBAL_RATE - interactive_rate, interactive_rate=interactive_rate,
+                                      outbox=bot.Outbox(os.path.join(workdir, "outbox.db")),
+                                      on_delivered=bot.record_delivery, on_dead=bot.handle_dead_letter)
+    app = bot.build_application()
+    secret = "benchmark-secret"
+    await app.initialize()
+    await app.updater.start_webhook(listen="127.0.0.1", port=args.port, url_path="telegram", secret_token=secret,
+                                    webhook_url=f"http://127.0.0.1:{args.port}/telegram")
+    await app.start()
+    bot.broadcaster.start()
+
+    arrivals = {}  # chat_id -> [(arrival time, text)]
+    api.message_listeners.append(lambda chat_id, text, arrived: arrivals.setdefault(chat_id, []).append((arrived, text)))
+    jobs = [bot.Job("bench", f"Junior Software Developer {n}", f"https://example.com/jobs/{n}", company=f"Company {n}")
+            for n in range(args.jobs)]
+    commands = ["/help", "/status", "/start", "/stop"]
+    posted = {}  # chat_id -> when its command was posted
+    jobs_posted = {}
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient() as client:
+            update_ids = iter(range(1, 1_000_000))
+
+            async def post(chat_id, command):
+                await client.post(f"http://127.0.0.1:{args.port}/telegram", json=command_update(next(update_ids), chat_id, command),
+                                  headers={"X-Telegram-Bot-Api-Secret-Token": secret})
+
+            async def send_commands():
+                posts = []
+                for index in range(int(args.seconds * args.command_rate)):
+                    await asyncio.sleep(max(0.0, started + index / args.command_rate - time.perf_counter()))
+                    chat_id = 1000 + index
+                    posted[chat_id] = time.perf_counter()
+                    posts.append(asyncio.create_task(post(chat_id, commands[index % len(commands)])))
+                await asyncio.gather(*posts)
+
+            async def broadcast():
+                new_jobs = await bot.send_jobs_to_users(jobs, "bench")
+                queued = bot.broadcaster.outbox.counts()["pending"]
+                # Subscribed after the broadcast is routed, so their first results come from /jobs
+                for index in range(args.jobs_users):
+                    chat_id = 500 + index
+                    bot.subscribe_user(chat_id)
+                    jobs_posted[chat_id] = time.perf_counter()
+                    await post(chat_id, "/jobs")
+                return new_jobs, queued, time.perf_counter() - started
+
+            (new_jobs, queued, queued_after), _ = await asyncio.gather(broadcast(), send_commands())
+            deadline = time.perf_counter() + args.grace
+            while time.perf_counter() < deadline and not all(chat_id in arrivals for chat_id in posted):
+                await asyncio.sleep(0.05)
+            ended = time.perf_counter()
+    finally:
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await bot.broadcaster.shutdown()
+        bot.broadcaster.outbox.close()
+        await bot.broadcaster.bot.shutdown()
+        await bot.http_client.close()
+        bot.subscriber_store.close()
+        await api.stop()
+
+    latencies = [(arrivals[chat_id][0][0] - posted[chat_id]) * 1000 for chat_id in posted if chat_id in arrivals]
+    first_results = [min(arrived for arrived, text in arrivals.get(chat_id, []) if "Apply Here" in text) - jobs_posted[chat_id]
+                     for chat_id in jobs_posted if any("Apply Here" in text for _, text in arrivals.get(chat_id, []))]
+    # Bulk messages still arriving while the run shuts down are not part of the rate
+    bulk_sent = sum(1 for chat_id, messages in arrivals.items() if chat_id >= 10_000
+                    for arrived, _ in messages if arrived <= ended)
+    return {
+        "new_jobs": new_jobs,
+        "queued": queued,
+        "queued_after": queued_after,
+        "commands": len(posted),
+        "replied": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "jobs_results": len(first_results),
+        "jobs_first": max(first_results, default=0.0),
+        "bulk_per_second": bulk_sent / (ended - started),
+        "retry_after": api.retry_after_responses,
+    }
+
+
+def run_lanes(args):
+    logging.getLogger().setLevel(logging.CRITICAL)
+    print(f"{args.subscribers} subscribers, {args.jobs} new jobs, {args.command_rate:g} commands/s for {args.seconds:g}s, "
+          f"{args.jobs_users} /jobs users, Telegram limit {bot.TELEGRAM_GLOBAL_RATE:g}/s")
+    print(f"{'mode':<12}{'replied':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'/jobs first s':>15}"
+          f"{'bulk/s':>8}{'429s':>6}")
+    modes = (("one budget", 0.0, sys.maxsize), ("lanes", bot.TELEGRAM_INTERACTIVE_RATE, bot.OUTBOX_ENQUEUE_CHUNK))
+    for mode, interactive_rate, enqueue_chunk in modes:
+        result = asyncio.run(lanes_benchmark(args, interactive_rate, enqueue_chunk))
+        print(f"{mode:<12}{result['replied']:>6}/{result['commands']:<3}{result['p50']:>9.0f}{result['p99']:>9.0f}"
+              f"{result['max']:>9.0f}{result['jobs_first']:>8.1f} ({result['jobs_results']}/{args.jobs_users})"
+              f"{result['bulk_per_second']:>8.1f}{result['retry_after']:>6}")
+    print(f"broadcast: {result['new_jobs']} jobs, {result['queued']} messages queued in {result['queued_after']:.1f}s")
+
+
+# Runs in a fresh interpreter for every cold start: import bot, load the state main() loads,
+# build the application, then fetch and parse the first page of the first poll from a
+# fixture. Times are from interpreter start; --eager imports the heavy modules first, the
+# way bot.py used to.
+STARTUP_PROBE = """
+import asyncio, json, resource, sys, time
+eager, fixture, process_started = sys.argv[1] == "1", sys.argv[2], float(sys.argv[3])
+
+def mark():
+    return {"ms": (time.time() - process_started) * 1000, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+if eager:
+    import bs4, googleapiclient.discovery, telegram.ext
+import bot
+import httpx
+imported = mark()
+bot.load_users()
+bot.sent_jobs.load()
+bot.near_duplicates.load()
+bot.crawl_marks.load()
+bot.build_application()
+ready = mark()
+
+with open(fixture, encoding="utf-8") as f:
+    html = f.read()
+bot.http_client = bot.HttpClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=html)))
+source = bot.SOURCE_REGISTRY["indeed"]
+jobs = asyncio.run(source.fetch_page(source.page_url(source.queries[0])))
+first_page = mark()
+print(json.dumps({"import": imported, "ready": ready, "first_page": first_page, "jobs": len(jobs),
+                  "heavy_modules": sorted(m for m in ("bs4", "googleapiclient", "telegram.ext", "tornado") if m in sys.modules)}))
+"""
+
+
+def run_startup(args):
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    fixture = os.path.join(workdir, "indeed.html")
+    with open(fixture, "w", encoding="utf-8") as f:
+        f.write(make_page("indeed", random.Random(7)))
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("GOOGLE_API_KEY", "GOOGLE_CSE_ID", "GOOGLE_CSE_STUB", "JOB_SOURCES")}
+    env["TELEGRAM_BOT_TOKEN"] = "123456:fake-token"
+    env["PYTHONPATH"] = os.path.dirname(os.path.abspath(bot.__file__))
+
+    print(f"{'startup':<8}{'import ms':>11}{'ready ms':>10}{'first page ms':>15}{'RSS import MB':>15}"
+          f"{'RSS page MB':>13}  heavy modules at first page")
+    for mode in ("eager", "lazy"):
+        runs = []
+        for _ in range(args.runs):
+            # Each run gets empty state files, as on a fresh deploy
+            rundir = tempfile.mkdtemp(dir=workdir)
+            output = subprocess.run([sys.executable, "-c", STARTUP_PROBE, "1" if mode == "eager" else "0", fixture,
+                                     repr(time.time())], cwd=rundir, env=env, capture_output=True, text=True, check=True)
+            runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+        def median(stage, key):
+            return statistics.median(run[stage][key] for run in runs)
+
+        print(f"{mode:<8}{median('import', 'ms'):>11.0f}{median('ready', 'ms'):>10.0f}{median('first_page', 'ms'):>15.0f}"
+              f"{median('import', 'rss_mb'):>15.1f}{median('first_page', 'rss_mb'):>13.1f}  {', '.join(runs[-1]['heavy_modules'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    matcher_parser = subparsers.add_parser("matcher", help="role matcher vs. substring loops")
+    matcher_parser.add_argument("--titles", type=int, default=20000)
+    matcher_parser.add_argument("--posts", type=int, default=2000)
+    matcher_parser.add_argument("--repeat", type=int, default=5)
+    matcher_parser.set_defaults(func=run_matcher)
+
+    extract_parser = subparsers.add_parser("extract", help="card extraction vs. full-page parsing")
+    extract_parser.add_argument("--fixtures", help="directory with saved <source>.html pages")
+    extract_parser.add_argument("--save-fixtures", help="write the pages used to this directory")
+    extract_parser.add_argument("--repeat", type=int, default=3)
+    extract_parser.set_defaults(func=run_extract)
+
+    cse_parser = subparsers.add_parser("cse", help="Google query planner over a simulated day")
+    cse_parser.add_argument("--interval", type=float, default=300, help="seconds between Google checks")
+    cse_parser.add_argument("--quota", type=int, default=bot.GOOGLE_CSE_DAILY_QUOTA)
+    cse_parser.set_defaults(func=run_cse)
+
+    dedup_parser = subparsers.add_parser("dedup", help="cross-source near-duplicate detection")
+    dedup_parser.add_argument("--openings", type=int, default=2000)
+    dedup_parser.add_argument("--copies", type=int, default=4, help="listings per opening")
+    dedup_parser.set_defaults(func=run_dedup)
+
+    crawl_parser = subparsers.add_parser("crawl", help="incremental pagination vs. first pages only")
+    crawl_parser.add_argument("--polls", type=int, default=48)
+    crawl_parser.add_argument("--arrivals", type=int, default=3, help="typical new postings per query and poll")
+    crawl_parser.set_defaults(func=run_crawl)
+
+    stream_parser = subparsers.add_parser("stream", help="delivering a source as it is crawled vs. once fetched")
+    stream_parser.add_argument("--pages", type=int, default=5, help="pages crawled per query")
+    stream_parser.add_argument("--fetch-latency", type=float, default=300, help="ms per page fetch")
+    stream_parser.add_argument("--subscribers", type=int, default=1000)
+    stream_parser.add_argument("--digest-share", type=float, default=0.2, help="fraction of subscribers on digests")
+    stream_parser.set_defaults(func=run_stream)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="offline end-to-end run: fixtures -> fake Bot API")
+    pipeline_parser.add_argument("--subscribers", type=int, default=100)
+    pipeline_parser.add_argument("--digest-share", type=float, default=0.3, help="fraction of subscribers in digest mode")
+    pipeline_parser.add_argument("--cards", type=int, default=25, help="job cards per generated page")
+    pipeline_parser.add_argument("--fixtures", help="directory with saved <source>.html pages and google_cse.json")
+    pipeline_parser.add_argument("--save-fixtures", help="write the pages and CSE responses used to this directory")
+    pipeline_parser.add_argument("--rate", type=float, help="broadcaster messages/s (default: 90%% of --api-rate)")
+    pipeline_parser.add_argument("--api-rate", type=float, default=bot.TELEGRAM_GLOBAL_RATE,
+                                 help="fake API flood limit, messages/s")
+    pipeline_parser.add_argument("--api-latency", type=float, default=5, help="fake API response time, ms")
+    pipeline_parser.add_argument("--fetch-latency", type=float, default=50, help="fixture page response time, ms")
+    pipeline_parser.add_argument("--delay-scale", type=float, default=0, help="scale the waits between requests to one source")
+    pipeline_parser.add_argument("--save", help="write the results as JSON")
+    pipeline_parser.add_argument("--compare", help="compare with results saved by --save")
+    pipeline_parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    pipeline_parser.add_argument("--verbose", action="store_true", help="keep the bot's INFO logging")
+    pipeline_parser.add_argument("--metrics", action="store_true", help="print the bot's pipeline metrics afterwards")
+    pipeline_parser.set_defaults(func=run_pipeline)
+
+    record_parser = subparsers.add_parser("record", help="save one live result page per enabled site")
+    record_parser.add_argument("--out", default=RECORDED_FIXTURES, help="directory for the <source>.html pages")
+    record_parser.set_defaults(func=run_record)
+
+    webhook_parser = subparsers.add_parser("webhook", help="webhook command latency against a fake Bot API")
+    webhook_parser.add_argument("--updates", type=int, default=200)
+    webhook_parser.add_argument("--concurrency", type=int, default=bot.UPDATE_CONCURRENCY)
+    webhook_parser.add_argument("--port", type=int, default=8765)
+    webhook_parser.set_defaults(func=run_webhook)
+
+    startup_parser = subparsers.add_parser("startup", help="cold start: import time, time to first page and RSS")
+    startup_parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    startup_parser.set_defaults(func=run_startup)
+
+    parse_parser = subparsers.add_parser("parse", help="page parsing on the event loop vs. a process pool")
+    parse_parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="PARSE_WORKERS values to run")
+    parse_parser.add_argument("--pages", type=int, default=40)
+    parse_parser.add_argument("--fixtures", help="directory with saved <source>.html pages")
+    parse_parser.add_argument("--save-fixtures", help="write the pages used to this directory")
+    parse_parser.set_defaults(func=run_parse)
+
+    shards_parser = subparsers.add_parser("shards", help="delivery split over worker processes by chat ID")
+    shards_parser.add_argument("--workers", type=int, default=3)
+    shards_parser.add_argument("--chats", type=int, default=200)
+    shards_parser.add_argument("--messages", type=int, default=2, help="messages per chat")
+    shards_parser.add_argument("--timeout", type=float, default=120)
+    shards_parser.set_defaults(func=run_shards)
+
+    jobs_parser = subparsers.add_parser("jobs", help="concurrent /jobs calls with and without the shared cache")
+    jobs_parser.add_argument("--users", type=int, default=10, help="users sending /jobs in each wave")
+    jobs_parser.add_argument("--ttl", type=float, default=15, help="cache TTL for the run, seconds")
+    jobs_parser.add_argument("--fetch-latency", type=float, default=200, help="fixture page response time, ms")
+    jobs_parser.add_argument("--fixtures", help="directory with saved <source>.html pages")
+    jobs_parser.add_argument("--save-fixtures", help="write the pages used to this directory")
+    jobs_parser.set_defaults(func=run_jobs)
+
+    lanes_parser = subparsers.add_parser("lanes", help="command latency while a broadcast is in flight")
+    lanes_parser.add_argument("--subscribers", type=int, default=3000)
+    lanes_parser.add_argument("--jobs", type=int, default=20, help="new jobs in the broadcast")
+    lanes_parser.add_argument("--command-rate", type=float, default=4, help="commands per second from other chats")
+    lanes_parser.add_argument("--seconds", type=float, default=20, help="how long commands keep arriving")
+    lanes_parser.add_argument("--jobs-users", type=int, default=3, help="subscribers sending /jobs mid-broadcast")
+    lanes_parser.add_argument("--grace", type=float, default=10, help="seconds to wait for the last replies")
+    lanes_parser.add_argument("--api-latency", type=float, default=20, help="fake Bot API response time, ms")
+    lanes_parser.add_argument("--fetch-latency", type=float, default=200, help="fixture page response time, ms")
+    lanes_parser.add_argument("--port", type=int, default=8765)
+    lanes_parser.add_argument("--fixtures", help="directory with saved <source>.html pages")
+    lanes_parser.add_argument("--save-fixtures", help="write the pages used to this directory")
+    lanes_parser.set_defaults(func=run_lanes)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
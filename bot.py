@@ -1,17 +1,37 @@
+from __future__ import annotations  # Handler annotations name telegram.ext types, which load lazily
+
 import os
-import requests
-from bs4 import BeautifulSoup
+import httpx
 from telegram import Bot, Update
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
-from apscheduler.schedulers.background import BackgroundScheduler
+from telegram.error import BadRequest, ChatMigrated, Forbidden, InvalidToken, RetryAfter
+from telegram.helpers import escape_markdown
+from telegram.request import HTTPXRequest
 import asyncio
 import nest_asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import json
-from googleapiclient.discovery import build
+import threading
 import re
 import time
+import importlib.util
+import random
+import signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import bisect
+import struct
+import sqlite3
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING
+
+# bs4, googleapiclient and telegram.ext are imported where first needed: most of a cold start
+# is spent importing them, and the Google client isn't needed at all without an API key.
+if TYPE_CHECKING:
+    from telegram.ext import ContextTypes
 
 # Configure logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -24,16 +44,124 @@ nest_asyncio.apply()
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")  # Alternative Bot API server, e.g. a local fake one for testing
+GOOGLE_CSE_STUB = os.getenv("GOOGLE_CSE_STUB")  # "1" or a path to canned JSON: use an offline stub instead of the API
 LINKEDIN_USERNAME = os.getenv("LINKEDIN_USERNAME")
 LINKEDIN_PASSWORD = os.getenv("LINKEDIN_PASSWORD")
 
-# File to store user data
+# Database of subscribers; USERS_FILE is only read once to migrate old installs
+SUBSCRIBERS_DB = os.getenv("SUBSCRIBERS_DB", "subscribers.db")
+OUTBOX_DB = os.getenv("OUTBOX_DB", SUBSCRIBERS_DB)
 USERS_FILE = "users.json"
+GROUP_COMMIT_DELAY = 0.5  # Seconds subscriber changes wait so bursts share one transaction
+
+# File to store fingerprints of jobs already sent
+SENT_JOBS_FILE = "sent_jobs.bin"
+NEAR_DUPLICATES_FILE = "near_duplicates.bin"  # Company/title sketches of sent jobs
+
+# Only jobs from the last week are considered, so fingerprints are kept for as long
+RECENCY_DAYS = 7
+
+# Incremental crawling: each (source, query) remembers the newest postings it has seen, and
+# later pages are only fetched until those are reached
+CRAWL_MARKS_FILE = "crawl_marks.json"
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "5"))  # Pages per query when no seen posting turns up
+CRAWL_MARK_LINKS = 50  # Newest links remembered per query
+STREAM_QUEUE_SIZE = 200  # Parsed jobs buffered between a source and the delivery pipeline
+
+# Webhook mode: when WEBHOOK_URL (the public https base URL) is set, updates arrive through
+# an embedded HTTP server instead of long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT") or os.getenv("PORT") or "8443")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "16"))  # Updates handled at the same time
+
+# Delivery modes: "job" sends one message per job, "digest" packs many jobs per message
+DEFAULT_DELIVERY_MODE = os.getenv("DEFAULT_DELIVERY_MODE", "job")
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Shared HTTP settings for all scrapers
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))  # Concurrent requests across all hosts
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "2"))  # Concurrent requests to a single host
+
+# Telegram flood limits used by the broadcast engine
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # Messages per second across all chats
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # Messages per second to one chat
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "30"))  # Sends in flight at once
+# Share of the global rate kept for command replies and /jobs results; 0 puts them on the bulk budget
+TELEGRAM_INTERACTIVE_RATE = float(os.getenv("TELEGRAM_INTERACTIVE_RATE", "5"))
+INTERACTIVE_CONCURRENCY = int(os.getenv("INTERACTIVE_CONCURRENCY", "4"))  # Interactive sends in flight at once
+
+# Outbound queue: failed sends are retried with exponential backoff, then dead-lettered
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_BACKOFF = 5.0  # Seconds before the first retry; doubles with every attempt
+OUTBOX_MAX_BACKOFF = 3600.0
+OUTBOX_BATCH = 500  # Messages claimed from the database at a time
+OUTBOX_POLL_INTERVAL = 2.0  # Seconds between checks for due retries
+OUTBOX_ENQUEUE_CHUNK = 1000  # Messages written per transaction before yielding to the event loop
+PRIORITY_BULK = 0  # Outbox lanes: broadcasts...
+PRIORITY_INTERACTIVE = 1  # ...and answers to a user's own command, which go first
+
+# lxml is a much faster backend than the stdlib parser; use it when it's installed
+HTML_PARSER = os.getenv("HTML_PARSER") or ("lxml" if importlib.util.find_spec("lxml") else "html.parser")
+
+# Adaptive polling: each source's interval moves between these bounds (seconds) based on
+# how many new jobs it yields, how often it fails and how slow it is. The budget caps
+# total polls per hour across all sources (the old rotation made 60).
+POLL_BASE_INTERVAL = int(os.getenv("POLL_BASE_INTERVAL", "300"))
+POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", "60"))
+POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", "3600"))
+POLL_BUDGET_PER_HOUR = int(os.getenv("POLL_BUDGET_PER_HOUR", "60"))
+POLL_TARGET_NEW_JOBS = 2.0  # New jobs per poll a source is steered towards
+POLL_SLOW_LATENCY = 10.0  # Seconds; slower polls raise a source's minimum interval
+
+# Google Custom Search quota planning
+GOOGLE_CSE_DAILY_QUOTA = int(os.getenv("GOOGLE_CSE_DAILY_QUOTA", "100"))  # Free tier allows 100 queries a day
+GOOGLE_CSE_MAX_QUERIES_PER_CHECK = int(os.getenv("GOOGLE_CSE_MAX_QUERIES_PER_CHECK", "3"))
+GOOGLE_CSE_WORKERS = int(os.getenv("GOOGLE_CSE_WORKERS", "2"))
+
+# Job sources to poll, comma-separated (default: every source enabled in the registry)
+JOB_SOURCES = os.getenv("JOB_SOURCES")
+
+# Circuit breakers: a source is skipped after this many failed requests in a row, then
+# probed again after the cooldown, which doubles after every failed probe
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "300"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "21600"))
+
+# Scaling out. PARSE_WORKERS > 0 parses and matches result pages in that many processes
+# instead of on the event loop. WORKER_COUNT processes (WORKER_INDEX 0 .. WORKER_COUNT-1)
+# share the outbox and subscriber database: worker 0 scrapes, answers commands and queues
+# every message, and each worker sends the messages of the chats in its shard.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", "0"))
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))
+
+# Seconds /jobs waits for all sources before reporting the slow ones
+JOBS_DEADLINE = float(os.getenv("JOBS_DEADLINE", "25"))
+# /jobs results are shared by all users: served as they are for JOBS_CACHE_TTL seconds, then
+# served while being refreshed in the background until JOBS_CACHE_STALE seconds old
+JOBS_CACHE_TTL = float(os.getenv("JOBS_CACHE_TTL", "120"))
+JOBS_CACHE_STALE = float(os.getenv("JOBS_CACHE_STALE", "900"))
+
+# Prometheus metrics endpoint (0 = disabled) and the chats that see the detailed /status
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "0.0.0.0")
+ADMIN_IDS = {int(chat_id) for chat_id in os.getenv("ADMIN_IDS", "").replace(",", " ").split()}
 
 # Global variables
-sent_jobs = set()
 scheduler = None
+metrics_server = None
+parse_pool = None
 subscribed_users = set()
+delivery_modes = {}  # user_id -> "job" or "digest", only for users who picked a mode
+user_prefs = {}  # user_id -> {"roles": [...], "location": str or None, "remote": bool}
 
 # Target job roles for freshers/entry-level
 TARGET_ROLES = [
@@ -47,443 +175,2581 @@ TARGET_ROLES = [
     "recruitment", "we are hiring", "job opening", "opportunity"
 ]
 
-# Load subscribed users from file
+# Minimal Prometheus-style metrics. Each metric keeps its values in a dict keyed by the
+# tuple of label values, so recording is a dict lookup plus an add (and a bisect for
+# histograms): cheap enough to leave on in the hot path.
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+# A gauge is set directly, or read from `collect` (a function returning the value) at scrape time
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), collect=None):
+        super().__init__(name, help_text, labels)
+        self.collect = collect
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def get(self, *label_values):
+        if self.collect:
+            self.values[()] = self.collect()
+        return super().get(*label_values)
+
+    def samples(self):
+        if self.collect:
+            self.values[()] = self.collect()
+        return super().samples()
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values):
+        series = self.values.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def mean(self, *label_values):
+        count = self.count(*label_values)
+        return self.values[label_values][-1] / count if count else 0.0
+
+    # Upper bound of the bucket holding the q-th quantile
+    def quantile(self, q, *label_values):
+        series = self.values.get(label_values)
+        if not series:
+            return 0.0
+        rank = q * sum(series[:-1])
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        for label_values, series in self.values.items():
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": "+Inf" if bound == float("inf") else f"{bound:g}"}, cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Sample values at full precision (counters in the millions must still show every increment)
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class MetricsRegistry:
+    def __init__(self, prefix="jobbot_"):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(self.prefix + name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=(), collect=None):
+        return self._register(Gauge(self.prefix + name, help_text, labels, collect))
+
+    def histogram(self, name, help_text, buckets, labels=()):
+        return self._register(Histogram(self.prefix + name, help_text, buckets, labels))
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+                value = _format_value(value)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+metrics = MetricsRegistry()
+
+# Scraping, per source
+fetch_seconds = metrics.histogram("fetch_seconds", "Time to fetch one result page", LATENCY_BUCKETS, ("source",))
+fetch_results = metrics.counter("fetch_requests_total", "Page fetches by outcome (parsed, not_modified, unchanged, error)",
+                                ("source", "result"))
+fetch_bytes = metrics.counter("fetch_bytes_total", "Response bytes downloaded", ("source",))
+parse_seconds = metrics.histogram("parse_seconds", "Time to parse one result page",
+                                  (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1), ("source",))
+cards_seen = metrics.counter("cards_total", "Job cards extracted from pages", ("source",))
+jobs_matched = metrics.counter("jobs_matched_total", "Recent jobs matching the target roles", ("source",))
+jobs_deduped = metrics.counter("jobs_deduped_total", "Matched jobs dropped as already sent", ("source",))
+jobs_near_duplicate = metrics.counter("jobs_near_duplicate_total",
+                                      "Deduped jobs that matched another listing of the same opening", ("source",))
+jobs_new = metrics.counter("jobs_new_total", "New jobs routed to subscribers", ("source",))
+jobs_cache_lookups = metrics.counter("jobs_cache_total", "/jobs source lookups by outcome (fresh, stale, shared, miss)",
+                                     ("result",))
+breaker_state = metrics.gauge("source_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("source",))
+
+# Delivery
+send_seconds = metrics.histogram("send_seconds", "Telegram sendMessage latency", LATENCY_BUCKETS)
+messages_sent = metrics.counter("messages_sent_total", "Messages delivered")
+send_failures = metrics.counter("send_failures_total", "Failed sends by error type", ("error",))
+flood_waits = metrics.counter("retry_after_total", "RetryAfter responses from Telegram")
+send_retries = metrics.counter("send_retries_total", "Sends rescheduled after a transient failure")
+outbox_wait_seconds = metrics.histogram("outbox_wait_seconds", "Time from enqueue to delivery",
+                                        (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 21600))
+delivery_queue = metrics.gauge("delivery_queue_depth", "Messages waiting to be sent",
+                               collect=lambda: sum(broadcaster.outbox.counts()[status] for status in ("pending", "sending")))
+dead_letters = metrics.gauge("dead_letters", "Messages that permanently failed",
+                             collect=lambda: broadcaster.outbox.counts()["dead"])
+broadcast_seconds = metrics.histogram("broadcast_seconds", "Time from the outbox getting work until it is drained",
+                                      (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600))
+metrics.gauge("subscribers", "Subscribed users", collect=lambda: len(subscribed_users))
+metrics.gauge("sent_jobs", "Job fingerprints in the dedup store", collect=lambda: len(sent_jobs))
+
+# Serve GET /metrics for Prometheus scrapes
+async def handle_metrics_request(reader, writer):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode(errors="replace").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", metrics.render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except Exception as e:
+        logger.error(f"Error serving metrics: {e}")
+    finally:
+        writer.close()
+
+async def start_metrics_server(port=METRICS_PORT, listen=METRICS_LISTEN):
+    server = await asyncio.start_server(handle_metrics_request, listen, port)
+    logger.info(f"Metrics available on http://{listen}:{port}/metrics")
+    return server
+
+# Async HTTP client shared by every scraper.
+# httpx keeps a keep-alive connection pool per host; the semaphores cap how many
+# requests are in flight overall and per host so one slow site can't hog the pool.
+class HttpClient:
+    def __init__(self, max_connections=HTTP_MAX_CONNECTIONS, max_per_host=HTTP_MAX_PER_HOST, headers=None, transport=None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.transport = transport
+        self._client = None
+        self._global_limit = asyncio.Semaphore(max_connections)
+        self._host_limits = {}
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                follow_redirects=True,
+                transport=self.transport
+            )
+        return self._client
+
+    def _host_limit(self, url):
+        host = httpx.URL(url).host
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def get(self, url, headers=None, timeout=15):
+        async with self._global_limit, self._host_limit(url):
+            return await self._get_client().get(url, headers=headers, timeout=timeout)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+http_client = HttpClient()
+
+# Persistent set of job fingerprints that forgets entries after `ttl` seconds.
+# Keys are hashed to 8-byte BLAKE2b digests and kept in an OrderedDict in the order
+# they were first seen, so expiry only ever pops from the front. Every new entry is
+# appended to a binary log of fixed-width records; the log is rewritten once expired
+# records outnumber live ones. A store without a path is kept in memory only.
+class DedupStore:
+    RECORD = struct.Struct("<8sd")  # fingerprint, first-seen unix time
+
+    def __init__(self, path, ttl=RECENCY_DAYS * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._log = None
+        self._dead_records = 0
+
+    @staticmethod
+    def fingerprint(key):
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+
+    def load(self):
+        self.entries.clear()
+        try:
+            if self.path and os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+                # Ignore a partial trailing record left by a crash mid-write
+                usable = len(data) - len(data) % self.RECORD.size
+                cutoff = time.time() - self.ttl
+                for fp, seen_at in self.RECORD.iter_unpack(data[:usable]):
+                    if seen_at > cutoff and fp not in self.entries:
+                        self.entries[fp] = seen_at
+                logger.info(f"Loaded {len(self.entries)} fingerprints from {self.path}")
+            self.compact()
+        except Exception as e:
+            logger.error(f"Error loading sent jobs: {e}")
+
+    def _append(self, fp, seen_at):
+        if self._log is None:
+            self._log = open(self.path, 'ab', buffering=0)
+        self._log.write(self.RECORD.pack(fp, seen_at))
+
+    def __contains__(self, key):
+        return self.has_fingerprint(self.fingerprint(key))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def has_fingerprint(self, fp):
+        self.expire()
+        return fp in self.entries
+
+    def add(self, key):
+        return self.add_fingerprint(self.fingerprint(key))
+
+    # Store an 8-byte fingerprint as is; returns False if it was already there
+    def add_fingerprint(self, fp):
+        if fp in self.entries:
+            return False
+        seen_at = time.time()
+        self.entries[fp] = seen_at
+        if self.path:
+            try:
+                self._append(fp, seen_at)
+            except Exception as e:
+                logger.error(f"Error saving sent job: {e}")
+        return True
+
+    # Drop entries older than the TTL; amortised O(1) per entry
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        while self.entries:
+            fp, seen_at = next(iter(self.entries.items()))
+            if seen_at > cutoff:
+                break
+            self.entries.popitem(last=False)
+            self._dead_records += 1
+        if self._dead_records > max(1000, len(self.entries)):
+            self.compact()
+
+    # Rewrite the log with only live entries (atomic via rename)
+    def compact(self):
+        if not self.path:
+            self._dead_records = 0
+            return
+        try:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(b"".join(self.RECORD.pack(fp, seen_at) for fp, seen_at in self.entries.items()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._dead_records = 0
+        except Exception as e:
+            logger.error(f"Error compacting sent jobs: {e}")
+
+sent_jobs = DedupStore(SENT_JOBS_FILE)
+
+# Query parameters that only say how a link was reached, never which job it is
+TRACKING_PARAMS = {"refid", "trackingid", "trk", "trkinfo", "position", "pagenum", "originalsubdomain", "from",
+                   "src", "ref", "referrer", "gclid", "fbclid", "lipi", "si", "tk", "vjs", "advn", "adid",
+                   "sjdu", "acatk", "pub", "camk", "xkcb", "xpse", "xfps"}
+
+# Canonical form of a job link, so the same posting reached from different search pages
+# or share links has one key: https, no www or country subdomain, no fragment or tracking
+# parameters, sorted query, no trailing slash, and one URL shape per Indeed/LinkedIn job
+def canonical_url(link):
+    try:
+        parts = urlsplit(link.strip())
+    except ValueError:
+        return link
+    host = re.sub(r"^(?:www|[a-z]{2})\.(indeed|linkedin)\.com$", r"\1.com", parts.netloc.lower())
+    host = host[4:] if host.startswith("www.") else host
+    path = parts.path.rstrip("/") or "/"
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_"))
+    if host == "indeed.com" and any(key == "jk" for key, _ in query):
+        path, query = "/viewjob", [(key, value) for key, value in query if key == "jk"]
+    elif host == "linkedin.com":
+        job_id = re.match(r"/jobs/view/(?:[^/]*-)?(\d+)$", path)
+        if job_id:
+            path = f"/jobs/view/{job_id.group(1)}"
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+# Title words that vary between listings of the same opening
+TITLE_ABBREVIATIONS = {"sr": "senior", "jr": "junior", "dev": "developer", "devs": "developer", "engg": "engineer",
+                       "eng": "engineer", "mgr": "manager", "swe": "software engineer", "sde": "software developer"}
+TITLE_NOISE_WORDS = {"a", "an", "the", "and", "or", "for", "of", "in", "at", "to", "with", "we", "are", "is",
+                     "urgent", "urgently", "hiring", "immediate", "joiner", "joiners", "job", "jobs", "opening",
+                     "openings", "role", "position", "vacancy", "new", "remote", "hybrid", "onsite", "wfh",
+                     "full", "time", "fulltime", "part", "contract", "m", "f", "d"}
+COMPANY_SUFFIXES = {"inc", "incorporated", "ltd", "limited", "llc", "llp", "plc", "pvt", "private", "corp",
+                    "corporation", "co", "company", "gmbh", "ag", "sa", "bv", "pte", "the"}
+
+def normalize_words(text):
+    words = re.sub(r"[^a-z0-9+#]+", " ", text.lower().replace("&", " and ")).split()
+    return " ".join(TITLE_ABBREVIATIONS.get(word, word) for word in words).split()
+
+def normalize_title(title):
+    return [word for word in normalize_words(title) if word not in TITLE_NOISE_WORDS]
+
+def normalize_company(company):
+    return " ".join(word for word in normalize_words(company or "") if word not in COMPANY_SUFFIXES)
+
+# The city (or "remote") a location starts with: "Pune, Maharashtra, India" -> "pune"
+def normalize_location(location):
+    return " ".join(normalize_words((location or "").split(",")[0]))
+
+@lru_cache(maxsize=65536)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), "big")
+
+# SimHash of a bag of tokens: every bit is the majority vote of the tokens' hash bits,
+# so sets that share most tokens end up a few bits apart
+def simhash(tokens, bits=40):
+    votes = [0] * bits
+    for token in set(tokens):
+        token_hash = _token_hash(token)
+        for bit in range(bits):
+            votes[bit] += 1 if token_hash >> bit & 1 else -1
+    return sum(1 << bit for bit, vote in enumerate(votes) if vote > 0)
+
+# 64-bit sketch of a job: 16 bits of the normalised company, 8 bits of the normalised
+# location (0 when unknown) and 40 bits of title SimHash. None when the company or title
+# is unknown: the same title at two unknown companies says nothing about whether they
+# are one opening.
+def job_sketch(title, company, location=None):
+    company_key = normalize_company(company)
+    title_words = normalize_title(title)
+    if not company_key or not title_words:
+        return None
+    location_key = normalize_location(location)
+    location_bits = _token_hash(location_key) % 255 + 1 if location_key else 0
+    return (_token_hash(company_key) & 0xFFFF) << 48 | location_bits << 40 | simhash(title_words)
+
+# Sketches of sent jobs with a banded LSH index. Two sketches are near-duplicates when the
+# company bits are equal, the locations are equal or one is unknown (the same title at one
+# company in two cities is two openings), and the title bits differ in at most
+# MAX_DISTANCE places; split into MAX_DISTANCE + 1 bands, such a pair must agree on at
+# least one whole band, so a lookup only compares the few sketches sharing a
+# (company, band) bucket.
+class NearDuplicateIndex:
+    MAX_DISTANCE = 3
+    BANDS = 4
+    BAND_BITS = 10
+    TITLE_MASK = (1 << 40) - 1
+
+    @classmethod
+    def similar(cls, sketch, other):
+        location, other_location = sketch >> 40 & 0xFF, other >> 40 & 0xFF
+        return (sketch >> 48 == other >> 48 and (location == other_location or not location or not other_location)
+                and ((sketch ^ other) & cls.TITLE_MASK).bit_count() <= cls.MAX_DISTANCE)
+
+    def __init__(self, store):
+        self.store = store  # DedupStore holding the sketches, for persistence and expiry
+        self.buckets = {}  # (band, company bits, band bits) -> sketches
+
+    def _bands(self, sketch):
+        company = sketch >> 48
+        for band in range(self.BANDS):
+            yield band, company, sketch >> (band * self.BAND_BITS) & ((1 << self.BAND_BITS) - 1)
+
+    def load(self):
+        self.store.load()
+        self.rebuild()
+
+    def rebuild(self):
+        self.buckets.clear()
+        for fp in self.store.entries:
+            self._index(int.from_bytes(fp, "big"))
+
+    def _index(self, sketch):
+        for key in self._bands(sketch):
+            self.buckets.setdefault(key, []).append(sketch)
+
+    # A stored sketch within MAX_DISTANCE of this one, or None
+    def find(self, sketch):
+        for key in self._bands(sketch):
+            for other in self.buckets.get(key, ()):
+                if self.similar(sketch, other) and self.store.has_fingerprint(other.to_bytes(8, "big")):
+                    return other
+        return None
+
+    def add(self, sketch):
+        if self.store.add_fingerprint(sketch.to_bytes(8, "big")):
+            self._index(sketch)
+
+    # Forget expired sketches and drop them from the buckets
+    def expire(self):
+        self.store.expire()
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.store)
+
+near_duplicates = NearDuplicateIndex(DedupStore(NEAR_DUPLICATES_FILE))
+
+# One job posting on its way from a source to subscribers. Everything later stages key
+# on is worked out once, when the source creates the record (in a parse worker when
+# PARSE_WORKERS is set): the canonical URL, its dedup fingerprint and the near-duplicate
+# sketch. Matched roles and the rendered message are computed on first use and then
+# shared by every user the job goes to.
+class Job:
+    __slots__ = ("source", "title", "link", "post_date", "location", "posted_at", "company",
+                 "url", "fingerprint", "sketch", "_roles", "_message")
+
+    def __init__(self, source, title, link, post_date="Recent", location=None, posted_at=None, company=None):
+        self.source = source
+        self.title = title
+        self.link = link
+        self.post_date = post_date
+        self.location = location
+        self.posted_at = posted_at or normalize_post_date(post_date)
+        self.company = company
+        self.url = canonical_url(link)
+        self.fingerprint = DedupStore.fingerprint(self.url)
+        self.sketch = job_sketch(title, company, location)
+        self._roles = None
+        self._message = None
+
+    # Pickled for parse workers; slots without a __dict__ need explicit state
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @property
+    def roles(self):
+        if self._roles is None:
+            self._roles = role_matcher.matches(self.title)
+        return self._roles
+
+    # The job as a MarkdownV2 message entry, escaped once
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = render_job(self.title, self.link, self.post_date)
+        return self._message
+
+    def __repr__(self):
+        return f"Job({self.source!r}, {self.title!r}, {self.url!r})"
+
+# Why a job counts as already seen: "link" (same canonical URL), "near_duplicate" (same
+# opening from another source or with a reworded title) or None for a new job.
+# Fingerprints written before links were canonicalised used "title_link" keys; they are
+# checked too until they age out of the recency window.
+def find_seen_job(job, seen=None, index=None):
+    seen = sent_jobs if seen is None else seen
+    index = near_duplicates if index is None else index
+    if seen.has_fingerprint(job.fingerprint) or f"{job.title}_{job.link}" in seen:
+        return "link"
+    if job.sketch is not None and index.find(job.sketch) is not None:
+        return "near_duplicate"
+    return None
+
+# Record a job as seen; returns why it had already been seen, or None if it is new
+def mark_job_seen(job, seen=None, index=None):
+    seen = sent_jobs if seen is None else seen
+    index = near_duplicates if index is None else index
+    reason = find_seen_job(job, seen, index)
+    if reason is None:
+        seen.add_fingerprint(job.fingerprint)
+        if job.sketch is not None:
+            index.add(job.sketch)
+    return reason
+
+# SQLite-backed subscriber store in WAL mode. Changes are queued per user and written
+# in one transaction shortly afterwards (group commit), so a burst of /start or a
+# broadcast that removes many blocked users costs one commit, and each commit only
+# touches the rows that changed. SQLite's journal makes every commit atomic, so a crash
+# loses at most the last GROUP_COMMIT_DELAY of changes and never corrupts the file.
+class SubscriberStore:
+    COLUMNS = ("subscribed", "subscribed_at", "last_delivery", "delivery_mode", "prefs")
+
+    def __init__(self, path=SUBSCRIBERS_DB, commit_delay=GROUP_COMMIT_DELAY, max_batch=500):
+        self.path = path
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self._conn = None
+        self._pending = {}  # chat_id -> {column: value}
+        self._flush_handle = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "chat_id INTEGER PRIMARY KEY, subscribed INTEGER NOT NULL DEFAULT 0, subscribed_at REAL, "
+                "last_delivery REAL, delivery_mode TEXT, prefs TEXT)"
+            )
+        return self._conn
+
+    # All stored users as dicts, with pending changes applied
+    def load(self):
+        users = {}
+        for row in self.conn.execute(f"SELECT chat_id, {', '.join(self.COLUMNS)} FROM users"):
+            users[row[0]] = dict(zip(self.COLUMNS, row[1:]))
+        for chat_id, fields in self._pending.items():
+            users.setdefault(chat_id, dict.fromkeys(self.COLUMNS)).update(fields)
+        return users
+
+    def get(self, chat_id):
+        row = self.conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM users WHERE chat_id = ?", (chat_id,)).fetchone()
+        user = dict(zip(self.COLUMNS, row)) if row else dict.fromkeys(self.COLUMNS)
+        user.update(self._pending.get(chat_id, {}))
+        return user
+
+    # Chat IDs stored as unsubscribed, with pending changes applied
+    def unsubscribed(self):
+        chat_ids = {row[0] for row in self.conn.execute("SELECT chat_id FROM users WHERE subscribed = 0")}
+        for chat_id, fields in self._pending.items():
+            if fields.get("subscribed") == 0:
+                chat_ids.add(chat_id)
+            elif fields.get("subscribed"):
+                chat_ids.discard(chat_id)
+        return chat_ids
+
+    def is_empty(self):
+        return not self._pending and self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    # Queue column updates for a user; they are committed with the next group commit
+    def write(self, chat_id, **fields):
+        self._pending.setdefault(chat_id, {}).update(fields)
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+            return
+        if self._flush_handle is None:
+            try:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.commit_delay, self.flush)
+            except RuntimeError:
+                # No event loop (startup/shutdown): write straight away
+                self.flush()
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            self.conn.execute("BEGIN")
+            for chat_id, fields in pending.items():
+                columns = list(fields)
+                updates = ", ".join(f"{column} = excluded.{column}" for column in columns)
+                self.conn.execute(
+                    f"INSERT INTO users (chat_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "
+                    f"ON CONFLICT(chat_id) DO UPDATE SET {updates}",
+                    (chat_id, *fields.values())
+                )
+            self.conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Error saving {len(pending)} subscriber changes: {e}")
+            try:
+                self.conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            # Keep the changes for the next commit, without overwriting newer ones
+            for chat_id, fields in pending.items():
+                self._pending[chat_id] = {**fields, **self._pending.get(chat_id, {})}
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+subscriber_store = SubscriberStore()
+
+# Import users.json from older versions into the database once
+def migrate_users_file():
+    if not os.path.exists(USERS_FILE) or not subscriber_store.is_empty():
+        return
+    try:
+        with open(USERS_FILE, 'r') as f:
+            users_data = json.load(f)
+        delivery = users_data.get('delivery', {})
+        prefs = users_data.get('prefs', {})
+        for user_id in users_data.get('users', []):
+            subscriber_store.write(user_id, subscribed=1, subscribed_at=time.time())
+        # JSON object keys are strings, chat IDs are ints
+        for user_id, mode in delivery.items():
+            subscriber_store.write(int(user_id), delivery_mode=mode)
+        for user_id, user_pref in prefs.items():
+            subscriber_store.write(int(user_id), prefs=json.dumps(user_pref))
+        subscriber_store.flush()
+        os.replace(USERS_FILE, f"{USERS_FILE}.migrated")
+        logger.info(f"Migrated {len(users_data.get('users', []))} users from {USERS_FILE}")
+    except Exception as e:
+        logger.error(f"Error migrating {USERS_FILE}: {e}")
+
+# Load subscribed users from the database
 def load_users():
-    global subscribed_users
+    global subscribed_users, delivery_modes, user_prefs
     try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r') as f:
-                users_data = json.load(f)
-                subscribed_users = set(users_data.get('users', []))
-                logger.info(f"Loaded {len(subscribed_users)} subscribed users")
+        migrate_users_file()
+        users = subscriber_store.load()
+        subscribed_users = {user_id for user_id, user in users.items() if user["subscribed"]}
+        delivery_modes = {user_id: user["delivery_mode"] for user_id, user in users.items() if user["delivery_mode"]}
+        user_prefs = {user_id: json.loads(user["prefs"]) for user_id, user in users.items() if user["prefs"]}
+        logger.info(f"Loaded {len(subscribed_users)} subscribed users")
     except Exception as e:
         logger.error(f"Error loading users: {e}")
         subscribed_users = set()
+        delivery_modes = {}
+        user_prefs = {}
+    subscriber_index.rebuild(subscribed_users, user_prefs)
 
-# Save subscribed users to file
+# Queue one user's current settings for the next group commit
+def save_user(user_id):
+    subscriber_store.write(
+        user_id,
+        subscribed=int(user_id in subscribed_users),
+        delivery_mode=delivery_modes.get(user_id),
+        prefs=json.dumps(user_prefs[user_id]) if user_id in user_prefs else None
+    )
+
+# Commit any queued subscriber changes now
 def save_users():
-    try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump({'users': list(subscribed_users)}, f)
-        logger.info(f"Saved {len(subscribed_users)} subscribed users")
-    except Exception as e:
-        logger.error(f"Error saving users: {e}")
+    subscriber_store.flush()
+
+# Persistent queue of outbound messages in SQLite. Every message is a row that stays until
+# Telegram accepts it: claim() marks due rows as being sent, ack() deletes them, retry()
+# puts them back with a later due time and dead() parks permanent failures for inspection.
+# Rows claimed by a process that died are released when the queue is next opened, so
+# delivery resumes after a restart (a message in flight during a crash may be sent twice).
+# With several delivery workers each one only claims and releases the chats of its shard,
+# so no message can be picked up by two of them.
+class Outbox:
+    def __init__(self, path=OUTBOX_DB, shard=WORKER_INDEX, shards=WORKER_COUNT):
+        self.path = path
+        self.shard = shard
+        self.shards = shards
+        # Same as owns(): SQLite's % keeps the sign of negative (group) chat IDs. Interactive
+        # messages are all sent by worker 0, which is the one answering commands.
+        in_shard = f"((chat_id % {int(shards)}) + {int(shards)}) % {int(shards)} = {int(shard)}"
+        self._in_lane = {PRIORITY_BULK: in_shard, PRIORITY_INTERACTIVE: "1" if shard == 0 else "0"}
+        self._conn = None
+
+    def owns(self, chat_id, priority=PRIORITY_BULK):
+        if priority == PRIORITY_INTERACTIVE:
+            return self.shard == 0
+        return chat_id % self.shards == self.shard
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+                "next_attempt REAL NOT NULL, created_at REAL NOT NULL, last_error TEXT, "
+                "priority INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+            if "priority" not in columns:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_lane ON outbox (status, priority, id)")
+            owned = " OR ".join(f"(priority = {lane} AND {clause})" for lane, clause in self._in_lane.items())
+            released = self._conn.execute(f"UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND ({owned})").rowcount
+            if released:
+                logger.info(f"Resuming {released} messages that were being sent when the bot stopped")
+        return self._conn
+
+    # Queue (chat_id, text) pairs in one transaction on one lane (PRIORITY_BULK or
+    # PRIORITY_INTERACTIVE); send_kwargs go with every message
+    def enqueue(self, messages, priority=PRIORITY_BULK, **send_kwargs):
+        now = time.time()
+        payloads = {}  # A broadcast sends the same few texts to many chats; serialise each once
+        rows = []
+        for chat_id, text in messages:
+            if text not in payloads:
+                payloads[text] = json.dumps({"text": text, **send_kwargs})
+            rows.append((chat_id, payloads[text], now, now, priority))
+        if not rows:
+            return 0
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(
+                "INSERT INTO outbox (chat_id, payload, next_attempt, created_at, priority) VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    # Mark up to `limit` due messages of this shard and lane as being sent and return them oldest first
+    def claim(self, limit, priority=PRIORITY_BULK):
+        # Walk the lane in id order and stop at `limit`; left to itself SQLite picks
+        # outbox_due and sorts every pending message, which is slow behind a large broadcast
+        rows = self.conn.execute(
+            "SELECT id, chat_id, payload, attempts, created_at FROM outbox INDEXED BY outbox_lane "
+            f"WHERE status = 'pending' AND priority = ? AND next_attempt <= ? AND {self._in_lane[priority]} ORDER BY id LIMIT ?",
+            (priority, time.time(), limit)
+        ).fetchall()
+        if rows:
+            self.conn.executemany("UPDATE outbox SET status = 'sending' WHERE id = ?", [(row[0],) for row in rows])
+        return [{"id": row[0], "chat_id": row[1], "payload": json.loads(row[2]), "attempts": row[3], "created_at": row[4],
+                 "priority": priority} for row in rows]
+
+    def ack(self, item_id):
+        self.conn.execute("DELETE FROM outbox WHERE id = ?", (item_id,))
+
+    def retry(self, item_id, attempts, delay, error):
+        self.conn.execute("UPDATE outbox SET status = 'pending', attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                          (attempts, time.time() + delay, error, item_id))
+
+    def dead(self, item_id, error):
+        self.conn.execute("UPDATE outbox SET status = 'dead', last_error = ? WHERE id = ?", (error, item_id))
+
+    # Put claimed messages back, e.g. when stopping with messages still buffered
+    def release(self, item_ids):
+        self.conn.executemany("UPDATE outbox SET status = 'pending' WHERE id = ?", [(item_id,) for item_id in item_ids])
+
+    # Number of messages per status: pending, sending and dead
+    def counts(self):
+        counts = {"pending": 0, "sending": 0, "dead": 0}
+        counts.update(self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return counts
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+# Build a regex for a list of phrases shaped like a trie, e.g. "data (?:analyst|scientist)".
+# Children are tried before the end of a phrase, so the match at a position is the longest one.
+def _trie_pattern(phrases):
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        optional = "" in node
+        if not branches:
+            return ""
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if optional else "")
+    
+    return build(trie)
+
+# Matches a list of phrases against text with one trie-shaped regex.
+# search() answers "does any phrase occur" in a single pass and stops at the first hit.
+# matches() gives the same set `phrase in text` would give for each phrase. On titles it
+# walks the leftmost-longest hits and expands each to the shorter phrases it contains; a
+# phrase starting inside a hit but running past its end can only start where the rest of
+# the hit begins another phrase, so the regex is re-tried at those precomputed offsets
+# (this is not a strict single pass). Past MATCH_SCAN_MAX_LENGTH characters, such as post
+# bodies, that regex scan is slower than checking each phrase with `in`, which is used instead.
+class RoleMatcher:
+    MATCH_SCAN_MAX_LENGTH = 120
+
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(phrase.lower() for phrase in phrases))
+        self._pattern = re.compile(_trie_pattern(self.phrases))
+        self._contained = {phrase: frozenset(other for other in self.phrases if other in phrase)
+                           for phrase in self.phrases}
+        self._straddling = {phrase: tuple(offset for offset in range(1, len(phrase))
+                                          if any(other != phrase[offset:] and other.startswith(phrase[offset:])
+                                                 for other in self.phrases))
+                            for phrase in self.phrases}
+
+    def search(self, text):
+        return self._pattern.search(text.lower()) is not None
+
+    def matches(self, text):
+        text = text.lower()
+        if len(text) > self.MATCH_SCAN_MAX_LENGTH:
+            return {phrase for phrase in self.phrases if phrase in text}
+        found = set()
+        for hit in self._pattern.finditer(text):
+            phrase = hit.group()
+            found |= self._contained[phrase]
+            for offset in self._straddling[phrase]:
+                inner = self._pattern.match(text, hit.start() + offset)
+                if inner:
+                    found |= self._contained[inner.group()]
+        return found
+
+role_matcher = RoleMatcher(TARGET_ROLES)
 
 # Check if a job matches target roles
 def is_target_job(job_title):
-    job_title_lower = job_title.lower()
-    return any(role in job_title_lower for role in TARGET_ROLES)
+    return role_matcher.search(job_title)
+
+# Turn a user's role keyword into the TARGET_ROLES phrases it covers, e.g. "qa" -> "qa tester", "qa engineer"
+def resolve_role_keyword(keyword):
+    keyword = " ".join(keyword.lower().split())
+    if keyword in role_matcher.phrases:
+        return {keyword}
+    return {role for role in role_matcher.phrases if keyword in role}
+
+# Check a job location against a user's location/remote filters.
+# Jobs with no known location are never filtered out.
+def location_matches(prefs, location):
+    if not location:
+        return True
+    location_lower = location.lower()
+    if prefs.get("remote") and "remote" in location_lower:
+        return True
+    if prefs.get("location"):
+        return prefs["location"] in location_lower
+    return not prefs.get("remote")
+
+# Inverted index from role phrase to the users who asked for it, so the recipients of a
+# job are found from its matched roles instead of by checking every subscriber.
+class SubscriberIndex:
+    def __init__(self):
+        self.prefs = {}  # user ID -> prefs for every indexed user
+        self.by_role = {}  # role phrase -> set of user IDs
+        self.all_roles = set()  # users without a role filter
+        self.constrained = set()  # users with location/remote filters
+
+    def rebuild(self, users, prefs):
+        self.prefs.clear()
+        self.by_role.clear()
+        self.all_roles.clear()
+        self.constrained.clear()
+        for user_id in users:
+            self.add(user_id, prefs.get(user_id))
+
+    def add(self, user_id, prefs=None):
+        self.remove(user_id)
+        prefs = prefs or {}
+        self.prefs[user_id] = prefs
+        if prefs.get("roles"):
+            for role in prefs["roles"]:
+                self.by_role.setdefault(role, set()).add(user_id)
+        else:
+            self.all_roles.add(user_id)
+        if prefs.get("location") or prefs.get("remote"):
+            self.constrained.add(user_id)
+
+    def remove(self, user_id):
+        prefs = self.prefs.pop(user_id, None)
+        if prefs is None:
+            return
+        self.all_roles.discard(user_id)
+        self.constrained.discard(user_id)
+        for role in prefs.get("roles") or []:
+            users = self.by_role.get(role)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self.by_role[role]
+
+    # Users who want a job with these matched roles and location
+    def recipients(self, job_roles, location=None):
+        users = set(self.all_roles)
+        for role in job_roles:
+            users |= self.by_role.get(role, set())
+        if self.constrained and location:
+            users -= {user_id for user_id in users & self.constrained
+                      if not location_matches(self.prefs[user_id], location)}
+        return users
+
+    # Same check as recipients() for a single user
+    def wants(self, user_id, job_roles, location=None):
+        prefs = self.prefs.get(user_id, {})
+        if prefs.get("roles") and not set(prefs["roles"]) & job_roles:
+            return False
+        return location_matches(prefs, location)
+
+subscriber_index = SubscriberIndex()
+
+def subscribe_user(user_id):
+    subscribed_users.add(user_id)
+    subscriber_index.add(user_id, user_prefs.get(user_id))
+    save_user(user_id)
+    subscriber_store.write(user_id, subscribed_at=time.time())
+
+def unsubscribe_user(user_id):
+    subscribed_users.discard(user_id)
+    subscriber_index.remove(user_id)
+    save_user(user_id)
+
+# Absolute date shapes, each tied to the strptime formats that can parse it,
+# so only a matching format is ever tried
+ABSOLUTE_DATE_PATTERNS = [
+    (re.compile(r"\d{4}-\d{1,2}-\d{1,2}"), ("%Y-%m-%d",)),
+    (re.compile(r"\d{1,2}-\d{1,2}-\d{4}"), ("%d-%m-%Y", "%m-%d-%Y")),
+    (re.compile(r"\d{1,2}/\d{1,2}/\d{4}"), ("%d/%m/%Y", "%m/%d/%Y")),
+    (re.compile(r"[a-z]{3,9} \d{1,2}, \d{4}"), ("%b %d, %Y", "%B %d, %Y")),
+    (re.compile(r"\d{1,2} [a-z]{3,9} \d{4}"), ("%d %b %Y", "%d %B %Y")),
+]
+
+# Relative dates: "3 days ago", "Posted 30+ days ago", and RemoteOK's "3d" / "5h" / "2mo"
+RELATIVE_DATE_PATTERN = re.compile(r"(\d+)\+?\s*(second|minute|hour|day|week|month|year)s?\s+ago")
+SHORT_RELATIVE_DATE_PATTERN = re.compile(r"(\d+)\s*(mo|s|m|h|d|w|y)")
+RELATIVE_UNITS = {
+    "second": timedelta(seconds=1), "minute": timedelta(minutes=1), "hour": timedelta(hours=1),
+    "day": timedelta(days=1), "week": timedelta(weeks=1), "month": timedelta(days=30), "year": timedelta(days=365),
+    "s": timedelta(seconds=1), "m": timedelta(minutes=1), "h": timedelta(hours=1),
+    "d": timedelta(days=1), "w": timedelta(weeks=1), "mo": timedelta(days=30), "y": timedelta(days=365)
+}
+JUST_POSTED_WORDS = ("today", "just now", "just posted", "recent")
+
+# Parse a date string into either an absolute UTC datetime or an age (timedelta).
+# Cached because the same strings ("1 day ago", "Just posted", "Recent") repeat on every page;
+# ages are cached rather than datetimes so cached entries never go stale.
+@lru_cache(maxsize=4096)
+def _parse_date_text(date_str):
+    text = " ".join(date_str.lower().split())
+    
+    for pattern, formats in ABSOLUTE_DATE_PATTERNS:
+        if pattern.fullmatch(text):
+            for fmt in formats:
+                try:
+                    return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc)
+                except ValueError:
+                    continue
+            return None
+    
+    match = RELATIVE_DATE_PATTERN.search(text) or SHORT_RELATIVE_DATE_PATTERN.fullmatch(text)
+    if match:
+        return int(match.group(1)) * RELATIVE_UNITS[match.group(2)]
+    if "yesterday" in text:
+        return timedelta(days=1)
+    if any(word in text for word in JUST_POSTED_WORDS):
+        return timedelta(0)
+    return None
+
+# Turn a scraped date string into a UTC timestamp.
+# Missing or unparseable dates fall back to `now`, i.e. the job is treated as just posted.
+def normalize_post_date(date_str=None, now=None):
+    now = now or datetime.now(timezone.utc)
+    if not date_str:
+        return now
+    parsed = _parse_date_text(date_str)
+    if parsed is None:
+        return now
+    if isinstance(parsed, timedelta):
+        return now - parsed
+    return parsed
+
+# Check if a timestamp falls within the last RECENCY_DAYS days
+def is_recent_timestamp(posted_at, now=None):
+    now = now or datetime.now(timezone.utc)
+    return (now - posted_at).days <= RECENCY_DAYS
 
 # Check if a job posting is recent (within the last 7 days)
 def is_recent_job(date_str=None):
-    if not date_str:
-        return True  # If no date, assume it's recent
-        
-    try:
-        # Try to parse common date formats
-        date_formats = [
-            "%Y-%m-%d", "%d-%m-%Y", "%m-%d-%Y", "%d/%m/%Y", "%m/%d/%Y",
-            "%b %d, %Y", "%B %d, %Y", "%d %b %Y", "%d %B %Y"
-        ]
-        
-        for fmt in date_formats:
-            try:
-                job_date = datetime.strptime(date_str, fmt)
-                break
-            except ValueError:
-                continue
+    return is_recent_timestamp(normalize_post_date(date_str))
+
+# Role phrases too generic to make a useful search query on their own
+GENERIC_ROLE_TERMS = {"fresher", "entry level", "junior", "graduate", "trainee", "hiring", "openings",
+                      "recruitment", "we are hiring", "job opening", "opportunity"}
+
+# One search query per concrete role in TARGET_ROLES
+def build_google_queries():
+    queries = []
+    for role in TARGET_ROLES:
+        if role in GENERIC_ROLE_TERMS:
+            continue
+        if any(term in role for term in ("junior", "entry level", "graduate")):
+            queries.append(f"{role} jobs")
         else:
-            # Check for relative dates like "2 days ago", "yesterday", etc.
-            if "today" in date_str.lower() or "just now" in date_str.lower():
-                return True
-            elif "yesterday" in date_str.lower():
-                return True
-            elif "ago" in date_str.lower():
-                # Extract the number and unit from string like "3 days ago"
-                match = re.search(r'(\d+)\s+(day|hour|minute|second|week)s?\s+ago', date_str.lower())
-                if match:
-                    num, unit = int(match.group(1)), match.group(2)
-                    if unit == "week" and num <= 1:
-                        return True
-                    elif unit in ["day", "hour", "minute", "second"]:
-                        return True
-                return False
+            queries.append(f"entry level {role} jobs")
+    return list(dict.fromkeys(queries))
+
+# Offline stand-in for the Custom Search API, shaped like
+# build("customsearch", "v1").cse().list(...).execute(). GOOGLE_CSE_STUB=1 generates a few
+# results per query; a file path serves canned JSON responses, either a single response
+# or an object keyed by query.
+class StubCseService:
+    def __init__(self, source="1"):
+        self.calls = []
+        self.canned = None
+        if source and source != "1":
+            with open(source, 'r') as f:
+                self.canned = json.load(f)
+
+    def cse(self):
+        return self
+
+    def list(self, q, cx=None, num=10, **kwargs):
+        self.calls.append(q)
+        return self._Request(self._respond(q, num))
+
+    def _respond(self, q, num):
+        if self.canned is not None:
+            if "items" in self.canned or not self.canned:
+                return self.canned
+            return self.canned.get(q, {})
+        slug = re.sub(r"[^a-z0-9]+", "-", q.lower()).strip("-")
+        return {"items": [{"title": f"{q.title()} - Stub Company {index}",
+                           "link": f"https://jobs.example.com/{slug}/{index}"} for index in range(num)]}
+
+    class _Request:
+        def __init__(self, result):
+            self.result = result
+
+        def execute(self):
+            return self.result
+
+# Long-lived Custom Search client. The discovery-based service is built once, on the event
+# loop, and its blocking execute() calls run in a small thread pool. httplib2 connections
+# are not thread-safe, so each pool thread executes over its own (from `http_factory`,
+# googleapiclient's build_http() by default). Each check spends quota from a
+# bucket refilled evenly across the day, and picks the queries with the best score:
+# recent new-job yield (plus a floor so quiet roles still get explored) times hours since
+# the query last ran, so every role is rotated through.
+class GoogleJobsClient:
+    def __init__(self, api_key=GOOGLE_API_KEY, cse_id=GOOGLE_CSE_ID, daily_quota=GOOGLE_CSE_DAILY_QUOTA,
+                 max_queries_per_check=GOOGLE_CSE_MAX_QUERIES_PER_CHECK, workers=GOOGLE_CSE_WORKERS, service=None,
+                 http_factory=None):
+        self.api_key = api_key
+        self.cse_id = cse_id
+        self.daily_quota = daily_quota
+        self.max_queries_per_check = max_queries_per_check
+        self.workers = workers
+        self.queries = build_google_queries()
+        self.yields = {query: 1.0 for query in self.queries}  # Moving average of new jobs per run
+        self.last_run = {query: 0.0 for query in self.queries}
+        self.quota_day = None
+        self.used_today = 0
+        self.allowance = float(max_queries_per_check)
+        self.allowance_updated = time.time()
+        self._service = service
+        self._http_factory = http_factory
+        self._local = threading.local()
+        self._executor = None
+
+    @property
+    def service(self):
+        if self._service is None:
+            if GOOGLE_CSE_STUB:
+                self._service = StubCseService(GOOGLE_CSE_STUB)
             else:
-                return True  # If we can't parse the date, assume it's recent
-                
-        # Check if date is within the last 7 days
-        return (datetime.now() - job_date).days <= 7
-    except Exception:
-        return True  # If any error, assume job is recent
+                from googleapiclient.discovery import build
+                self._service = build("customsearch", "v1", developerKey=self.api_key, cache_discovery=False)
+        return self._service
 
-# Google Custom Search API for recent entry-level jobs
-def search_google_jobs():
-    try:
-        if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
+    def _refill(self, now):
+        today = datetime.fromtimestamp(now, timezone.utc).date()
+        if today != self.quota_day:
+            self.quota_day = today
+            self.used_today = 0
+        self.allowance = min(float(self.max_queries_per_check),
+                             self.allowance + (now - self.allowance_updated) * self.daily_quota / 86400)
+        self.allowance_updated = now
+
+    # Choose the queries for one check without exceeding the quota
+    def plan(self, now=None):
+        now = now or time.time()
+        self._refill(now)
+        budget = min(int(self.allowance), self.daily_quota - self.used_today)
+        if budget <= 0:
             return []
-            
-        service = build("customsearch", "v1", developerKey=GOOGLE_API_KEY)
-        jobs = []
         
-        # Focus on very recent jobs
-        search_queries = [
-            "entry level developer jobs", 
-            "junior data analyst jobs", 
-            "junior software tester jobs",
-            "entry level cybersecurity jobs", 
-            "junior ui ux designer jobs"
-        ]
+        def score(query):
+            hours_idle = min(24.0, (now - self.last_run[query]) / 3600)
+            return (self.yields[query] + 0.5) * (1 + hours_idle)
         
-        for query in search_queries[:2]:  # Limit to 2 queries
-            try:
-                result = service.cse().list(
-                    q=f"{query} posted today this week",
-                    cx=GOOGLE_CSE_ID,
-                    num=5,
-                    dateRestrict="d7"  # Last 7 days
-                ).execute()
-                
-                if "items" in result:
-                    for item in result["items"]:
-                        title = item["title"]
-                        link = item["link"]
-                        if is_target_job(title):
-                            jobs.append((title, link, "Recent"))
-            except Exception as e:
-                logger.error(f"Error in Google search: {e}")
-                continue
-                
-        return jobs
-    except Exception as e:
-        logger.error(f"Error searching Google jobs: {e}")
-        return []
+        return sorted(self.queries, key=score, reverse=True)[:budget]
 
-async def scrape_indeed():
-    try:
-        jobs = []
-        search_terms = [
-            "entry+level+developer", "junior+developer", 
-            "entry+level+data+analyst", "entry+level+tester"
-        ]
+    def _record(self, query, new_jobs, now):
+        self.yields[query] = 0.7 * self.yields[query] + 0.3 * new_jobs
+        self.last_run[query] = now
+        self.used_today += 1
+        self.allowance -= 1
+
+    # The calling pool thread's own HTTP connection
+    def _http(self):
+        if not hasattr(self._local, "http"):
+            if self._http_factory is None:
+                from googleapiclient.http import build_http
+                self._http_factory = build_http
+            self._local.http = self._http_factory()
+        return self._local.http
+
+    def _execute(self, service, query):
+        request = service.cse().list(
+            q=f"{query} posted today this week",
+            cx=self.cse_id,
+            num=5,
+            dateRestrict="d7"  # Last 7 days
+        )
+        if isinstance(service, StubCseService):
+            return request.execute()
+        return request.execute(http=self._http())
+
+    async def search(self):
+        queries = self.plan()
+        if not queries:
+            logger.info("Google search skipped: no quota left for this check")
+            return []
         
-        for term in search_terms[:2]:  # Limit to avoid too many requests
-            try:
-                # Add date filter to URL
-                url = f"https://www.indeed.com/jobs?q={term}&sort=date&fromage=7"  # Jobs from last 7 days
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                }
-                response = requests.get(url, headers=headers, timeout=15)
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                job_cards = soup.select("div.job_seen_beacon") or soup.select("div.tapItem")
-                
-                for card in job_cards:
-                    title_elem = card.select_one("h2.jobTitle") or card.select_one("h2.title")
-                    date_elem = card.select_one("span.date") or card.select_one(".date")
-                    
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        
-                        # Extract date if available
-                        post_date = date_elem.get_text(strip=True) if date_elem else "Recent"
-                        
-                        link_elem = title_elem.find("a")
-                        if link_elem and link_elem.has_attr('href'):
-                            job_id = link_elem.get('data-jk') or link_elem.get('id', '').replace('job_', '')
-                            if job_id:
-                                link = f"https://www.indeed.com/viewjob?jk={job_id}"
-                                if is_target_job(title) and is_recent_job(post_date):
-                                    jobs.append((title, link, post_date))
-                
-                await asyncio.sleep(1)
-            except Exception as e:
-                logger.error(f"Error scraping Indeed: {e}")
-                continue
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="google-cse")
+        service = self.service  # Built here rather than raced for by the pool threads
         
+        def timed_execute(query):
+            started = time.monotonic()
+            return self._execute(service, query), time.monotonic() - started
+        
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self._executor, timed_execute, query) for query in queries),
+                                       return_exceptions=True)
+        
+        jobs = []
+        now = time.time()
+        failures = []
+        for query, result in zip(queries, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error in Google search: {result}")
+                fetch_results.inc("google", "error")
+                self._record(query, 0, now)
+                failures.append(result)
+                continue
+            result, seconds = result
+            items = result.get("items", [])
+            fetch_seconds.observe(seconds, "google")
+            fetch_results.inc("google", "parsed")
+            cards_seen.inc("google", amount=len(items))
+            new_jobs = 0
+            for item in items:
+                title = item["title"]
+                if is_target_job(title):
+                    job = Job("google", title, item["link"], company=result_title_company(title))
+                    jobs.append(job)
+                    jobs_matched.inc("google")
+                    if find_seen_job(job) is None:
+                        new_jobs += 1
+            self._record(query, new_jobs, now)
+        # Every query failing (a bad key, an exhausted quota) is the source failing
+        if len(failures) == len(queries):
+            raise failures[0]
         return jobs
-    except Exception as e:
-        logger.error(f"Error in Indeed scraper: {e}")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+google_client = GoogleJobsClient()
+
+# Company named in a search result title such as "Junior Developer - Acme Corp - Pune | LinkedIn"
+# or "Acme Corp hiring Junior Developer in Pune | LinkedIn"; None if there is no clear one
+def result_title_company(title):
+    title = re.split(r"\s+\|\s+", title)[0]
+    hiring = re.match(r"(.+?)\s+(?:is\s+)?hiring\b", title, re.IGNORECASE)
+    if hiring:
+        return hiring.group(1)
+    parts = re.split(r"\s+[-–—]\s+", title)
+    if len(parts) > 1:
+        return parts[1]
+    at = re.search(r"\s+at\s+(.+)$", title)
+    return at.group(1) if at else None
+
+def google_search_enabled():
+    return bool(GOOGLE_CSE_STUB or (GOOGLE_API_KEY and GOOGLE_CSE_ID))
+
+# Google Custom Search API for recent entry-level jobs. Errors are left to the source's
+# circuit breaker.
+async def search_google_jobs():
+    if not google_search_enabled():
         return []
+    return await google_client.search()
+
+# Card and field selectors for each scraped site. Card selectors are tried in order and
+# must be simple "tag.class" selectors; each field is a list of CSS selectors tried in order
+# plus the attribute to read (None = the element's text).
+EXTRACTION_SPECS = {
+    "indeed": {
+        "cards": ["div.job_seen_beacon", "div.tapItem"],
+        "fields": {
+            "title": (["h2.jobTitle", "h2.title"], None),
+            "date": (["span.date", ".date"], None),
+            "location": (["div.companyLocation", "[data-testid='text-location']"], None),
+            "company": (["[data-testid='company-name']", "span.companyName"], None),
+            "href": (["h2.jobTitle a", "h2.title a"], "href"),
+            "job_key": (["h2.jobTitle a", "h2.title a"], "data-jk"),
+            "anchor_id": (["h2.jobTitle a", "h2.title a"], "id")
+        }
+    },
+    "linkedin_jobs": {
+        "cards": ["div.base-card", "li.job-search-card"],
+        "fields": {
+            "title": (["h3.base-search-card__title", "h3.job-search-card__title"], None),
+            "date": (["time", ".job-search-card__listdate"], None),
+            "location": (["span.job-search-card__location"], None),
+            "company": (["h4.base-search-card__subtitle"], None),
+            "href": (["a.base-card__full-link", "a.job-search-card__link"], "href")
+        }
+    },
+    "linkedin_posts": {
+        "cards": ["div.feed-shared-update-v2", "li.reusable-search__result-container"],
+        "fields": {
+            "content": (["div.feed-shared-text", "div.feed-shared-update-v2__description"], None),
+            "company": (["span.feed-shared-actor__title", "span.update-components-actor__title"], None),
+            "href": (["a.app-aware-link", "a.feed-shared-actor__container-link"], "href"),
+            "date": (["span.feed-shared-actor__sub-description", "time"], None)
+        }
+    },
+    "remoteok": {
+        "cards": ["tr.job"],
+        "fields": {
+            "title": (["h2[itemprop=title]"], None),
+            "href": (["a[itemprop=url]"], "href"),
+            "company": (["h3[itemprop=name]"], None),
+            "date": (["td.time"], None)
+        }
+    },
+    "stackoverflow": {
+        "cards": ["div.-job"],
+        "fields": {
+            "title": (["h2 a"], None),
+            "href": (["h2 a"], "href"),
+            "company": (["h3 span"], None),
+            "date": (["span.fc-danger", "span.-posted-date"], None)
+        }
+    },
+    "internshala": {
+        "cards": ["div.internship_meta"],
+        "fields": {
+            "title": (["a.view_detail_button"], None),
+            "href": (["a.view_detail_button"], "href"),
+            "company": ([".company_name"], None),
+            "date": ([".status-container", ".posted"], None)
+        }
+    },
+    "freshersworld": {
+        "cards": ["div.job-container"],
+        "fields": {
+            "title": ([".job-title"], None),
+            "href": (["a"], "href"),
+            "company": ([".job-company"], None),
+            "date": ([".job-date", ".posted-date"], None)
+        }
+    }
+}
+
+# SoupStrainer that only lets the card elements (and everything inside them) into the tree
+def _card_strainer(card_selectors):
+    from bs4 import SoupStrainer
+    wanted = [tuple(selector.split(".", 1)) for selector in card_selectors]
+    
+    def is_card(name, attrs):
+        classes = attrs.get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        return any(name == tag and css_class in classes for tag, css_class in wanted)
+    
+    return SoupStrainer(is_card)
+
+# Parse only the job cards of a page and return one dict of field values per card
+def extract_cards(source, html):
+    from bs4 import BeautifulSoup
+    spec = EXTRACTION_SPECS[source]
+    if "strainer" not in spec:
+        spec["strainer"] = _card_strainer(spec["cards"])
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=spec["strainer"])
+    
+    cards = []
+    for selector in spec["cards"]:
+        cards = soup.select(selector)
+        if cards:
+            break
+    
+    records = []
+    for card in cards:
+        record = {}
+        for field, (selectors, attr) in spec["fields"].items():
+            value = None
+            for selector in selectors:
+                elem = card.select_one(selector)
+                if elem is not None:
+                    value = elem.get_text(strip=True) if attr is None else elem.get(attr)
+                    break
+            record[field] = value
+        records.append(record)
+    cards_seen.inc(source, amount=len(records))
+    return records
+
+# Locate the job-card region of a raw page without parsing it: from the first card tag
+# to the end of the last one, found by balancing that tag's open/close markers.
+def card_region(source, html):
+    start, end = None, None
+    for selector in EXTRACTION_SPECS[source]["cards"]:
+        tag, css_class = selector.split(".", 1)
+        markers = list(re.finditer(rf'<{tag}\b[^>]*class="(?:[^"]*\s)?{re.escape(css_class)}[\s"]', html))
+        if not markers:
+            continue
+        first, last = markers[0].start(), markers[-1].start()
+        depth = 0
+        for match in re.compile(rf"<(/?){tag}\b").finditer(html, last):
+            depth += -1 if match.group(1) else 1
+            if depth == 0:
+                card_end = html.find(">", match.end()) + 1
+                start = first if start is None else min(start, first)
+                end = card_end if end is None else max(end, card_end)
+                break
+    if start is None or end is None:
+        return None
+    return html[start:end]
+
+# Hash of the card region with query strings removed, since tracking parameters
+# change on every request but never reach the links we send
+def card_region_hash(source, html):
+    region = card_region(source, html)
+    if region is None:
+        return None
+    region = re.sub(r'\?[^"\s]*', '', region)
+    return hashlib.blake2b(region.encode('utf-8'), digest_size=16).digest()
+
+# Per-URL validators, card-region hashes and parsed jobs from the last fetch, plus
+# per-source counters for how often a fetch could skip downloading or parsing.
+class PageCache:
+    def __init__(self):
+        self.entries = {}  # url -> {"etag", "last_modified", "region_hash", "size", "jobs", "cards", "handled"}
+        self.stats = {}  # source -> counters
+
+    def source_stats(self, source):
+        if source not in self.stats:
+            self.stats[source] = {"requests": 0, "errors": 0, "not_modified": 0, "unchanged": 0,
+                                  "bytes_downloaded": 0, "bytes_saved": 0}
+        return self.stats[source]
+
+    def hit_rate(self, source):
+        stats = self.source_stats(source)
+        if not stats["requests"]:
+            return 0.0
+        return (stats["not_modified"] + stats["unchanged"]) / stats["requests"]
+
+    def describe(self):
+        lines = []
+        for source, stats in self.stats.items():
+            lines.append(f"{source}: {self.hit_rate(source):.0%} of {stats['requests']} fetches skipped parsing, "
+                         f"{stats['bytes_saved'] / 1024:.0f} KB not downloaded")
+        return "\n".join(lines) or "no fetches yet"
+
+page_cache = PageCache()
+
+# Process pool for PARSE_WORKERS. Workers are spawned rather than forked from the bot's
+# threads and open databases; each one imports this module once.
+def get_parse_pool():
+    global parse_pool
+    if parse_pool is None:
+        parse_pool = ProcessPoolExecutor(PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return parse_pool
 
-async def scrape_linkedin():
+# Job cards extracted so far, over all sources
+def cards_extracted():
+    return sum(cards_seen.values.values())
+
+# Runs in a parse worker: the jobs on a page, how many cards it had and the parse time
+# (the worker's own metrics never reach the bot, so they are passed back)
+def parse_in_worker(source, parse, html):
+    cards_before = cards_extracted()
+    started = time.monotonic()
+    jobs = parse(html)
+    return jobs, cards_extracted() - cards_before, time.monotonic() - started
+
+# The jobs parsed from one result page, plus how many job cards the page had before the
+# role and recency filters: a page of cards that all filter out is not the end of the results
+class PageJobs(list):
+    def __init__(self, jobs=(), cards=0):
+        super().__init__(jobs)
+        self.cards = cards
+
+# Fetch one result page and parse it into jobs, sending If-None-Match/If-Modified-Since
+# when we have validators. A 304, or a page whose card region hashes the same as last
+# time, skips parsing: callers passing include_unchanged=True (/jobs) get the jobs parsed
+# last time, and the rotation gets no jobs once it has handled them. A page last parsed
+# for /jobs still hands its jobs to the rotation the first time round.
+async def fetch_jobs(source, url, parse, include_unchanged=False, headers=None, timeout=15):
+    entry = page_cache.entries.get(url)
+    stats = page_cache.source_stats(source)
+    
+    request_headers = dict(headers or {})
+    if entry and entry["etag"]:
+        request_headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        request_headers["If-Modified-Since"] = entry["last_modified"]
+    
+    stats["requests"] += 1
+    started = time.monotonic()
     try:
-        jobs = []
-        search_terms = [
-            "entry-level-developer", "junior-data-analyst", 
-            "entry-level-tester", "junior-ui-ux-designer"
-        ]
+        response = await http_client.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code != 304:  # raise_for_status() treats a 304 as an error
+            response.raise_for_status()
+    except Exception:
+        stats["errors"] += 1
+        fetch_results.inc(source, "error")
+        raise
+    finally:
+        fetch_seconds.observe(time.monotonic() - started, source)
+    
+    if response.status_code == 304 and entry:
+        stats["not_modified"] += 1
+        stats["bytes_saved"] += entry["size"]
+        fetch_results.inc(source, "not_modified")
+        return cached_jobs(entry, include_unchanged)
+    
+    stats["bytes_downloaded"] += len(response.content)
+    fetch_bytes.inc(source, amount=len(response.content))
+    html = response.text
+    region_hash = card_region_hash(source, html)
+    
+    if entry and region_hash is not None and entry["region_hash"] == region_hash:
+        stats["unchanged"] += 1
+        fetch_results.inc(source, "unchanged")
+        entry["etag"] = response.headers.get("ETag")
+        entry["last_modified"] = response.headers.get("Last-Modified")
+        return cached_jobs(entry, include_unchanged)
+    
+    if PARSE_WORKERS:
+        jobs, cards, seconds = await asyncio.get_running_loop().run_in_executor(
+            get_parse_pool(), parse_in_worker, source, parse, html)
+        cards_seen.inc(source, amount=cards)
+    else:
+        cards_before = cards_extracted()
+        started = time.monotonic()
+        jobs = parse(html)
+        seconds = time.monotonic() - started
+        cards = cards_extracted() - cards_before
+    parse_seconds.observe(seconds, source)
+    fetch_results.inc(source, "parsed")
+    jobs_matched.inc(source, amount=len(jobs))
+    if region_hash is not None:
+        page_cache.entries[url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "region_hash": region_hash,
+            "size": len(response.content),
+            "jobs": jobs,
+            "cards": cards,
+            "handled": not include_unchanged
+        }
+    return PageJobs(jobs, cards)
+
+# Jobs of a page that hasn't changed since it was last parsed. A page the rotation has
+# already handled comes back empty, with no cards, which ends its crawl.
+def cached_jobs(entry, include_unchanged):
+    if include_unchanged:
+        return PageJobs(entry["jobs"], entry["cards"])
+    if entry["handled"]:
+        return PageJobs()
+    entry["handled"] = True
+    return PageJobs(entry["jobs"], entry["cards"])
+
+def parse_indeed_page(html):
+    jobs = []
+    for card in extract_cards("indeed", html):
+        title = card["title"]
+        if title and card["href"]:
+            job_id = card["job_key"] or (card["anchor_id"] or "").replace('job_', '')
+            if job_id:
+                link = f"https://www.indeed.com/viewjob?jk={job_id}"
+                post_date = card["date"] or "Recent"
+                posted_at = normalize_post_date(post_date)
+                if is_target_job(title) and is_recent_timestamp(posted_at):
+                    jobs.append(Job("indeed", title, link, post_date, card["location"], posted_at, card["company"]))
+    return jobs
+
+def parse_linkedin_jobs_page(html):
+    jobs = []
+    for card in extract_cards("linkedin_jobs", html):
+        title = card["title"]
+        link = (card["href"] or "").split('?')[0]
+        post_date = card["date"] or "Recent"
+        posted_at = normalize_post_date(post_date)
+        if title and link and is_target_job(title) and is_recent_timestamp(posted_at):
+            jobs.append(Job("linkedin_jobs", title, link, post_date, card["location"], posted_at, card["company"]))
+    return jobs
+
+def parse_linkedin_posts_page(html):
+    jobs = []
+    for card in extract_cards("linkedin_posts", html):
+        content = card["content"]
+        post_link = (card["href"] or "").split('?')[0]
         
-        for term in search_terms[:2]:
+        # Check if content mentions job opportunities
+        if not content or not post_link or not role_matcher.search(content):
+            continue
+        
+        # Clean and truncate content for title
+        company = card["company"] or "Company"
+        job_title = f"{company}: {content[:50]}..." if len(content) > 50 else f"{company}: {content}"
+        
+        post_date = card["date"] or "Recent"
+        posted_at = normalize_post_date(post_date)
+        if is_recent_timestamp(posted_at):
+            jobs.append(Job("linkedin_posts", job_title, post_link, post_date, None, posted_at, card["company"]))
+    return jobs
+
+def parse_remoteok_page(html):
+    jobs = []
+    for card in extract_cards("remoteok", html):
+        job_title = card["title"]
+        if card["href"] and job_title:
+            link = "https://remoteok.com" + card["href"]
+            post_date = card["date"] or "Recent"
+            posted_at = normalize_post_date(post_date)
+            if is_target_job(job_title) and is_recent_timestamp(posted_at):
+                jobs.append(Job("remoteok", job_title, link, post_date, "Remote", posted_at, card["company"]))
+    return jobs
+
+def parse_stackoverflow_page(html):
+    jobs = []
+    for card in extract_cards("stackoverflow", html):
+        title = card["title"]
+        if title and card["href"]:
+            link = f"https://stackoverflow.com{card['href']}"
+            post_date = card["date"] or "Recent"
+            posted_at = normalize_post_date(post_date)
+            if is_target_job(title) and is_recent_timestamp(posted_at):
+                jobs.append(Job("stackoverflow", title, link, post_date, None, posted_at, card["company"]))
+    return jobs
+
+# Internshala lists internships by category, so every recent one is relevant
+def parse_internshala_page(html):
+    jobs = []
+    for card in extract_cards("internshala", html):
+        if card["title"] and card["href"]:
+            company = card["company"] or "Company"
+            link = "https://internshala.com" + card["href"]
+            post_date = card["date"] or "Recent"
+            posted_at = normalize_post_date(post_date)
+            if is_recent_timestamp(posted_at):
+                jobs.append(Job("internshala", f"{card['title']} at {company}", link, post_date, None, posted_at,
+                                card["company"]))
+    return jobs
+
+def parse_freshersworld_page(html):
+    jobs = []
+    for card in extract_cards("freshersworld", html):
+        if card["title"] and card["href"]:
+            company = card["company"] or "Company"
+            link = card["href"] if card["href"].startswith("http") else "https://www.freshersworld.com" + card["href"]
+            post_date = card["date"] or "Recent"
+            posted_at = normalize_post_date(post_date)
+            if is_recent_timestamp(posted_at):
+                jobs.append(Job("freshersworld", f"{card['title']} - {company}", link, post_date, None, posted_at,
+                                card["company"]))
+    return jobs
+
+# High-water marks for incremental crawling, kept in a JSON file: for every source and query
+# the newest posting time and the newest links seen on its result pages. Result pages are
+# newest first, so once a page shows one of these postings the rest are already known.
+class CrawlMarks:
+    def __init__(self, path):
+        self.path = path
+        self.marks = {}  # source -> query -> {"newest": unix time, "links": [canonical links, newest first]}
+        self.dirty = False
+
+    def load(self):
+        try:
+            if self.path and os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.marks = json.load(f)
+                logger.info(f"Loaded crawl marks for {sum(len(queries) for queries in self.marks.values())} queries")
+        except Exception as e:
+            logger.error(f"Error loading crawl marks: {e}")
+            self.marks = {}
+
+    def get(self, source, query):
+        return self.marks.get(source, {}).get(query)
+
+    # Move the mark of one query past the jobs just crawled (given newest first)
+    def update(self, source, query, jobs):
+        if not jobs:
+            return
+        mark = self.marks.setdefault(source, {}).setdefault(query, {"newest": 0.0, "links": []})
+        mark["newest"] = max([mark["newest"]] + [job.posted_at.timestamp() for job in jobs])
+        links = [job.url for job in jobs] + mark["links"]
+        mark["links"] = list(dict.fromkeys(links))[:CRAWL_MARK_LINKS]
+        self.dirty = True
+
+    # Write the marks if they changed (atomic via rename)
+    def save(self):
+        if not self.dirty or not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.marks, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            logger.error(f"Error saving crawl marks: {e}")
+
+crawl_marks = CrawlMarks(CRAWL_MARKS_FILE)
+
+# Token bucket: refills at `rate` tokens per second up to `capacity`.
+# acquire() waits until a token is free; waiters are served in arrival order.
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    # Take a token only if one is there right now and nobody is waiting for it
+    def try_acquire(self):
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    # Push the bucket into debt so nothing goes out for `seconds` (used for RetryAfter)
+    def pause(self, seconds):
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+# A token bucket with a fast lane: `held` tokens are kept back for urgent callers, and an
+# urgent acquire takes the next token ahead of everyone already waiting. Other callers
+# check again after their wait, as an urgent one may have taken the token they waited for.
+class PriorityTokenBucket(TokenBucket):
+    def __init__(self, rate, capacity=None, held=1):
+        super().__init__(rate, max(capacity if capacity is not None else max(1.0, rate), 1.0 + held))
+        self.held = held
+
+    async def acquire(self, urgent=False):
+        if urgent:
+            self._refill()
+            self.tokens -= 1
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
+            return
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1 + self.held:
+                await asyncio.sleep((1 + self.held - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def try_acquire(self):
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self.tokens < 1 + self.held:
+            return False
+        self.tokens -= 1
+        return True
+
+# Circuit breaker for one source. After `threshold` failed requests in a row it opens and
+# the source's requests are skipped; once `cooldown` seconds have passed one probe request
+# is let through (half-open). A successful probe closes the breaker; a failed one reopens
+# it for twice as long, up to BREAKER_MAX_COOLDOWN.
+class CircuitBreaker:
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.changed_at = time.monotonic()
+
+    def _set_state(self, state):
+        self.state = state
+        self.changed_at = time.monotonic()
+        breaker_state.set(self.STATES[state], self.name)
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+        # A probe that never reported back (e.g. cancelled) is replaced after another cooldown
+        if time.monotonic() - self.changed_at >= self.cooldown:
+            self._set_state("half_open")
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Source {self.name} recovered, closing its circuit")
+            self._set_state("closed")
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self):
+        if self.state == "half_open":
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        elif self.state == "closed":
+            self.failures += 1
+            if self.failures < self.threshold:
+                return
+        else:
+            return
+        logger.warning(f"Source {self.name} is failing, skipping it for {self.cooldown / 60:.0f} min")
+        self._set_state("open")
+
+    def describe(self):
+        if self.state == "closed":
+            return "ok"
+        if self.state == "half_open":
+            return "probing"
+        return f"circuit open, probe in {max(0, self.cooldown - (time.monotonic() - self.changed_at)) / 60:.0f} min"
+
+# A job source and how hard we may hit it. Scraped sites give a URL template filled with
+# each query and the parser for their result pages; API sources give a `search` coroutine
+# function instead. Templates of paginated sites also take {page} (from 1) or {offset}
+# (`page_size` results per page). Page requests run at most `concurrency` at a time and
+# `rate` per second, each with `timeout`, behind the source's circuit breaker. `available`
+# can veto a source that lacks configuration.
+class JobSource:
+    def __init__(self, name, url_template=None, queries=(), parse=None, search=None, headers=None, concurrency=1,
+                 timeout=15, rate=1.0, enabled=True, available=None, page_size=None):
+        self.name = name
+        self.url_template = url_template
+        self.queries = list(queries)
+        self.page_size = page_size
+        self.paginated = bool(url_template) and ("{page}" in url_template or "{offset}" in url_template)
+        self.parse = parse
+        self.search = search
+        self.headers = headers
+        self.timeout = timeout
+        self.enabled = enabled
+        self.available = available
+        self.breaker = CircuitBreaker(name)
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    def page_url(self, query, page=1):
+        return self.url_template.format(query=query, page=page, offset=(page - 1) * (self.page_size or 0))
+
+    # Jobs on one result page (PageJobs); empty when the circuit is open or the fetch
+    # fails, which is also noted in `errors` when given
+    async def fetch_page(self, url, include_unchanged=False, errors=None):
+        async with self.semaphore:
+            if not self.breaker.allow():
+                if errors is not None:
+                    errors.append(f"{self.name}: circuit open")
+                return PageJobs()
+            await self.bucket.acquire()
             try:
-                # Use LinkedIn's date filter parameter
-                url = f"https://www.linkedin.com/jobs/search/?keywords={term}&f_E=2&f_TPR=r604800&sortBy=DD"  # f_E=2 is entry level, f_TPR=r604800 is past week
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                }
-                response = requests.get(url, headers=headers, timeout=15)
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                job_cards = soup.select("div.base-card") or soup.select("li.job-search-card")
-                for card in job_cards:
-                    title_elem = card.select_one("h3.base-search-card__title") or card.select_one("h3.job-search-card__title")
-                    date_elem = card.select_one("time") or card.select_one(".job-search-card__listdate")
-                    link_elem = card.select_one("a.base-card__full-link") or card.select_one("a.job-search-card__link")
-                    
-                    if title_elem and link_elem:
-                        title = title_elem.get_text(strip=True)
-                        post_date = date_elem.get_text(strip=True) if date_elem else "Recent"
-                        link = link_elem.get('href', '').split('?')[0]
-                        
-                        if title and link and is_target_job(title) and is_recent_job(post_date):
-                            jobs.append((title, link, post_date))
-                
-                await asyncio.sleep(1)
+                jobs = await fetch_jobs(self.name, url, self.parse, include_unchanged, headers=self.headers, timeout=self.timeout)
             except Exception as e:
-                logger.error(f"Error scraping LinkedIn: {e}")
-                continue
-                    
-        return jobs
-    except Exception as e:
-        logger.error(f"Error in LinkedIn scraper: {e}")
-        return []
+                logger.error(f"Error scraping {self.name}: {e}")
+                self.breaker.record_failure()
+                if errors is not None:
+                    errors.append(f"{url}: {e}")
+                return PageJobs()
+            self.breaker.record_success()
+            return jobs
 
-async def scrape_linkedin_posts():
-    """Scrape LinkedIn company posts for job announcements"""
-    try:
+    # Jobs for one query, newest first, yielded a page at a time so the first page can be
+    # delivered while the next is still being fetched. Pages are fetched in order until one
+    # shows a posting this query has seen before (by link, or older than the newest one
+    # seen), has no job cards at all or is unchanged, or `max_pages` is reached; a page
+    # whose cards are all filtered out (other roles, too old) doesn't stop it. In steady
+    # state that is one page. update_marks=False leaves the query's crawl mark alone (for
+    # /jobs, whose jobs don't go through the rotation).
+    async def crawl(self, query, include_unchanged=False, max_pages=CRAWL_MAX_PAGES, update_marks=True, errors=None):
+        mark = crawl_marks.get(self.name, query)
+        known = set(mark["links"]) if mark else set()
+        newest = mark["newest"] if mark else 0.0
         jobs = []
-        search_terms = [
-            "hiring freshers", "hiring graduates", "job openings", 
-            "career opportunity", "we are hiring"
-        ]
-        
-        for term in search_terms[:2]:  # Limit to avoid rate limiting
+        collected = set()  # Links already on earlier pages of this crawl
+        for page in range(1, (max_pages if self.paginated else 1) + 1):
+            page_jobs = await self.fetch_page(self.page_url(query, page), include_unchanged, errors)
+            reached = any(job.url in known or job.url in collected or job.posted_at.timestamp() < newest
+                          for job in page_jobs)
+            for job in page_jobs:
+                if job.url not in collected:
+                    collected.add(job.url)
+                    jobs.append(job)
+                    yield job
+            if not page_jobs.cards or reached:
+                break
+        if update_marks:
+            crawl_marks.update(self.name, query, jobs)
+
+    # All current jobs from this source as they arrive. Queries are crawled concurrently
+    # into a bounded queue, so a slow consumer holds the crawls back rather than letting
+    # parsed pages pile up. include_unchanged=True also yields jobs from pages that haven't
+    # changed since the last fetch (for /jobs). Failed pages and searches are skipped and,
+    # when `errors` is given, noted in it.
+    async def stream(self, include_unchanged=False, max_pages=CRAWL_MAX_PAGES, update_marks=True, errors=None):
+        if self.search:
+            if not self.breaker.allow():
+                if errors is not None:
+                    errors.append(f"{self.name}: circuit open")
+                return
             try:
-                # Search for company posts mentioning hiring
-                url = f"https://www.linkedin.com/search/results/content/?keywords={term}&origin=GLOBAL_SEARCH_HEADER&sortBy=date_posted"
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Referer": "https://www.linkedin.com/"
-                }
-                
-                response = requests.get(url, headers=headers, timeout=20)
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # Look for feed posts
-                post_cards = soup.select("div.feed-shared-update-v2") or soup.select("li.reusable-search__result-container")
-                
-                for card in post_cards:
-                    try:
-                        # Extract post content
-                        content_elem = card.select_one("div.feed-shared-text") or card.select_one("div.feed-shared-update-v2__description")
-                        title_elem = card.select_one("span.feed-shared-actor__title") or card.select_one("span.update-components-actor__title")
-                        
-                        if not content_elem:
-                            continue
-                            
-                        content = content_elem.get_text(strip=True)
-                        company = title_elem.get_text(strip=True) if title_elem else "Company"
-                        
-                        # Check if content mentions job opportunities
-                        if any(keyword.lower() in content.lower() for keyword in TARGET_ROLES):
-                            # Find post link
-                            link_elem = card.select_one("a.app-aware-link") or card.select_one("a.feed-shared-actor__container-link")
-                            if link_elem and link_elem.has_attr('href'):
-                                post_link = link_elem.get('href', '').split('?')[0]
-                                
-                                # Clean and truncate content for title
-                                job_title = f"{company}: {content[:50]}..." if len(content) > 50 else f"{company}: {content}"
-                                
-                                # Get date if available
-                                date_elem = card.select_one("span.feed-shared-actor__sub-description") or card.select_one("time")
-                                post_date = date_elem.get_text(strip=True) if date_elem else "Recent"
-                                
-                                if post_link and is_recent_job(post_date):
-                                    jobs.append((job_title, post_link, post_date))
-                    except Exception as e:
-                        logger.error(f"Error processing LinkedIn post: {e}")
-                        continue
-                
-                await asyncio.sleep(2)  # Be nice to LinkedIn
+                jobs = await self.search()
             except Exception as e:
-                logger.error(f"Error scraping LinkedIn posts: {e}")
-                continue
-                
-        return jobs
-    except Exception as e:
-        logger.error(f"Error in LinkedIn posts scraper: {e}")
-        return []
+                logger.error(f"Error searching {self.name}: {e}")
+                self.breaker.record_failure()
+                if errors is not None:
+                    errors.append(f"{self.name}: {e}")
+                return
+            self.breaker.record_success()
+            for job in jobs:
+                yield job
+            return
+        queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        done = object()
 
-async def scrape_remoteok():
-    try:
-        jobs = []
-        search_terms = ["junior-dev", "entry-dev", "junior-data", "junior-security", "ui-ux"]
-        
-        for term in search_terms[:2]:
+        async def crawl_into(query):
             try:
-                url = f"https://remoteok.com/remote-{term}-jobs"
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                }
-                response = requests.get(url, headers=headers, timeout=20)
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                for tr in soup.find_all('tr', class_='job'):
-                    try:
-                        a_tag = tr.find('a', itemprop='url')
-                        if a_tag:
-                            link = "https://remoteok.com" + a_tag['href']
-                            title_tag = tr.find('h2', itemprop='title')
-                            date_tag = tr.find('td', class_='time')
-                            
-                            if title_tag:
-                                job_title = title_tag.get_text(strip=True)
-                                post_date = date_tag.get_text(strip=True) if date_tag else "Recent"
-                                
-                                if is_target_job(job_title) and is_recent_job(post_date):
-                                    jobs.append((job_title, link, post_date))
-                    except Exception:
-                        continue
-                
-                await asyncio.sleep(1)
+                async for job in self.crawl(query, include_unchanged, max_pages, update_marks, errors):
+                    await queue.put(job)
             except Exception as e:
-                logger.error(f"Error scraping RemoteOK: {e}")
-                continue
-                
-        return jobs
-    except Exception as e:
-        logger.error(f"Error in RemoteOK scraper: {e}")
-        return []
+                logger.error(f"Error crawling {self.name} for {query!r}: {e}")
+                if errors is not None:
+                    errors.append(f"{query}: {e}")
+            await queue.put(done)
+
+        tasks = [asyncio.create_task(crawl_into(query)) for query in self.queries]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                job = await queue.get()
+                if job is done:
+                    remaining -= 1
+                else:
+                    yield job
+        finally:
+            for task in tasks:
+                task.cancel()
+            crawl_marks.save()
+
+    # All current jobs from this source as one list
+    async def fetch(self, include_unchanged=False, max_pages=CRAWL_MAX_PAGES, update_marks=True, errors=None):
+        try:
+            return [job async for job in self.stream(include_unchanged, max_pages, update_marks, errors)]
+        except Exception as e:
+            logger.error(f"Error in {self.name} source: {e}")
+            if errors is not None:
+                errors.append(f"{self.name}: {e}")
+            return []
+
+SOURCE_REGISTRY = {}  # name -> JobSource, in polling order
+
+def register_source(source):
+    SOURCE_REGISTRY[source.name] = source
+    return source
 
-# Function to update job sources every minute (rotating through sources)
+# Sources to poll: the names in JOB_SOURCES if set, otherwise every source enabled by default
+def enabled_sources():
+    wanted = [name.strip() for name in (JOB_SOURCES or "").split(",") if name.strip()]
+    return {name: source for name, source in SOURCE_REGISTRY.items()
+            if (name in wanted if wanted else source.enabled) and (source.available is None or source.available())}
+
+# Circuit state of every source that isn't healthy, for /status
+def describe_sources():
+    return "\n".join(f"{name}: {source.breaker.describe()}" for name, source in enabled_sources().items()
+                     if source.breaker.state != "closed")
+
+register_source(JobSource(
+    "indeed",
+    "https://www.indeed.com/jobs?q={query}&sort=date&fromage=7&start={offset}",  # Jobs from last 7 days
+    ["entry+level+developer", "junior+developer", "entry+level+data+analyst", "entry+level+tester"],
+    parse_indeed_page, timeout=15, rate=1.0, page_size=10
+))
+register_source(JobSource(
+    "linkedin_jobs",
+    # f_E=2 is entry level, f_TPR=r604800 is past week
+    "https://www.linkedin.com/jobs/search/?keywords={query}&f_E=2&f_TPR=r604800&sortBy=DD&start={offset}",
+    ["entry-level-developer", "junior-data-analyst", "entry-level-tester", "junior-ui-ux-designer"],
+    parse_linkedin_jobs_page, timeout=15, rate=1.0, page_size=25
+))
+register_source(JobSource(
+    "linkedin_posts",
+    # Company posts mentioning hiring
+    "https://www.linkedin.com/search/results/content/?keywords={query}&origin=GLOBAL_SEARCH_HEADER&sortBy=date_posted&page={page}",
+    ["hiring freshers", "hiring graduates", "job openings", "career opportunity", "we are hiring"],
+    parse_linkedin_posts_page, headers={"Referer": "https://www.linkedin.com/"}, timeout=20,
+    rate=0.5  # Be nice to LinkedIn
+))
+# RemoteOK lists every open job of a tag on one page
+register_source(JobSource(
+    "remoteok",
+    "https://remoteok.com/remote-{query}-jobs",
+    ["junior-dev", "entry-dev", "junior-data", "junior-security", "ui-ux"],
+    parse_remoteok_page, timeout=20, rate=1.0
+))
+register_source(JobSource("google", search=search_google_jobs, available=google_search_enabled))
+# Sources from older versions of the bot. Stack Overflow Jobs was shut down in 2022 and the
+# other two have changed their markup since, so they are off unless named in JOB_SOURCES;
+# if one fails anyway, its circuit breaker stops it from costing a timeout every poll.
+register_source(JobSource(
+    "stackoverflow",
+    "https://stackoverflow.com/jobs?q={query}&sort=p&pg={page}",  # Sort by publication date
+    ["junior+developer", "entry+level+data", "junior+tester", "entry+level+security", "junior+ui+ux"],
+    parse_stackoverflow_page, timeout=15, rate=1.0, enabled=False
+))
+register_source(JobSource(
+    "internshala",
+    "https://internshala.com/internships/{query}/page-{page}/",
+    ["web-development", "data-science", "ui-ux-design", "cyber-security"],
+    parse_internshala_page, timeout=15, rate=1.0, enabled=False
+))
+register_source(JobSource(
+    "freshersworld",
+    "https://www.freshersworld.com/jobs/search?job={query}&limit=50&sort=date&offset={offset}",
+    ["software-developer", "data-analyst", "software-tester", "cyber-security", "ui-designer"],
+    parse_freshersworld_page, timeout=15, rate=1.0, enabled=False, page_size=50
+))
+
+# Check one job source and broadcast its new jobs; returns the number of new jobs
 async def check_job_source(source_name):
     logger.info(f"Checking job source: {source_name}")
-    jobs = []
-    
-    if source_name == "indeed":
-        jobs = await scrape_indeed()
-    elif source_name == "linkedin_jobs":
-        jobs = await scrape_linkedin()
-    elif source_name == "linkedin_posts":
-        jobs = await scrape_linkedin_posts()
-    elif source_name == "remoteok":
-        jobs = await scrape_remoteok()
-    elif source_name == "google":
-        if GOOGLE_API_KEY and GOOGLE_CSE_ID:
-            jobs = search_google_jobs()
-            
-    if jobs:
-        await send_jobs_to_users(jobs)
+    return await send_jobs_to_users(SOURCE_REGISTRY[source_name].stream(), source_name)
 
-# Create a rotation of job sources to check
-def rotate_job_sources():
-    sources = ["indeed", "linkedin_jobs", "linkedin_posts", "remoteok", "google"]
-    current_index = 0
-    
-    def get_next_source():
-        nonlocal current_index
-        source = sources[current_index]
-        current_index = (current_index + 1) % len(sources)
-        return source
-    
-    return get_next_source
+# Polls each job source on its own interval inside the bot's event loop.
+# After every poll the source's interval is steered by exponentially weighted averages of
+# its new jobs per poll, its request error rate and its latency: sources yielding more
+# than POLL_TARGET_NEW_JOBS are polled sooner, cold ones later, and failing or slow ones
+# back off. If the intervals together would exceed POLL_BUDGET_PER_HOUR, all of them are
+# stretched proportionally so the request budget stays the same.
+class AdaptiveScheduler:
+    SMOOTHING = 0.3  # Weight of the newest observation in the moving averages
 
-async def send_jobs_to_users(jobs):
-    try:
-        if not subscribed_users or not jobs:
-            return
-            
-        bot = Bot(BOT_TOKEN)
+    def __init__(self, check_source, source_names, base_interval=POLL_BASE_INTERVAL, min_interval=POLL_MIN_INTERVAL,
+                 max_interval=POLL_MAX_INTERVAL, budget_per_hour=POLL_BUDGET_PER_HOUR):
+        self.check_source = check_source
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_per_hour = budget_per_hour
+        self.running = False
+        self._tasks = []
+        # Stagger the first polls so sources don't all fire at once
+        self.states = {
+            name: {"interval": base_interval, "next_run": index * base_interval / max(1, len(source_names)),
+                   "new_rate": POLL_TARGET_NEW_JOBS, "error_rate": 0.0, "latency": 0.0, "polls": 0}
+            for index, name in enumerate(source_names)
+        }
+
+    # Multiplier that keeps the sum of poll rates within the hourly budget
+    def budget_scale(self):
+        polls_per_hour = sum(3600 / state["interval"] for state in self.states.values())
+        return max(1.0, polls_per_hour / self.budget_per_hour)
+
+    def _next_interval(self, state, failed):
+        if failed:
+            return min(self.max_interval, state["interval"] * 2)
+        factor = (POLL_TARGET_NEW_JOBS / max(state["new_rate"], 0.1)) ** 0.5
+        interval = state["interval"] * min(2.0, max(0.5, factor))
+        floor = self.min_interval * (1 + 4 * state["error_rate"]) * max(1.0, state["latency"] / POLL_SLOW_LATENCY)
+        return min(self.max_interval, max(floor, interval))
+
+    async def poll(self, name):
+        state = self.states[name]
+        stats_before = dict(page_cache.source_stats(name))
+        started = time.monotonic()
+        failed = False
+        try:
+            new_jobs = await self.check_source(name)
+        except Exception as e:
+            logger.error(f"Error checking source {name}: {e}")
+            new_jobs, failed = 0, True
+        latency = time.monotonic() - started
         
-        # Filter for recent, relevant and new jobs
-        new_jobs = []
-        for job_data in jobs:
-            job_title, link = job_data[0], job_data[1]
-            post_date = job_data[2] if len(job_data) > 2 else "Recent"
-            
-            # Check if we've seen this job before
-            unique_id = f"{job_title}_{link}"
-            if unique_id not in sent_jobs:
-                sent_jobs.add(unique_id)
-                # Clean job title of any special characters for Markdown
-                job_title = job_title.replace("*", "").replace("_", "").replace("`", "").replace("[", "").replace("]", "")
-                new_jobs.append((job_title, link, post_date))
+        # Scrapers log and skip failed requests, so read their error rate from the fetch counters
+        stats = page_cache.source_stats(name)
+        requests = stats["requests"] - stats_before["requests"]
+        errors = stats["errors"] - stats_before["errors"]
+        error_fraction = 1.0 if failed else errors / requests if requests else 0.0
+        failed = failed or (requests > 0 and errors == requests)
         
-        if not new_jobs:
+        alpha = self.SMOOTHING
+        state["new_rate"] = (1 - alpha) * state["new_rate"] + alpha * new_jobs
+        state["error_rate"] = (1 - alpha) * state["error_rate"] + alpha * error_fraction
+        state["latency"] = latency if not state["polls"] else (1 - alpha) * state["latency"] + alpha * latency
+        state["polls"] += 1
+        state["interval"] = self._next_interval(state, failed)
+        
+        # +/-10% jitter keeps sources from falling into lockstep
+        delay = state["interval"] * self.budget_scale() * random.uniform(0.9, 1.1)
+        state["next_run"] = asyncio.get_running_loop().time() + delay
+        logger.info(f"Source {name}: {new_jobs} new jobs in {latency:.1f}s, next check in {delay / 60:.1f} min")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        for state in self.states.values():
+            state["next_run"] += loop.time()
+        while True:
+            name, state = min(self.states.items(), key=lambda item: item[1]["next_run"])
+            delay = state["next_run"] - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.poll(name)
+
+    async def _every(self, seconds, callback):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in periodic task: {e}")
+
+    # Run callback every `seconds` alongside the polling loop
+    def every(self, seconds, callback):
+        self._tasks.append(asyncio.create_task(self._every(seconds, callback)))
+
+    def start(self):
+        self._tasks.append(asyncio.create_task(self._run()))
+        self.running = True
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self.running = False
+
+    def describe(self):
+        scale = self.budget_scale()
+        return "\n".join(
+            f"{name}: every {state['interval'] * scale / 60:.0f} min, {state['new_rate']:.1f} new/poll"
+            + (f", {state['error_rate']:.0%} errors" if state["error_rate"] >= 0.05 else "")
+            for name, state in self.states.items()
+        )
+
+# Telegram counts message length in UTF-16 code units
+def message_length(text):
+    return len(text.encode('utf-16-le')) // 2
+
+# Render one job as a MarkdownV2 entry. Unlike legacy Markdown, V2 lets us escape
+# reserved characters inside the bold title instead of stripping them.
+def render_job(job_title, link, post_date):
+    job_title = escape_markdown(job_title, version=2)
+    post_date = escape_markdown(post_date, version=2)
+    link = escape_markdown(link, version=2, entity_type='text_link')
+    return f"💼 *{job_title}*\n🔗 [Apply Here]({link})\n⏰ Posted: {post_date}"
+
+# Pack rendered jobs into as few messages as fit under Telegram's length limit
+def build_digests(entries, limit=TELEGRAM_MAX_MESSAGE_LENGTH):
+    messages = []
+    current = ""
+    for entry in entries:
+        if message_length(entry) > limit:
+            # Only pathological titles get here; drop the entry rather than send broken markup
+            logger.warning("Skipping job entry longer than a Telegram message")
+            continue
+        candidate = f"{current}\n\n{entry}" if current else entry
+        if current and message_length(candidate) > limit:
+            messages.append(current)
+            candidate = entry
+        current = candidate
+    if current:
+        messages.append(current)
+    return messages
+
+def get_delivery_mode(user_id):
+    return delivery_modes.get(user_id, DEFAULT_DELIVERY_MODE)
+
+# Render jobs for one user in their chosen delivery mode
+def render_jobs_for_user(user_id, jobs):
+    entries = [job.message for job in jobs]
+    if get_delivery_mode(user_id) == "digest":
+        return build_digests(entries)
+    return entries
+
+# Bot API endpoints to use instead of api.telegram.org, if configured
+def bot_api_urls():
+    if not TELEGRAM_API_URL:
+        return {}
+    base = TELEGRAM_API_URL.rstrip('/')
+    return {"base_url": f"{base}/bot", "base_file_url": f"{base}/file/bot"}
+
+# Telegram errors that fail the same way however often the send is retried
+def is_permanent_send_error(e):
+    return isinstance(e, (Forbidden, BadRequest, ChatMigrated, InvalidToken))
+
+# Seconds a RetryAfter asks us to wait
+def retry_after_seconds(e):
+    return e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+
+# Requests for the application's bot, which answers commands. Sends wait for `acquire`
+# (the broadcaster's interactive budget) first, so replies stay inside the share of
+# Telegram's limit kept for them however busy a broadcast is; on RetryAfter `on_flood` is
+# told and the send is retried. Other calls (getMe, setWebhook...) go straight through.
+class LaneRequest(HTTPXRequest):
+    def __init__(self, acquire, on_flood, **kwargs):
+        super().__init__(**kwargs)
+        self.acquire = acquire
+        self.on_flood = on_flood
+
+    async def post(self, url, *args, **kwargs):
+        if not url.rsplit("/", 1)[-1].startswith("send"):
+            return await super().post(url, *args, **kwargs)
+        while True:
+            await self.acquire()
+            try:
+                return await super().post(url, *args, **kwargs)
+            except RetryAfter as e:
+                flood_waits.inc()
+                retry_after = retry_after_seconds(e)
+                logger.warning(f"Flood limit hit on a command reply, retrying in {retry_after}s")
+                self.on_flood(retry_after)
+
+# Sends Telegram messages as fast as the flood limits allow.
+# A global bucket enforces the bot-wide rate and a bucket per chat enforces the
+# per-chat rate; RetryAfter responses pause the global bucket and the send is retried.
+#
+# Messages go through the outbox: a dispatcher claims batches of due messages and hands
+# them to workers chat by chat, round-robin, with at most one send in flight per chat so
+# each chat gets its messages in order. Permanent failures are dead-lettered (and
+# reported to on_dead); anything else is retried with exponential backoff until
+# OUTBOX_MAX_ATTEMPTS. A burst of jobs only grows the queue.
+#
+# There are two lanes. Broadcasts (PRIORITY_BULK) are topped up a batch at a time and
+# sent by `concurrency` workers on the global bucket. Answers to a user's own command
+# (PRIORITY_INTERACTIVE) are claimed as soon as they are queued, however much bulk is
+# buffered, and sent by their own `interactive_concurrency` workers on a separate bucket
+# of `interactive_rate`, so a broadcast never holds them up. When that bucket is empty
+# they borrow from the global one if it has a token to spare, so a burst of commands
+# between broadcasts isn't held to the reserved rate. Command replies sent by the
+# application draw on the same budget through LaneRequest. With interactive_rate=0 both
+# lanes share the global bucket.
+#
+# Telegram's global limit is per bot, so the interactive rate is taken out of it and
+# delivery workers split the rest evenly. Workers notice messages queued by worker 0 on
+# their next poll of the outbox.
+class Broadcaster:
+    LANES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+
+    def __init__(self, global_rate=(TELEGRAM_GLOBAL_RATE - TELEGRAM_INTERACTIVE_RATE) / WORKER_COUNT,
+                 chat_rate=TELEGRAM_CHAT_RATE, concurrency=BROADCAST_CONCURRENCY, interactive_rate=TELEGRAM_INTERACTIVE_RATE,
+                 interactive_concurrency=INTERACTIVE_CONCURRENCY, bot=None, outbox=None, on_delivered=None, on_dead=None):
+        self.chat_rate = chat_rate
+        self.concurrency = concurrency
+        self.interactive_concurrency = interactive_concurrency
+        self.global_bucket = TokenBucket(global_rate)
+        # A token is kept back so a command reply never waits behind queued /jobs results
+        self.interactive_bucket = PriorityTokenBucket(interactive_rate) if interactive_rate else self.global_bucket
+        self.chat_buckets = {}
+        self.outbox = outbox or Outbox()
+        self.on_delivered = on_delivered  # Called with chat_id after each delivered message
+        self.on_dead = on_dead  # Called with (chat_id, exc) when a message is dead-lettered
+        self.last_stats = None
+        self._bot = bot
+        self._tasks = []
+        self._queued = {lane: {} for lane in self.LANES}  # lane -> chat_id -> deque of claimed messages
+        self._ready_chats = {lane: asyncio.Queue() for lane in self.LANES}  # Chats with queued messages and nothing in flight
+        self._buffered = {lane: 0 for lane in self.LANES}
+        self._in_flight = {}  # message id -> message
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stats = None
+
+    @property
+    def bot(self):
+        if self._bot is None:
+            # One pooled connection per concurrent send
+            pool_size = self.concurrency + self.interactive_concurrency
+            self._bot = Bot(BOT_TOKEN, request=HTTPXRequest(connection_pool_size=pool_size), **bot_api_urls())
+        return self._bot
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return self.chat_buckets[chat_id]
+
+    # Wait for an interactive send's turn: the reserved budget, else an idle bulk token.
+    # A reply to a command being handled right now (urgent) goes ahead of queued /jobs results.
+    async def acquire_interactive(self, urgent=False):
+        if self.interactive_bucket is self.global_bucket:
+            return await self.global_bucket.acquire()
+        if self.interactive_bucket.try_acquire() or self.global_bucket.try_acquire():
             return
-            
-        logger.info(f"Found {len(new_jobs)} new recent jobs to send to {len(subscribed_users)} users")
+        await self.interactive_bucket.acquire(urgent)
+
+    # Hold back both lanes: Telegram's flood limit is for the whole bot
+    def pause(self, seconds):
+        self.global_bucket.pause(seconds)
+        if self.interactive_bucket is not self.global_bucket:
+            self.interactive_bucket.pause(seconds)
+
+    async def send(self, chat_id, text, priority=PRIORITY_BULK, **kwargs):
+        acquire = self.acquire_interactive if priority == PRIORITY_INTERACTIVE else self.global_bucket.acquire
+        while True:
+            # The chat's token is taken last, right before the send: taken first, it could be
+            # spent during a long wait for the global one and a chat's sends would bunch up
+            await acquire()
+            await self._chat_bucket(chat_id).acquire()
+            started = time.monotonic()
+            try:
+                message = await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                send_seconds.observe(time.monotonic() - started)
+                messages_sent.inc()
+                return message
+            except RetryAfter as e:
+                flood_waits.inc()
+                retry_after = retry_after_seconds(e)
+                logger.warning(f"Flood limit hit, retrying chat {chat_id} in {retry_after}s")
+                self.pause(retry_after)
+
+    # Queue (chat_id, text) pairs for delivery on one lane; send_kwargs are passed to send_message
+    def enqueue(self, messages, priority=PRIORITY_BULK, **send_kwargs):
+        count = self.outbox.enqueue(messages, priority, **send_kwargs)
+        if any(self.outbox.owns(chat_id, priority) for chat_id, _ in messages):
+            self._idle.clear()
+            self._wakeup.set()
+        return count
+
+    def _claim(self, lane):
+        items = self.outbox.claim(OUTBOX_BATCH - self._buffered[lane], lane)
+        queued = self._queued[lane]
+        for item in items:
+            chat_id = item["chat_id"]
+            if chat_id not in queued:
+                queued[chat_id] = deque()
+                self._ready_chats[lane].put_nowait(chat_id)
+            queued[chat_id].append(item)
+        self._buffered[lane] += len(items)
+        return len(items)
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            # Interactive messages are claimed whenever they turn up, bulk once half a batch is sent
+            claimed = self._claim(PRIORITY_INTERACTIVE)
+            if self._buffered[PRIORITY_BULK] < OUTBOX_BATCH // 2:
+                claimed += self._claim(PRIORITY_BULK)
+            if claimed and self._stats is None:
+                self._stats = {"sent": 0, "failed": 0, "retried": 0, "started": time.monotonic()}
+                self._idle.clear()
+            if self._stats is not None and not any(self._buffered.values()):
+                self._finish_broadcast()
+            # A timer rather than wait_for, which can swallow shutdown()'s cancel on Python < 3.12
+            # when a wakeup lands at the same moment
+            timer = asyncio.get_running_loop().call_later(OUTBOX_POLL_INTERVAL, self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+            finally:
+                timer.cancel()
+
+    def _finish_broadcast(self):
+        stats, self._stats = self._stats, None
+        stats["seconds"] = time.monotonic() - stats.pop("started")
+        stats["messages"] = stats["sent"] + stats["failed"]
+        stats["finished_at"] = datetime.now()
+        broadcast_seconds.observe(stats["seconds"])
+        self.last_stats = stats
+        # Per-chat buckets are only needed while messages are flowing
+        self.chat_buckets.clear()
+        self._idle.set()
+        logger.info(f"Outbox drained: {stats['sent']} messages sent, {stats['failed']} failed, "
+                    f"{stats['retried']} rescheduled in {stats['seconds']:.1f}s")
+
+    async def _worker(self, lane):
+        while True:
+            chat_id = await self._ready_chats[lane].get()
+            queued = self._queued[lane]
+            item = queued[chat_id].popleft()
+            self._in_flight[item["id"]] = item
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                logger.error(f"Error delivering queued message {item['id']}: {e}")
+            # A cancelled delivery never gets here and stays in _in_flight for shutdown() to release
+            del self._in_flight[item["id"]]
+            self._buffered[lane] -= 1
+            if queued[chat_id]:
+                self._ready_chats[lane].put_nowait(chat_id)
+            else:
+                del queued[chat_id]
+            self._wakeup.set()
+
+    async def _deliver(self, item):
+        chat_id = item["chat_id"]
+        try:
+            await self.send(chat_id, priority=item["priority"], **item["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            send_failures.inc(type(e).__name__)
+            attempts = item["attempts"] + 1
+            error = f"{type(e).__name__}: {e}"
+            if is_permanent_send_error(e) or attempts >= OUTBOX_MAX_ATTEMPTS:
+                self.outbox.dead(item["id"], error)
+                self._count("failed")
+                if self.on_dead:
+                    self.on_dead(chat_id, e)
+            else:
+                delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                logger.warning(f"Send to chat {chat_id} failed ({error}), retry {attempts} in {delay:.0f}s")
+                self.outbox.retry(item["id"], attempts, delay, error)
+                send_retries.inc()
+                self._count("retried")
+            return
+        self.outbox.ack(item["id"])
+        outbox_wait_seconds.observe(time.time() - item["created_at"])
+        self._count("sent")
+        if self.on_delivered:
+            self.on_delivered(chat_id)
+
+    def _count(self, key):
+        if self._stats is not None:
+            self._stats[key] += 1
+
+    # Wait until everything due has been handled
+    async def wait_idle(self):
+        await self._idle.wait()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._dispatch())]
+        self._tasks += [asyncio.create_task(self._worker(PRIORITY_BULK)) for _ in range(self.concurrency)]
+        self._tasks += [asyncio.create_task(self._worker(PRIORITY_INTERACTIVE)) for _ in range(self.interactive_concurrency)]
+
+    # Stop the workers and hand every claimed message back to the queue
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        claimed = [item["id"] for queued in self._queued.values() for items in queued.values() for item in items]
+        claimed += list(self._in_flight)
+        if claimed:
+            self.outbox.release(claimed)
+        self._queued = {lane: {} for lane in self.LANES}
+        self._in_flight.clear()
+        self._ready_chats = {lane: asyncio.Queue() for lane in self.LANES}
+        self._buffered = {lane: 0 for lane in self.LANES}
+
+# Remember when a user last got a message from us
+def record_delivery(user_id):
+    subscriber_store.write(user_id, last_delivery=time.time())
+
+# A message to this user failed for good; drop users who blocked the bot or are gone.
+# Delivery workers only mark them in the database, worker 0 picks that up with sync_unsubscribed().
+def handle_dead_letter(user_id, e):
+    if isinstance(e, Forbidden) or "blocked" in str(e).lower() or "not found" in str(e).lower():
+        if WORKER_INDEX:
+            logger.warning(f"User {user_id} has blocked the bot or deleted account, removing")
+            subscriber_store.write(user_id, subscribed=0)
+        elif user_id in subscribed_users:
+            logger.warning(f"User {user_id} has blocked the bot or deleted account, removing")
+            unsubscribe_user(user_id)
+    else:
+        logger.error(f"Giving up on a message to user {user_id}: {e}")
+
+broadcaster = Broadcaster(on_delivered=record_delivery, on_dead=handle_dead_letter)
+
+# Drop users that other delivery workers found to have blocked the bot
+def sync_unsubscribed():
+    for user_id in subscriber_store.unsubscribed() & subscribed_users:
+        logger.info(f"User {user_id} was removed by a delivery worker")
+        unsubscribe_user(user_id)
+
+# Jobs from a list or from a source's stream, one at a time
+async def iterate_jobs(jobs):
+    if hasattr(jobs, "__aiter__"):
+        async for job in jobs:
+            yield job
+    else:
+        for job in jobs:
+            yield job
+
+# Queue messages for many users, message-major: the outbox is claimed oldest first, so
+# interleaving users keeps every claimed batch spread over many chats. Written
+# OUTBOX_ENQUEUE_CHUNK at a time, giving commands a turn on the event loop in between.
+async def enqueue_for_users(user_messages):
+    messages = []
+    rounds = max((len(user_msgs) for user_msgs in user_messages.values()), default=0)
+    for index in range(rounds):
+        messages.extend((user_id, user_msgs[index]) for user_id, user_msgs in user_messages.items()
+                        if index < len(user_msgs))
+    queued = 0
+    for start in range(0, len(messages), OUTBOX_ENQUEUE_CHUNK):
+        queued += broadcaster.enqueue(messages[start:start + OUTBOX_ENQUEUE_CHUNK],
+                                      parse_mode='MarkdownV2', disable_web_page_preview=False)
+        await asyncio.sleep(0)
+    return queued
+
+# Deliver a source's jobs as they arrive; returns the number of new jobs.
+# `jobs` is a list or a source's stream. A dedup stage marks each job seen and passes new
+# ones through a bounded queue to the router, which takes whatever has piled up, freshest
+# first, and routes it through the preference index. Users in job mode have their
+# messages queued straight away, so the first page of a source is on its way while later
+# pages are still being fetched; digest users get theirs packed once the source is done.
+async def send_jobs_to_users(jobs, source="unknown"):
+    try:
+        if not subscribed_users:
+            # Still run the source to the end so its crawl marks stay current
+            async for _ in iterate_jobs(jobs):
+                pass
+            return 0
+        
+        new_jobs = asyncio.Queue(STREAM_QUEUE_SIZE)
+        done = object()
         
-        # Send each new job to all subscribed users
-        for user_id in list(subscribed_users):
+        # Check if we've seen each job before, here or from another source
+        async def dedup():
             try:
-                jobs_sent = 0
-                for job_title, link, post_date in new_jobs:
-                    message = f"💼 *{job_title}*\n🔗 [Apply Here]({link})\n⏰ Posted: {post_date}"
-                    try:
-                        await bot.send_message(
-                            chat_id=user_id,
-                            text=message,
-                            parse_mode='Markdown',
-                            disable_web_page_preview=False
-                        )
-                        jobs_sent += 1
-                        await asyncio.sleep(0.3)
-                    except Exception as e:
-                        if "blocked" in str(e).lower() or "not found" in str(e).lower():
-                            logger.warning(f"User {user_id} has blocked the bot or deleted account, removing")
-                            subscribed_users.discard(user_id)
-                            save_users()
-                        else:
-                            logger.error(f"Error sending job to user {user_id}: {e}")
-                
-                if jobs_sent > 0:
-                    logger.info(f"Sent {jobs_sent} new jobs to user {user_id}")
+                async for job in iterate_jobs(jobs):
+                    seen = mark_job_seen(job)
+                    if seen is None:
+                        jobs_new.inc(source)
+                        await new_jobs.put(job)
+                    else:
+                        jobs_deduped.inc(source)
+                        if seen == "near_duplicate":
+                            jobs_near_duplicate.inc(source)
             except Exception as e:
-                logger.error(f"Error processing user {user_id}: {e}")
+                logger.error(f"Error reading jobs from {source}: {e}")
+            await new_jobs.put(done)
+        
+        dedup_task = asyncio.create_task(dedup())
+        digest_entries = {}
+        routed = queued = 0
+        try:
+            finished = False
+            while not finished:
+                batch = [await new_jobs.get()]
+                while not new_jobs.empty():
+                    batch.append(new_jobs.get_nowait())
+                if batch[-1] is done:
+                    batch.pop()
+                    finished = True
+                
+                # Freshest jobs first; every job is rendered once however many users get it
+                batch.sort(key=lambda job: job.posted_at, reverse=True)
+                user_entries = {}
+                for job in batch:
+                    for user_id in subscriber_index.recipients(job.roles, job.location):
+                        entries = digest_entries if get_delivery_mode(user_id) == "digest" else user_entries
+                        entries.setdefault(user_id, []).append(job.message)
+                    await asyncio.sleep(0)
+                queued += await enqueue_for_users(user_entries)
+                routed += len(batch)
+            
+            # Digest users get their entries packed
+            queued += await enqueue_for_users({user_id: build_digests(entries) for user_id, entries in digest_entries.items()})
+        finally:
+            dedup_task.cancel()
+        
+        if routed:
+            logger.info(f"Routed {routed} new jobs from {source} to {len(subscribed_users)} users, "
+                        f"queued {queued} messages")
+        return routed
                 
     except Exception as e:
         logger.error(f"Error in send_jobs_to_users: {e}")
+        return 0
 
 def start_scheduler():
     global scheduler
     
     if scheduler:
-        scheduler.shutdown(wait=False)
-    
-    scheduler = BackgroundScheduler()
-    get_next_source = rotate_job_sources()
-
-    # Function that runs every minute to check one job source
-    def check_next_source():
-        source = get_next_source()
-        asyncio.create_task(check_job_source(source))
-
-    # Run every minute
-    scheduler.add_job(check_next_source, 'interval', minutes=1)
+        scheduler.shutdown()
     
-    # Limit the number of jobs we keep in memory (to prevent memory leaks)
-    def cleanup_job_cache():
-        global sent_jobs
-        if len(sent_jobs) > 1000:
-            # Keep only the most recent 500 jobs
-            sent_jobs = set(list(sent_jobs)[-500:])
+    sources = list(enabled_sources())
+    scheduler = AdaptiveScheduler(check_job_source, sources)
     
-    scheduler.add_job(cleanup_job_cache, 'interval', hours=12)
+    # Forget jobs older than the recency window
+    scheduler.every(12 * 3600, sent_jobs.expire)
+    scheduler.every(12 * 3600, near_duplicates.expire)
+    if WORKER_COUNT > 1:
+        scheduler.every(60, sync_unsubscribed)
     
     scheduler.start()
-    logger.info("Scheduler started - checking one job source every minute...")
+    logger.info(f"Scheduler started - adaptive polling of {len(sources)} job sources...")
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_chat.id
     
     if user_id not in subscribed_users:
-        subscribed_users.add(user_id)
-        save_users()
+        subscribe_user(user_id)
         await update.message.reply_text(
             'Welcome to the Entry-Level IT Job Alert Bot! 🚀\n\n'
-            'You will now receive recent entry-level IT job updates every minute.\n\n'
+            'You will now receive recent entry-level IT jobs as soon as we find them. '
+            'Busy sources are checked every few minutes, quieter ones up to hourly.\n\n'
             'Type /help to see all available commands.'
         )
     else:
@@ -493,23 +2759,106 @@ async def stop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_chat.id
     
     if user_id in subscribed_users:
-        subscribed_users.discard(user_id)
-        save_users()
+        unsubscribe_user(user_id)
         await update.message.reply_text('Varta mame durrrrr👋')
     else:
         await update.message.reply_text('You are not currently subscribed to job alerts.')
 
+# Describe a user's filters for replies and /status
+def describe_prefs(user_id):
+    prefs = user_prefs.get(user_id, {})
+    roles = ", ".join(sorted(prefs["roles"])) if prefs.get("roles") else "all roles"
+    location = prefs.get("location") or "anywhere"
+    remote = " (remote only)" if prefs.get("remote") and not prefs.get("location") else " or remote" if prefs.get("remote") else ""
+    return f"Roles: {roles}\nLocation: {location}{remote}"
+
+# Update a user's filters and re-index them
+def update_prefs(user_id, **changes):
+    prefs = dict(user_prefs.get(user_id, {}))
+    prefs.update(changes)
+    user_prefs[user_id] = prefs
+    if user_id in subscribed_users:
+        subscriber_index.add(user_id, prefs)
+    save_user(user_id)
+
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_chat.id
+    keywords = [keyword.strip() for keyword in " ".join(context.args).split(",") if keyword.strip()]
+    
+    roles = set()
+    unknown = []
+    for keyword in keywords:
+        resolved = resolve_role_keyword(keyword)
+        if resolved:
+            roles |= resolved
+        else:
+            unknown.append(keyword)
+    
+    if unknown:
+        await update.message.reply_text(
+            f"Unknown role(s): {', '.join(unknown)}\n"
+            f"Try one of: {', '.join(sorted(role_matcher.phrases))}"
+        )
+        return
+    
+    if user_id not in subscribed_users:
+        subscribe_user(user_id)
+    update_prefs(user_id, roles=sorted(roles))
+    await update.message.reply_text(f"✅ Subscribed to job alerts\n{describe_prefs(user_id)}")
+
+async def location_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_chat.id
+    location = " ".join(context.args).strip().lower()
+    
+    if not location:
+        await update.message.reply_text(f"{describe_prefs(user_id)}\nUse /location <city or country> or /location any to change it.")
+        return
+    
+    update_prefs(user_id, location=None if location == "any" else location)
+    await update.message.reply_text(f"📍 Location filter updated\n{describe_prefs(user_id)}")
+
+async def remote_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_chat.id
+    choice = context.args[0].lower() if context.args else ""
+    
+    if choice not in ("on", "off"):
+        await update.message.reply_text(f"{describe_prefs(user_id)}\nUse /remote on or /remote off to change it.")
+        return
+    
+    update_prefs(user_id, remote=choice == "on")
+    await update.message.reply_text(f"🌍 Remote filter updated\n{describe_prefs(user_id)}")
+
+async def digest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_chat.id
+    choice = context.args[0].lower() if context.args else ""
+    
+    if choice not in ("on", "off"):
+        current = "digest" if get_delivery_mode(user_id) == "digest" else "one message per job"
+        await update.message.reply_text(f'Current delivery: {current}\nUse /digest on or /digest off to change it.')
+        return
+    
+    delivery_modes[user_id] = "digest" if choice == "on" else "job"
+    save_user(user_id)
+    if choice == "on":
+        await update.message.reply_text('📦 New jobs will now be grouped into digest messages.')
+    else:
+        await update.message.reply_text('💼 New jobs will now be sent one message per job.')
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     help_text = """
 *Entry-Level IT Job Alert Bot - Commands*
 
 /start - Subscribe to job alerts
+/subscribe qa, data analyst - Only get these roles (no roles = all roles)
+/location city - Only get jobs in this location (/location any to clear)
+/remote on|off - Only get remote jobs, or remote jobs plus your location
 /stop - Unsubscribe from job alerts
 /help - Show this help message
 /jobs - Check for new jobs now
 /status - Check bot status
+/digest on|off - Group new jobs into digest messages
 
-The bot automatically checks for recent entry-level IT jobs every minute from global sources. We focus on the past week's job postings for freshers and entry-level roles.
+The bot automatically checks global sources for recent entry-level IT jobs: busy sources every few minutes, quieter ones less often (up to hourly). Use /jobs to check right away. We focus on the past week's job postings for freshers and entry-level roles.
     """
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
@@ -517,20 +2866,160 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_chat.id
     
     subscription_status = "🟢 Subscribed" if user_id in subscribed_users else "🔴 Not subscribed"
+    user_record = subscriber_store.get(user_id)
+    since = (f"Subscribed since: {datetime.fromtimestamp(user_record['subscribed_at']).strftime('%Y-%m-%d')}\n"
+             if user_id in subscribed_users and user_record["subscribed_at"] else "")
+    last_delivery = (datetime.fromtimestamp(user_record["last_delivery"]).strftime('%Y-%m-%d %H:%M')
+                     if user_record["last_delivery"] else "never")
     bot_status = "🟢 Bot is running" if scheduler and scheduler.running else "🔴 Bot is not running"
     total_subscribers = len(subscribed_users)
+    last_broadcast = broadcaster.last_stats
+    if last_broadcast:
+        broadcast_status = (f"{last_broadcast['sent']} messages in {last_broadcast['seconds']:.1f}s "
+                            f"at {last_broadcast['finished_at'].strftime('%H:%M')}")
+    else:
+        broadcast_status = "none yet"
     
     stats = f"""
 *Bot Status:*
 {bot_status}
 {subscription_status} to job alerts
+{since}Last jobs delivered: {last_delivery}
+{escape_markdown(describe_prefs(user_id), version=1)}
 Total subscribers: {total_subscribers}
 Jobs in memory: {len(sent_jobs)}
-Update frequency: Every minute
+Last broadcast: {broadcast_status}
+Page cache:
+{escape_markdown(page_cache.describe(), version=1)}
+Update frequency:
+{escape_markdown(scheduler.describe(), version=1) if scheduler else "not scheduled"}
 Focus: Recent entry-level IT jobs (past week)
     """
+    source_health = describe_sources()
+    if source_health:
+        stats += f"\n*Sources:*\n{escape_markdown(source_health, version=1)}\n"
+    if user_id in ADMIN_IDS:
+        stats += f"\n*Metrics:*\n{escape_markdown(describe_metrics(), version=1)}\n"
     await update.message.reply_text(stats, parse_mode='Markdown')
 
+# Pipeline and delivery counters for the admin view of /status
+def describe_metrics():
+    lines = []
+    sources = sorted({label_values[0] for label_values in fetch_results.values})
+    for source in sources:
+        fetches = sum(fetch_results.get(source, result) for result in ("parsed", "not_modified", "unchanged", "error"))
+        lines.append(
+            f"{source}: {fetches} fetches ({fetch_results.get(source, 'error')} failed), "
+            f"p95 {fetch_seconds.quantile(0.95, source):g}s, {fetch_bytes.get(source) / 1024:.0f} KB, "
+            f"parse {parse_seconds.mean(source) * 1000:.0f}ms avg, cards {cards_seen.get(source)} -> "
+            f"matched {jobs_matched.get(source)} -> new {jobs_new.get(source)} ({jobs_deduped.get(source)} dupes)"
+        )
+    failures = ", ".join(f"{error} {count}" for (error,), count in send_failures.values.items()) or "none"
+    lines.append(f"Sent {messages_sent.get()} messages, p95 {send_seconds.quantile(0.95):g}s, "
+                 f"p95 queue wait {outbox_wait_seconds.quantile(0.95):g}s, {flood_waits.get()} flood waits")
+    lines.append(f"Queue {delivery_queue.get()}, {send_retries.get()} retries, {dead_letters.get()} dead letters")
+    lines.append(f"Send failures: {failures}")
+    lines.append(f"Broadcasts: {broadcast_seconds.count()}, {broadcast_seconds.mean():.1f}s avg")
+    lines.append("/jobs cache: " + ", ".join(f"{result} {jobs_cache_lookups.get(result)}"
+                                             for result in ("fresh", "stale", "shared", "miss")))
+    return "\n".join(lines)
+
+# Jobs from a fetch that hit errors or an open circuit: handed to the callers waiting on
+# it, but never cached, so the next caller tries the source again
+class IncompleteJobs(list):
+    pass
+
+# Short-lived cache of fetch results with single-flight refreshes. Results younger than
+# `ttl` are returned as they are; results up to `stale` old are returned at once while one
+# background fetch refreshes them; otherwise the caller waits for a fetch. Concurrent
+# callers always share the fetch already in progress for a key. IncompleteJobs results
+# are not stored (an older entry stays).
+class ResultCache:
+    def __init__(self, ttl=JOBS_CACHE_TTL, stale=JOBS_CACHE_STALE):
+        self.ttl = ttl
+        self.stale = stale
+        self.entries = {}  # key -> (result, monotonic time fetched)
+        self._fetches = {}  # key -> task of the fetch in progress
+
+    def _fetch(self, key, fetch):
+        task = self._fetches.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._fetches[key] = task
+            task.add_done_callback(lambda task: self._store(key, task))
+        return task
+
+    def _store(self, key, task):
+        del self._fetches[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f"Error refreshing {key}: {task.exception()}")
+            return
+        if isinstance(task.result(), IncompleteJobs):
+            return
+        self.entries[key] = (task.result(), time.monotonic())
+
+    async def get(self, key, fetch):
+        entry = self.entries.get(key)
+        age = time.monotonic() - entry[1] if entry else None
+        if entry and age < self.ttl:
+            jobs_cache_lookups.inc("fresh")
+            return entry[0]
+        if entry and age < self.stale:
+            jobs_cache_lookups.inc("stale")
+            self._fetch(key, fetch)
+            return entry[0]
+        jobs_cache_lookups.inc("shared" if key in self._fetches else "miss")
+        # A caller giving up (e.g. the /jobs deadline) must not cancel the fetch for the others
+        return await asyncio.shield(self._fetch(key, fetch))
+
+jobs_cache = ResultCache()
+
+# What /jobs shows for one source: everything on the first pages, including jobs from
+# unchanged pages. The crawl marks are left to the rotation.
+async def fetch_for_jobs_command(source):
+    errors = []
+    jobs = await source.fetch(include_unchanged=True, max_pages=1, update_marks=False, errors=errors)
+    return IncompleteJobs(jobs) if errors else jobs
+
+# Sources queried by /jobs, keyed by the same names used in the rotation
+def get_job_sources():
+    return {name: (lambda name=name, source=source: jobs_cache.get(name, lambda: fetch_for_jobs_command(source)))
+            for name, source in enabled_sources().items()}
+
+# Run all sources concurrently and yield (source_name, jobs) as each one finishes.
+# Sources still running when the deadline passes are cancelled and yielded with jobs=None.
+async def fan_out_sources(sources, deadline=JOBS_DEADLINE):
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + deadline
+    tasks = {asyncio.create_task(fetch()): name for name, fetch in sources.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = end_time - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    jobs = task.result()
+                except Exception as e:
+                    logger.error(f"Error in source {tasks[task]}: {e}")
+                    jobs = []
+                yield tasks[task], jobs or []
+        
+        timed_out = [tasks[task] for task in pending]
+        for task in pending:
+            task.cancel()
+        pending = set()
+        for name in timed_out:
+            logger.warning(f"Source {name} missed the {deadline:g}s deadline")
+            yield name, None
+    finally:
+        for task in pending:
+            task.cancel()
+
 async def force_job_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_chat.id
     
@@ -541,79 +3030,154 @@ async def force_job_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text('Wait panu mame search panran🕵️')
     
     try:
-        bot = Bot(BOT_TOKEN)
-        
-        # Collect recent jobs from all sources
-        all_jobs = []
-        all_jobs.extend(await scrape_indeed())
-        all_jobs.extend(await scrape_linkedin())
-        all_jobs.extend(await scrape_linkedin_posts())  # Include LinkedIn posts!
-        all_jobs.extend(await scrape_remoteok())
-        
-        # Add Google jobs if API credentials are available
-        if GOOGLE_API_KEY and GOOGLE_CSE_ID:
-            all_jobs.extend(search_google_jobs())
+        jobs_sent = 0
+        slow_sources = []
+        # The same opening found by several sources is shown once
+        shown_links = DedupStore(None)
+        shown_sketches = NearDuplicateIndex(DedupStore(None))
         
-        # Filter for relevant jobs
-        filtered_jobs = []
-        for job_data in all_jobs:
-            title, link = job_data[0], job_data[1]
-            post_date = job_data[2] if len(job_data) > 2 else "Recent"
-            
-            # Add to global sent jobs to avoid duplicates
-            unique_id = f"{title}_{link}"
-            sent_jobs.add(unique_id)
+        # Stream each source's jobs to the user as soon as that source finishes
+        async for source_name, jobs in fan_out_sources(get_job_sources()):
+            if jobs is None:
+                slow_sources.append(source_name)
+                continue
             
-            # Clean job title for Markdown
-            title = title.replace("*", "").replace("_", "").replace("`", "").replace("[", "").replace("]", "")
-            filtered_jobs.append((title, link, post_date))
-        
-        # Send jobs to this specific user
-        jobs_sent = 0
-        for job_title, link, post_date in filtered_jobs:
-            message = f"💼 *{job_title}*\n🔗 [Apply Here]({link})\n⏰ Posted: {post_date}"
+            source_jobs = []
+            for job in jobs:
+                # Only deduped within this reply: the global sent store belongs to the rotation,
+                # which still has to deliver these jobs to subscribers with other filters
+                if mark_job_seen(job, shown_links, shown_sketches) is not None:
+                    continue
+                
+                if subscriber_index.wants(user_id, job.roles, job.location):
+                    source_jobs.append(job)
             
-            try:
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode='Markdown',
-                    disable_web_page_preview=False
-                )
-                jobs_sent += 1
-                await asyncio.sleep(0.3)
-            except Exception as e:
-                logger.error(f"Error sending job to user {user_id}: {e}")
+            messages = [(user_id, message) for message in render_jobs_for_user(user_id, source_jobs)]
+            jobs_sent += broadcaster.enqueue(messages, PRIORITY_INTERACTIVE, parse_mode='MarkdownV2',
+                                             disable_web_page_preview=False)
         
+        # Once jobs are queued, the closing notes are queued too so they arrive after them
         if jobs_sent > 0:
-            await update.message.reply_text(f'Search pana matum podhadhu, Apply pananum😁')
+            notes = [f"⏱️ Skipped slow sources: {', '.join(slow_sources)}"] if slow_sources else []
+            notes.append('Search pana matum podhadhu, Apply pananum😁')
+            broadcaster.enqueue([(user_id, note) for note in notes], PRIORITY_INTERACTIVE)
         else:
+            if slow_sources:
+                await update.message.reply_text(f"⏱️ Skipped slow sources: {', '.join(slow_sources)}")
             await update.message.reply_text('No new entry-level IT jobs found at the moment. Check back later!')
             
     except Exception as e:
         logger.error(f"Error in force job check: {e}")
         await update.message.reply_text('Error checking for jobs. Please try again later.')
 
-async def main():
-    # Load subscribed users from file
-    load_users()
-    
-    # Set up the application with command handlers
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+# Build the bot application with all command handlers
+def build_application(post_init=None, post_shutdown=None):
+    from telegram.ext import ApplicationBuilder, CommandHandler
+    builder = ApplicationBuilder().token(BOT_TOKEN).concurrent_updates(UPDATE_CONCURRENCY)
+    if broadcaster.interactive_bucket is not broadcaster.global_bucket:
+        # Command replies go out on the interactive budget; 256 is PTB's own pool size
+        builder = builder.request(LaneRequest(lambda: broadcaster.acquire_interactive(urgent=True), broadcaster.pause,
+                                              connection_pool_size=256))
+    if TELEGRAM_API_URL:
+        urls = bot_api_urls()
+        builder = builder.base_url(urls["base_url"]).base_file_url(urls["base_file_url"])
+    if post_init:
+        builder = builder.post_init(post_init)
+    if post_shutdown:
+        builder = builder.post_shutdown(post_shutdown)
+    app = builder.build()
     
     # Add command handlers
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("stop", stop_command))
     app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("jobs", force_job_check))
+    # A /jobs scrape can take JOBS_DEADLINE; run it without holding one of the
+    # UPDATE_CONCURRENCY slots the quick commands are answered in
+    app.add_handler(CommandHandler("jobs", force_job_check, block=False))
     app.add_handler(CommandHandler("status", status_command))
+    app.add_handler(CommandHandler("digest", digest_command))
+    app.add_handler(CommandHandler("subscribe", subscribe_command))
+    app.add_handler(CommandHandler("location", location_command))
+    app.add_handler(CommandHandler("remote", remote_command))
+    return app
+
+# Delivery-only process (WORKER_INDEX > 0): sends its shard of the outbox until stopped
+async def run_delivery_worker():
+    global metrics_server
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
     
-    # Start the scheduler
-    start_scheduler()
+    broadcaster.start()
+    if METRICS_PORT:
+        metrics_server = await start_metrics_server(METRICS_PORT + WORKER_INDEX)
+    logger.info(f"Delivery worker {WORKER_INDEX} of {WORKER_COUNT} started")
+    await stop.wait()
+    
+    logger.info(f"Delivery worker {WORKER_INDEX} is stopping...")
+    if metrics_server:
+        metrics_server.close()
+    await broadcaster.shutdown()
+    await broadcaster.bot.shutdown()
+    broadcaster.outbox.close()
+    subscriber_store.close()
+
+async def main():
+    if not 0 <= WORKER_INDEX < WORKER_COUNT:
+        logger.critical(f"WORKER_INDEX must be between 0 and WORKER_COUNT - 1 ({WORKER_COUNT - 1})")
+        return
+    if WORKER_INDEX:
+        await run_delivery_worker()
+        return
     
-    # Run the bot
-    logger.info(f"Bot started and polling with {len(subscribed_users)} subscribed users")
-    await app.run_polling()
+    # Load subscribed users and already-sent jobs from disk
+    load_users()
+    sent_jobs.load()
+    near_duplicates.load()
+    crawl_marks.load()
+    
+    # Start polling (and the metrics endpoint) once the bot's event loop is running
+    async def on_startup(application):
+        global metrics_server
+        broadcaster.start()
+        start_scheduler()
+        if METRICS_PORT:
+            metrics_server = await start_metrics_server()
+    
+    # Stop polling and close pooled HTTP connections when the bot stops
+    async def on_shutdown(application):
+        if scheduler:
+            scheduler.shutdown()
+        if metrics_server:
+            metrics_server.close()
+        await broadcaster.shutdown()
+        broadcaster.outbox.close()
+        google_client.close()
+        if parse_pool:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+        subscriber_store.close()
+        await http_client.close()
+
+    # Set up the application with command handlers
+    app = build_application(post_init=on_startup, post_shutdown=on_shutdown)
+    
+    # Run the bot. run_polling/run_webhook drive the already-running loop (nest_asyncio)
+    # and return once the bot stops; asyncio.run owns the loop, so they must not close it.
+    if WEBHOOK_URL:
+        logger.info(f"Bot started with webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT} and {len(subscribed_users)} subscribed users")
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            max_connections=UPDATE_CONCURRENCY,
+            close_loop=False
+        )
+    else:
+        logger.info(f"Bot started and polling with {len(subscribed_users)} subscribed users")
+        app.run_polling(close_loop=False)
 
 if __name__ == "__main__":
     logger.info("Recent Entry-Level IT Jobs Bot is starting...")
@@ -0,0 +1,68 @@
+import bot
+
+
+# Move the breaker's last state change `seconds` into the past
+def elapse(breaker, seconds):
+    breaker.changed_at -= seconds
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = bot.CircuitBreaker("test", threshold=3, cooldown=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = bot.CircuitBreaker("test", threshold=1, cooldown=60)
+    breaker.record_failure()
+    elapse(breaker, 59)
+    assert not breaker.allow()
+    elapse(breaker, 1)
+    assert breaker.allow() and breaker.state == "half_open"
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+    assert breaker.failures == 0 and breaker.cooldown == 60
+
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    breaker = bot.CircuitBreaker("test", threshold=1, cooldown=60, max_cooldown=200)
+    breaker.record_failure()
+    cooldowns = []
+    for _ in range(3):
+        elapse(breaker, breaker.cooldown)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+        cooldowns.append(breaker.cooldown)
+    assert cooldowns == [120, 200, 200]
+    elapse(breaker, breaker.cooldown)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.cooldown == 60
+
+
+# A probe that is cancelled never reports back; another one is let through a cooldown later
+def test_lost_probe_is_replaced():
+    breaker = bot.CircuitBreaker("test", threshold=1, cooldown=60)
+    breaker.record_failure()
+    elapse(breaker, 60)
+    assert breaker.allow()
+    elapse(breaker, 60)
+    assert breaker.allow() and breaker.state == "half_open"
+
+
+def test_failures_while_open_do_not_restart_cooldown():
+    breaker = bot.CircuitBreaker("test", threshold=1, cooldown=60)
+    breaker.record_failure()
+    elapse(breaker, 60)
+    breaker.record_failure()
+    assert breaker.allow()
@@ -0,0 +1,73 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+import bot
+
+
+def card(index, title):
+    return (f'<div class="job_seen_beacon"><h2 class="jobTitle"><a data-jk="{index:016x}" href="/rc/clk?jk={index:016x}">'
+            f'<span>{title}</span></a></h2><span data-testid="company-name">Company {index}</span>'
+            f'<div class="companyLocation">Pune</div><span class="date">Just posted</span></div>')
+
+
+# Indeed-style search results, 10 per page, newest first: each posting is (id, title)
+@pytest.fixture
+def results(monkeypatch):
+    postings = []
+    requested = []
+
+    def handler(request):
+        start = int(parse_qs(request.url.query.decode())["start"][0])
+        requested.append(start)
+        cards = "".join(card(index, title) for index, title in postings[start:start + 10])
+        return httpx.Response(200, text=f"<html><body><ul>{cards}</ul></body></html>")
+
+    monkeypatch.setattr(bot, "http_client", bot.HttpClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(bot, "page_cache", bot.PageCache())
+    monkeypatch.setattr(bot, "crawl_marks", bot.CrawlMarks(None))
+    source = bot.JobSource("indeed", "https://www.indeed.com/jobs?q={query}&start={offset}", ["developer"],
+                           bot.parse_indeed_page, rate=1000, page_size=10)
+    return source, postings, requested
+
+
+def run(coroutine):
+    async def wrapped():
+        try:
+            return await coroutine
+        finally:
+            await bot.http_client.close()
+    return asyncio.run(wrapped())
+
+
+def test_page_without_matching_roles_does_not_end_the_crawl(results):
+    source, postings, requested = results
+    postings[:] = [(index, "Senior Sales Manager") for index in range(10)]
+    postings += [(index, "Junior Developer") for index in range(10, 15)]
+
+    jobs = run(source.fetch())
+
+    assert {job.title for job in jobs} == {"Junior Developer"}
+    assert len(jobs) == 5
+    assert requested == [0, 10, 20]
+
+
+def test_jobs_command_leaves_later_pages_to_the_rotation(results):
+    source, postings, requested = results
+    postings[:] = [(index, "Junior Developer") for index in range(30)]
+
+    async def scenario():
+        first = await source.fetch()
+        postings[:0] = [(index, "Junior Developer") for index in range(100, 130)]
+        await source.fetch(include_unchanged=True, max_pages=1, update_marks=False)
+        requested.clear()
+        return first, await source.fetch()
+
+    first, after_jobs_command = run(scenario())
+
+    assert len(first) == 30
+    assert {job.link for job in after_jobs_command} >= {f"https://www.indeed.com/viewjob?jk={index:016x}"
+                                                         for index in range(100, 130)}
+    assert requested == [0, 10, 20, 30]
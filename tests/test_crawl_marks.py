@@ -0,0 +1,52 @@
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import bot
+
+
+# Jobs as crawled, newest first, posted an hour apart
+def crawled(*ids, newest=datetime(2024, 5, 1, 12, 0)):
+    return [SimpleNamespace(url=f"https://example.com/jobs/{job_id}", posted_at=newest - timedelta(hours=index))
+            for index, job_id in enumerate(ids)]
+
+
+def test_marks_survive_a_restart(tmp_path):
+    path = str(tmp_path / "crawl_marks.json")
+    marks = bot.CrawlMarks(path)
+    marks.update("indeed", "developer", crawled(3, 2, 1))
+    marks.save()
+    assert not marks.dirty
+
+    restarted = bot.CrawlMarks(path)
+    restarted.load()
+    assert restarted.get("indeed", "developer") == marks.get("indeed", "developer")
+    assert restarted.get("indeed", "developer")["newest"] == datetime(2024, 5, 1, 12, 0).timestamp()
+    assert restarted.get("indeed", "tester") is None
+
+
+def test_update_keeps_newest_links_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "CRAWL_MARK_LINKS", 4)
+    marks = bot.CrawlMarks(str(tmp_path / "crawl_marks.json"))
+    marks.update("indeed", "developer", crawled(3, 2, 1))
+    marks.update("indeed", "developer", crawled(5, 4, 3, newest=datetime(2024, 5, 1, 14, 0)))
+    mark = marks.get("indeed", "developer")
+    assert mark["links"] == [f"https://example.com/jobs/{job_id}" for job_id in (5, 4, 3, 2)]
+    assert mark["newest"] == datetime(2024, 5, 1, 14, 0).timestamp()
+
+
+def test_unchanged_marks_are_not_written(tmp_path):
+    path = str(tmp_path / "crawl_marks.json")
+    marks = bot.CrawlMarks(path)
+    marks.update("indeed", "developer", [])
+    marks.save()
+    assert not os.path.exists(path)
+
+
+def test_corrupt_file_starts_afresh(tmp_path):
+    path = str(tmp_path / "crawl_marks.json")
+    with open(path, "w") as f:
+        f.write('{"indeed": ')
+    marks = bot.CrawlMarks(path)
+    marks.load()
+    assert marks.marks == {}
@@ -0,0 +1,57 @@
+import os
+import time
+
+import bot
+
+
+def write_log(path, records):
+    with open(path, "wb") as f:
+        f.write(b"".join(bot.DedupStore.RECORD.pack(bot.DedupStore.fingerprint(key), seen_at)
+                         for key, seen_at in records))
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "sent_jobs.bin")
+    store = bot.DedupStore(path)
+    store.load()
+    assert store.add("https://example.com/jobs/1")
+    assert not store.add("https://example.com/jobs/1")
+    store.add("https://example.com/jobs/2")
+
+    restarted = bot.DedupStore(path)
+    restarted.load()
+    assert len(restarted) == 2
+    assert "https://example.com/jobs/1" in restarted
+    assert "https://example.com/jobs/3" not in restarted
+
+
+def test_reload_drops_expired_entries_and_compacts_the_log(tmp_path):
+    path = str(tmp_path / "sent_jobs.bin")
+    now = time.time()
+    write_log(path, [("old", now - 7200), ("fresh", now - 60), ("older", now - 9000), ("fresh", now - 30)])
+    # A crash mid-write leaves part of a record at the end
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    store = bot.DedupStore(path, ttl=3600)
+    store.load()
+    assert len(store) == 1
+    assert "fresh" in store and "old" not in store and "older" not in store
+    # The first sighting of a repeated fingerprint is kept
+    assert store.entries[bot.DedupStore.fingerprint("fresh")] == now - 60
+    assert os.path.getsize(path) == bot.DedupStore.RECORD.size
+
+    store.add("new")
+    restarted = bot.DedupStore(path, ttl=3600)
+    restarted.load()
+    assert "fresh" in restarted and "new" in restarted
+
+
+def test_entries_expire_while_running(tmp_path):
+    store = bot.DedupStore(str(tmp_path / "sent_jobs.bin"), ttl=3600)
+    store.load()
+    store.add("stale")
+    store.entries[bot.DedupStore.fingerprint("stale")] -= 3601
+    store.add("current")
+    assert "stale" not in store
+    assert "current" in store
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+import bot
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+SCRAPED = sorted(name for name, source in bot.SOURCE_REGISTRY.items()
+                 if source.url_template and name in bot.EXTRACTION_SPECS)
+
+
+# Pages saved by `python benchmark.py record`: EXTRACTION_SPECS must still find the
+# cards, every card must carry the site's main field (title, or a post's text) and the
+# parser must still build jobs
+@pytest.mark.parametrize("name", SCRAPED)
+def test_recorded_page_yields_cards(name):
+    path = os.path.join(FIXTURES, f"{name}.html")
+    if not os.path.exists(path):
+        pytest.skip(f"no recorded page for {name}; run `python benchmark.py record`")
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    main_field = next(iter(bot.EXTRACTION_SPECS[name]["fields"]))
+    cards = bot.extract_cards(name, html)
+    assert cards
+    assert all(card.get(main_field) for card in cards)
+    assert bot.SOURCE_REGISTRY[name].parse(html)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+import time
+
+import googleapiclient.discovery
+import pytest
+from googleapiclient.http import HttpMock
+
+import bot
+
+
+# An httplib2 stand-in that fails if it is used from any thread but the one that made it
+class ThreadConfinedHttp(HttpMock):
+    def __init__(self, filename, created):
+        super().__init__(filename, {"status": "200"})
+        self.owner = threading.get_ident()
+        self.uris = []
+        created.append(self)
+
+    def request(self, uri, *args, **kwargs):
+        assert threading.get_ident() == self.owner, "HTTP connection shared between threads"
+        self.uris.append(uri)
+        time.sleep(0.02)  # Keep the pool threads' requests overlapping
+        return super().request(uri, *args, **kwargs)
+
+
+def make_client(workdir, monkeypatch, created):
+    response = workdir / "cse.json"
+    response.write_text(json.dumps({"items": [
+        {"title": "Junior Python Developer - Acme Corp", "link": "https://acme.example.com/jobs/1"},
+        {"title": "Senior Staff Architect - Acme Corp", "link": "https://acme.example.com/jobs/2"},
+    ]}))
+    monkeypatch.setattr(bot, "GOOGLE_CSE_STUB", None)
+    return bot.GoogleJobsClient(api_key="test-key", cse_id="test-cx", max_queries_per_check=8, workers=4,
+                                http_factory=lambda: ThreadConfinedHttp(str(response), created))
+
+
+def test_search_runs_real_requests_over_one_connection_per_thread(workdir, monkeypatch):
+    created = []
+    client = make_client(workdir, monkeypatch, created)
+    try:
+        jobs = asyncio.run(client.search())
+    finally:
+        client.close()
+
+    assert len(jobs) == 8  # One target job per query
+    assert {job.link for job in jobs} == {"https://acme.example.com/jobs/1"}
+    assert 1 <= len(created) <= 4
+    uris = [uri for http in created for uri in http.uris]
+    assert len(uris) == 8
+    assert all("key=test-key" in uri and "cx=test-cx" in uri for uri in uris)
+
+
+def test_service_is_built_once_on_the_event_loop(workdir, monkeypatch):
+    built_on = []
+    build = googleapiclient.discovery.build
+
+    def recording_build(*args, **kwargs):
+        built_on.append(threading.get_ident())
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(googleapiclient.discovery, "build", recording_build)
+    client = make_client(workdir, monkeypatch, [])
+    try:
+        asyncio.run(client.search())
+        client.allowance = 8
+        asyncio.run(client.search())
+    finally:
+        client.close()
+
+    assert built_on == [threading.get_ident()]
+
+
+def test_every_query_failing_raises(workdir, monkeypatch):
+    class FailingHttp:
+        def request(self, *args, **kwargs):
+            raise ConnectionError("quota exceeded")
+
+    monkeypatch.setattr(bot, "GOOGLE_CSE_STUB", None)
+    client = bot.GoogleJobsClient(api_key="test-key", cse_id="test-cx", max_queries_per_check=2, workers=2,
+                                  http_factory=FailingHttp)
+    try:
+        with pytest.raises(ConnectionError):
+            asyncio.run(client.search())
+    finally:
+        client.close()
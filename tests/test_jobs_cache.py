@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+import pytest
+
+import bot
+
+
+def card(index):
+    return (f'<div class="job_seen_beacon"><h2 class="jobTitle"><a data-jk="{index:016x}" href="/rc/clk?jk={index:016x}">'
+            f'<span>Junior Developer</span></a></h2><span data-testid="company-name">Acme {index}</span>'
+            f'<div class="companyLocation">Pune</div><span class="date">Just posted</span></div>')
+
+
+@pytest.fixture
+def indeed(monkeypatch):
+    state = {"up": False, "requests": 0}
+
+    def handler(request):
+        state["requests"] += 1
+        if not state["up"]:
+            return httpx.Response(503)
+        return httpx.Response(200, text=f"<html><body>{card(1)}{card(2)}</body></html>")
+
+    monkeypatch.setattr(bot, "http_client", bot.HttpClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(bot, "page_cache", bot.PageCache())
+    monkeypatch.setattr(bot, "crawl_marks", bot.CrawlMarks(None))
+    source = bot.JobSource("indeed", "https://www.indeed.com/jobs?q={query}&start={offset}", ["developer"],
+                           bot.parse_indeed_page, rate=1000, page_size=10)
+    return source, state
+
+
+def test_failed_fetch_is_not_cached(indeed):
+    source, state = indeed
+    cache = bot.ResultCache(ttl=60, stale=120)
+
+    async def run():
+        failed = await cache.get("indeed", lambda: bot.fetch_for_jobs_command(source))
+        state["up"] = True
+        recovered = await cache.get("indeed", lambda: bot.fetch_for_jobs_command(source))
+        cached = await cache.get("indeed", lambda: bot.fetch_for_jobs_command(source))
+        await bot.http_client.close()
+        return failed, recovered, cached
+
+    failed, recovered, cached = asyncio.run(run())
+    assert failed == [] and isinstance(failed, bot.IncompleteJobs)
+    assert len(recovered) == 2 and not isinstance(recovered, bot.IncompleteJobs)
+    assert cached is recovered
+    assert state["requests"] == 2
+
+
+def test_open_circuit_is_not_cached(indeed):
+    source, state = indeed
+    state["up"] = True
+    source.breaker.state = "open"
+    source.breaker.changed_at = float("inf")  # Not due for a probe
+    cache = bot.ResultCache(ttl=60, stale=120)
+
+    async def run():
+        skipped = await cache.get("indeed", lambda: bot.fetch_for_jobs_command(source))
+        source.breaker.record_success()
+        recovered = await cache.get("indeed", lambda: bot.fetch_for_jobs_command(source))
+        await bot.http_client.close()
+        return skipped, recovered
+
+    skipped, recovered = asyncio.run(run())
+    assert skipped == [] and isinstance(skipped, bot.IncompleteJobs)
+    assert len(recovered) == 2
+    assert state["requests"] == 1
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from telegram.error import Forbidden, NetworkError
+
+import bot
+
+
+# Stands in for telegram.Bot: fails the first sends with the given errors, then accepts
+class FlakyBot:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+        return chat_id
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "OUTBOX_BASE_BACKOFF", 0.0)
+    monkeypatch.setattr(bot, "OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(bot, "OUTBOX_POLL_INTERVAL", 0.01)
+    outbox = bot.Outbox(str(tmp_path / "outbox.db"))
+    yield outbox
+    outbox.close()
+
+
+@pytest.fixture
+def subscribers(tmp_path, monkeypatch):
+    store = bot.SubscriberStore(str(tmp_path / "subscribers.db"), commit_delay=0)
+    index = bot.SubscriberIndex()
+    index.rebuild({42}, {})
+    monkeypatch.setattr(bot, "subscriber_store", store)
+    monkeypatch.setattr(bot, "subscriber_index", index)
+    monkeypatch.setattr(bot, "subscribed_users", {42})
+    yield store
+    store.close()
+
+
+# Run a broadcaster over the outbox until it has drained once and return its stats
+def deliver(outbox, fake_bot, messages, on_dead=None):
+    async def drained(broadcaster):
+        while broadcaster.last_stats is None:
+            await asyncio.sleep(0.01)
+
+    async def run():
+        broadcaster = bot.Broadcaster(global_rate=1000, chat_rate=1000, interactive_rate=0, concurrency=2,
+                                      interactive_concurrency=1, bot=fake_bot, outbox=outbox, on_dead=on_dead)
+        broadcaster.start()
+        broadcaster.enqueue(messages)
+        await asyncio.wait_for(drained(broadcaster), 5)
+        await broadcaster.shutdown()
+        return broadcaster.last_stats
+
+    return asyncio.run(run())
+
+
+def test_transient_failure_is_retried(outbox):
+    fake_bot = FlakyBot(NetworkError("connection reset"))
+    stats = deliver(outbox, fake_bot, [(42, "hello")])
+    assert fake_bot.sent == [(42, "hello")]
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (1, 1, 0)
+    assert outbox.counts() == {"pending": 0, "sending": 0, "dead": 0}
+
+
+def test_message_is_dead_lettered_after_max_attempts(outbox, subscribers):
+    dead = []
+
+    def on_dead(chat_id, e):
+        dead.append((chat_id, type(e)))
+        bot.handle_dead_letter(chat_id, e)
+
+    fake_bot = FlakyBot(*[NetworkError("connection reset") for _ in range(bot.OUTBOX_MAX_ATTEMPTS)])
+    stats = deliver(outbox, fake_bot, [(42, "hello")], on_dead)
+    assert fake_bot.sent == []
+    assert (stats["retried"], stats["failed"]) == (bot.OUTBOX_MAX_ATTEMPTS - 1, 1)
+    assert outbox.counts() == {"pending": 0, "sending": 0, "dead": 1}
+    attempts, error = outbox.conn.execute("SELECT attempts, last_error FROM outbox").fetchone()
+    assert attempts == bot.OUTBOX_MAX_ATTEMPTS - 1
+    assert error.startswith("NetworkError")
+    # Giving up on a flaky network is no reason to drop the user
+    assert dead == [(42, NetworkError)]
+    assert 42 in bot.subscribed_users
+
+
+def test_blocked_user_is_dead_lettered_and_unsubscribed(outbox, subscribers):
+    fake_bot = FlakyBot(Forbidden("bot was blocked by the user"))
+    stats = deliver(outbox, fake_bot, [(42, "hello")], bot.handle_dead_letter)
+    assert (stats["retried"], stats["failed"]) == (0, 1)
+    assert outbox.counts()["dead"] == 1
+    assert 42 not in bot.subscribed_users
+    subscribers.flush()
+    assert subscribers.get(42)["subscribed"] == 0
+
+
+# A crash leaves claimed rows marked as being sent; reopening the queue hands them out again
+def test_rows_left_sending_by_a_crash_are_claimed_again(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    crashed = bot.Outbox(path)
+    crashed.enqueue([(1, "a"), (2, "b"), (3, "c")])
+    assert [item["chat_id"] for item in crashed.claim(2)] == [1, 2]
+    crashed.close()
+
+    restarted = bot.Outbox(path)
+    assert restarted.counts() == {"pending": 3, "sending": 0, "dead": 0}
+    assert [item["chat_id"] for item in restarted.claim(10)] == [1, 2, 3]
+    restarted.close()
+
+
+def test_crashed_messages_are_delivered_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "OUTBOX_POLL_INTERVAL", 0.01)
+    path = str(tmp_path / "outbox.db")
+    crashed = bot.Outbox(path)
+    crashed.enqueue([(1, "a"), (2, "b")])
+    crashed.claim(10)
+    crashed.close()
+
+    restarted = bot.Outbox(path)
+    fake_bot = FlakyBot()
+    # Nothing new is queued: the worker only has to pick up what the crash left behind
+    stats = deliver(restarted, fake_bot, [])
+    assert sorted(fake_bot.sent) == [(1, "a"), (2, "b")]
+    assert stats["sent"] == 2
+    assert restarted.counts() == {"pending": 0, "sending": 0, "dead": 0}
+    restarted.close()
+
+
+# A worker restarting must not release rows another shard is still sending
+def test_restart_releases_only_own_shard(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    crashed = bot.Outbox(path, shard=0, shards=1)
+    crashed.enqueue([(1, "a"), (2, "b"), (-3, "c")])
+    crashed.claim(10)
+    crashed.close()
+
+    shard = bot.Outbox(path, shard=0, shards=2)
+    assert shard.counts() == {"pending": 1, "sending": 2, "dead": 0}
+    assert [item["chat_id"] for item in shard.claim(10)] == [2]
+    shard.close()
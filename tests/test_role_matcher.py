@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+import bot
+
+
+def naive_matches(text):
+    text = text.lower()
+    return {phrase for phrase in bot.role_matcher.phrases if phrase in text}
+
+
+@pytest.mark.parametrize("title", [
+    "Junior Data Analyst",
+    "UI/UX Designer - Remote",
+    "QA Tester / Software Tester (Fresher)",
+    "Pentester recruitment drive - we are hiring graduates",
+    "Graduate Developer, Junior Developer openings",
+    "Senior Staff Architect",
+])
+def test_matches_equals_substring_checks(title):
+    assert bot.role_matcher.matches(title) == naive_matches(title)
+
+
+# The title path (regex walk) and the body path (substring checks) agree on any length of text
+def test_scan_and_substring_paths_agree_on_long_text(monkeypatch):
+    rng = random.Random(7)
+    vocabulary = list(bot.role_matcher.phrases) + ["team", "remote", "er", "re", "data", "ui", "r", "ing"]
+    # Joined without spaces too, so phrases overlap ("testerecruitment")
+    texts = [rng.choice([" ", ""]).join(rng.choice(vocabulary) for _ in range(rng.randint(20, 80)))
+             for _ in range(400)]
+    monkeypatch.setattr(bot.RoleMatcher, "MATCH_SCAN_MAX_LENGTH", 10 ** 9)
+    assert [bot.role_matcher.matches(text) for text in texts] == [naive_matches(text) for text in texts]
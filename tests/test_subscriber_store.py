@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+
+import bot
+
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT chat_id, subscribed FROM users").fetchall())
+
+
+# Changes made while the bot runs wait for one group commit; reads see them straight away
+def test_writes_share_one_group_commit(tmp_path):
+    path = str(tmp_path / "subscribers.db")
+    store = bot.SubscriberStore(path, commit_delay=0.05)
+    store.conn  # Create the table before reading it from another connection
+
+    async def run():
+        store.write(1, subscribed=1)
+        store.write(2, subscribed=1)
+        store.write(1, delivery_mode="digest")
+        before = stored(path)
+        assert store.get(1)["delivery_mode"] == "digest"
+        assert store.load()[2]["subscribed"] == 1
+        await asyncio.sleep(0.1)
+        return before
+
+    assert asyncio.run(run()) == {}
+    assert stored(path) == {1: 1, 2: 1}
+    assert store.get(1)["delivery_mode"] == "digest"
+    store.close()
+
+
+def test_full_batch_is_committed_at_once(tmp_path):
+    path = str(tmp_path / "subscribers.db")
+    store = bot.SubscriberStore(path, commit_delay=60, max_batch=3)
+
+    async def run():
+        for chat_id in range(3):
+            store.write(chat_id, subscribed=1)
+        return stored(path)
+
+    assert asyncio.run(run()) == {0: 1, 1: 1, 2: 1}
+    store.close()
+
+
+def test_unsubscribed_applies_pending_changes(tmp_path):
+    store = bot.SubscriberStore(str(tmp_path / "subscribers.db"))
+    store.write(1, subscribed=0)
+    store.write(2, subscribed=0)
+
+    async def run():
+        store.write(2, subscribed=1)
+        store.write(3, subscribed=0)
+        return store.unsubscribed()
+
+    assert asyncio.run(run()) == {1, 3}
+    store.close()